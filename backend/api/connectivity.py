@@ -1,6 +1,10 @@
-from fastapi import APIRouter
-from backend.services.firebase_service import check_firebase_connection
+import asyncio
+from fastapi import APIRouter, HTTPException
+from backend.core.config import settings
+from backend.services.firebase_service import get_blob_cache_stats
 from backend.services.ai_service import check_ai_connection
+from backend.services.health_service import health_monitor
+from backend.core.deps import get_token_cache_stats
 
 router = APIRouter()
 
@@ -8,17 +12,35 @@ router = APIRouter()
 async def health_check():
     return {"status": "ok", "message": "Fitness Coach Backend Running"}
 
+# Answered from the background health monitor; `refresh=true` re-probes (rate limited)
 @router.get("/connectivity/firebase")
-async def firebase_connectivity():
-    return check_firebase_connection()
+async def firebase_connectivity(refresh: bool = False):
+    return await health_monitor.get("firebase", refresh=refresh)
 
 @router.get("/connectivity/ai")
-async def ai_connectivity():
-    return await check_ai_connection()
+async def ai_connectivity(refresh: bool = False, deep: bool = False):
+    if deep:
+        # Sends a real prompt to the model; for manual debugging only, never for probes
+        if not settings.HEALTH_CHECK_DEEP_AI_ENABLED:
+            raise HTTPException(status_code=403, detail="Deep AI check is disabled (HEALTH_CHECK_DEEP_AI_ENABLED)")
+        return await check_ai_connection()
+    return await health_monitor.get("ai", refresh=refresh)
 
 @router.get("/connectivity/all")
-async def all_connectivity():
+async def all_connectivity(refresh: bool = False):
+    firebase, ai = await asyncio.gather(
+        health_monitor.get("firebase", refresh=refresh),
+        health_monitor.get("ai", refresh=refresh),
+    )
     return {
-        "firebase": check_firebase_connection(),
-        "ai": await check_ai_connection()
+        "firebase": firebase,
+        "ai": ai
     }
+
+@router.get("/connectivity/blob-cache")
+async def blob_cache_stats():
+    return get_blob_cache_stats()
+
+@router.get("/connectivity/auth-cache")
+async def auth_cache_stats():
+    return get_token_cache_stats()
@@ -1,19 +1,35 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from backend.core.deadline import request_deadline
 from backend.core.deps import verify_firebase_token
+from backend.core.responses import FastJSONResponse, etag_json, fast_json
 from backend.services.ai_service import generate_weekly_plan_rag
 from backend.services.ai.agent import detect_intent_multi_agent, adjust_workout_multi_agent
 from backend.services.firebase_service import get_db
+from backend.services.catalog_service import get_workout_catalog, get_workout_map
 from backend.services.mock_service import try_get_mock_plan
+from backend.services.plan_service import (
+    PatchError, PlanConflict, apply_adjustment, catalog_day, check_version, compact_day,
+    compact_plan, day_patch, find_day, hydrate_plan, materialize_plan, new_plan_id,
+    patch_response, patched_day,
+)
 from backend.core.config import settings
+from backend.core.metrics import FIRESTORE_OP_SECONDS
+from backend.core.lazy import lazy_import
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import datetime
+import logging
 import os
 import json
 import re
 
+firestore = lazy_import("firebase_admin.firestore")
+field_path = lazy_import("google.cloud.firestore_v1.field_path")
+
 router = APIRouter(prefix="/act", tags=["act"])
 
+logger = logging.getLogger(__name__)
+
 class GeneratePlanRequest(BaseModel):
     force_refresh: bool = False
     goal: Optional[str] = None
@@ -23,8 +39,114 @@ class ChatRequest(BaseModel):
     day_id: str
     current_plan: Optional[Dict[str, Any]] = None
     confirm: bool = False
+    # Versioned protocol: send plan_id/plan_version instead of current_plan and get
+    # RFC 6902 patches back; confirm by sending the proposed patch
+    plan_id: Optional[str] = None
+    plan_version: Optional[int] = None
+    patch: Optional[List[Dict[str, Any]]] = None
+
+def _confirm_text(day_index: int, day: dict) -> str:
+    activity = day.get("activity") or ("Rest" if day.get("is_rest") else "this workout")
+    if day.get("is_rest"):
+        return f"All set – I've made Day {day_index} a rest day so you can recover."
+    return f"Great, I've updated Day {day_index} to \"{activity}\"."
+
+def _plan_reset_fields(version: int) -> dict:
+    # A newly activated plan starts without per-day edits
+    return {"weeklyPlanEdits": firestore.DELETE_FIELD, "weeklyPlanVersion": version}
+
+def _save_day_edit(db, user_id: str, plan: dict, day_index: int, new_day: dict) -> int:
+    """Persist one changed day as weeklyPlanEdits.<day>, if the plan is still at plan['version']. Returns the new version."""
+    user_ref = db.collection("user_progress").document(user_id)
+
+    @firestore.transactional
+    def write(transaction):
+        snapshot = user_ref.get(transaction=transaction)
+        current = materialize_plan(snapshot.to_dict() or {}, user_id) if snapshot.exists else None
+        if current is None:
+            raise PlanConflict(None, 0)
+        check_version(current, plan["plan_id"], plan["version"])
+        version = current["version"] + 1
+        transaction.update(user_ref, {
+            field_path.FieldPath("weeklyPlanEdits", str(day_index)).to_api_repr(): compact_day(new_day),
+            "weeklyPlanVersion": version,
+            "lastUpdated": datetime.datetime.utcnow(),
+        })
+        return version
+
+    with FIRESTORE_OP_SECONDS.time(op="user_progress.day_edit"):
+        return write(db.transaction())
+
+async def _versioned_chat(request: ChatRequest, user_id: str, day_index: int):
+    db = get_db()
+    with FIRESTORE_OP_SECONDS.time(op="user_progress.get"):
+        user_doc = db.collection("user_progress").document(user_id).get()
+    plan = materialize_plan(user_doc.to_dict() or {}, user_id) if user_doc.exists else None
+    if not plan:
+        raise HTTPException(status_code=404, detail="No active plan found")
+    check_version(plan, request.plan_id, request.plan_version)
+
+    _, target_day = find_day(plan, day_index)
+    if target_day is None:
+        raise HTTPException(status_code=404, detail="Day not found in current plan")
+
+    if request.confirm:
+        if not request.patch:
+            raise HTTPException(status_code=400, detail="patch is required to confirm a versioned change")
+        if request.plan_version is None:
+            # Without it the patch would land on whatever version is current, over newer edits
+            raise HTTPException(status_code=400, detail="plan_version is required to confirm a versioned change")
+        new_day = catalog_day(patched_day(plan, day_index, request.patch))
+        version = _save_day_edit(db, user_id, plan, day_index, new_day)
+        return {
+            "status": "success",
+            "action": "ADJUST_WORKOUT",
+            "response_text": _confirm_text(day_index, new_day),
+            "summary": new_day.get("notes"),
+            **patch_response(plan, day_patch(plan, day_index, new_day), version),
+        }
+
+    workout_details = target_day.get("workout_details") or {}
+    context = {
+        "day_index": day_index,
+        "workout_title": target_day.get("activity"),
+        "current_duration_mins": workout_details.get("duration_mins"),
+        "current_focus": workout_details.get("focus")
+    }
+    intent_data = await detect_intent_multi_agent(request.message, context)
+    intent = str(intent_data.get("intent", "OTHER")).upper()
+    logger.info("Detected intent %s", intent)
+    if intent != "ADJUST_WORKOUT":
+        return _other_intent_response()
 
-@router.post("/chat")
+    adjustment_result = await adjust_workout_multi_agent(request.message, day_index, plan, intent_data)
+    if not adjustment_result.get("success"):
+        return {
+            "status": "error",
+            "response_text": adjustment_result.get("agent_response", "Failed to adjust.")
+        }
+    new_day = apply_adjustment(target_day, adjustment_result)
+    return {
+        "status": "proposal",
+        "action": "ADJUST_WORKOUT",
+        "response_text": adjustment_result['agent_response'],
+        "summary": adjustment_result['summary'],
+        "confirm_required": True,
+        **patch_response(plan, day_patch(plan, day_index, new_day)),
+    }
+
+def _other_intent_response() -> dict:
+    # Placeholder for other intents
+    return {
+        "status": "success",
+        "action": "chat",
+        "response_text": "I can currently only help with adjusting your workout plan (e.g., 'make it shorter', 'too hard'). Other features coming soon!",
+        "summary": None
+    }
+
+@router.post("/chat", response_class=FastJSONResponse)
+@request_deadline(settings.CHAT_DEADLINE_SECONDS)
+@fast_json
 async def chat_agent(
     request: ChatRequest,
     token: dict = Depends(verify_firebase_token)
@@ -38,6 +160,9 @@ async def chat_agent(
         if not day_match:
             raise HTTPException(status_code=400, detail="Invalid day_id format")
         day_index = int(day_match.group(1))
+
+        if request.current_plan is None and (request.plan_version is not None or request.patch is not None):
+            return await _versioned_chat(request, user_id, day_index)
         
         # 1. Get Current Plan
         current_plan = request.current_plan
@@ -45,13 +170,13 @@ async def chat_agent(
             user_ref = db.collection("user_progress").document(user_id)
             user_doc = user_ref.get()
             if user_doc.exists:
-                current_plan = user_doc.to_dict().get("weeklyPlan")
+                current_plan = materialize_plan(user_doc.to_dict(), user_id)
         
         if not current_plan:
             raise HTTPException(status_code=404, detail="No active plan found")
 
         # 2. Get Context (Workout for that day)
-        target_day = next((d for d in current_plan.get('schedule', []) if d['day'] == day_index), None)
+        _, target_day = find_day(current_plan, day_index)
         workout_details = target_day.get("workout_details") if target_day else {}
 
         # If this is a confirmation of a previously proposed change, just persist the plan.
@@ -60,18 +185,15 @@ async def chat_agent(
                 raise HTTPException(status_code=404, detail="Day not found in current plan")
             user_ref = db.collection("user_progress").document(user_id)
             user_ref.set({
-                "weeklyPlan": current_plan,
+                "weeklyPlan": compact_plan(current_plan),
+                "weeklyPlanEdits": firestore.DELETE_FIELD,
+                "weeklyPlanVersion": firestore.Increment(1),
                 "lastUpdated": datetime.datetime.utcnow()
             }, merge=True)
-            activity = target_day.get("activity") or ("Rest" if target_day.get("is_rest") else "this workout")
-            if target_day.get("is_rest"):
-                response_text = f"All set – I've made Day {day_index} a rest day so you can recover."
-            else:
-                response_text = f"Great, I've updated Day {day_index} to \"{activity}\"."
             return {
                 "status": "success",
                 "action": "ADJUST_WORKOUT",
-                "response_text": response_text,
+                "response_text": _confirm_text(day_index, target_day),
                 "summary": target_day.get("notes"),
                 "updated_day": target_day,
                 "updated_plan": current_plan
@@ -86,9 +208,8 @@ async def chat_agent(
         
         # 3. Detect Intent
         intent_data = await detect_intent_multi_agent(request.message, context)
-        print("Intent Data:", intent_data)
         intent = str(intent_data.get("intent", "OTHER")).upper()
-        print("Detected Intent:", intent)
+        logger.info("Detected intent %s", intent)
         
         if intent == "ADJUST_WORKOUT":
             adjustment_result = await adjust_workout_multi_agent(
@@ -99,53 +220,21 @@ async def chat_agent(
             )
             
             if adjustment_result.get("success"):
-                new_schedule = []
+                position, day = find_day(current_plan, day_index)
                 updated_day_data = None
-                
-                for day in current_plan.get("schedule", []):
-                    if day['day'] == day_index:
-                        day['is_rest'] = adjustment_result['is_rest']
-                        day['workout_id'] = adjustment_result['new_workout_id']
-                        selected_workout = adjustment_result.get("selected_workout")
-                        day['activity'] = adjustment_result.get('new_activity_title') or (selected_workout or {}).get("display_title") or (selected_workout or {}).get("title")
-                        day['notes'] = adjustment_result['summary']
-                        
-                        if not day['is_rest'] and day['workout_id']:
-                            day['workout_details'] = selected_workout
-                        else:
-                            day['workout_details'] = None
-                            if not day.get('activity'):
-                                day['activity'] = "Rest"
-                            
-                        updated_day_data = day
-                    new_schedule.append(day)
-                
-                current_plan["schedule"] = new_schedule
+                if day is not None:
+                    updated_day_data = apply_adjustment(day, adjustment_result)
+                    current_plan["schedule"][position] = updated_day_data
 
-                if request.confirm:
-                    user_ref = db.collection("user_progress").document(user_id)
-                    user_ref.set({
-                        "weeklyPlan": current_plan,
-                        "lastUpdated": datetime.datetime.utcnow()
-                    }, merge=True)
-                    return {
-                        "status": "success",
-                        "action": "ADJUST_WORKOUT",
-                        "response_text": adjustment_result['agent_response'],
-                        "summary": adjustment_result['summary'],
-                        "updated_day": updated_day_data,
-                        "updated_plan": current_plan
-                    }
-                else:
-                    return {
-                        "status": "proposal",
-                        "action": "ADJUST_WORKOUT",
-                        "response_text": adjustment_result['agent_response'],
-                        "summary": adjustment_result['summary'],
-                        "updated_day": updated_day_data,
-                        "updated_plan": current_plan,
-                        "confirm_required": True
-                    }
+                return {
+                    "status": "proposal",
+                    "action": "ADJUST_WORKOUT",
+                    "response_text": adjustment_result['agent_response'],
+                    "summary": adjustment_result['summary'],
+                    "updated_day": updated_day_data,
+                    "updated_plan": current_plan,
+                    "confirm_required": True
+                }
             else:
                  return {
                     "status": "error",
@@ -153,19 +242,21 @@ async def chat_agent(
                 }
         
         else:
-            # Placeholder for other intents
-            return {
-                "status": "success",
-                "action": "chat",
-                "response_text": "I can currently only help with adjusting your workout plan (e.g., 'make it shorter', 'too hard'). Other features coming soon!",
-                "summary": None
-            }
+            return _other_intent_response()
             
+    except HTTPException:
+        raise
+    except PlanConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "plan_id": e.plan_id, "version": e.version})
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        print(f"Chat error: {e}")
+        logger.exception("Chat error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/generate-plan")
+@router.post("/generate-plan", response_class=FastJSONResponse)
+@request_deadline(settings.PLAN_DEADLINE_SECONDS)
+@fast_json
 async def generate_plan(
     request: GeneratePlanRequest,
     token: dict = Depends(verify_firebase_token)
@@ -179,22 +270,28 @@ async def generate_plan(
         if mock_plan:
             # Update generated_at for realism
             mock_plan["generated_at"] = datetime.datetime.utcnow().isoformat()
+            mock_plan["plan_id"] = new_plan_id()
             
             # Save to Firestore (to mimic real behavior)
             user_ref = db.collection("user_progress").document(user_id)
+            user_doc = user_ref.get()
+            version = (user_doc.to_dict() or {}).get("weeklyPlanVersion", 0) + 1 if user_doc.exists else 1
             user_ref.set({
-                "weeklyPlan": mock_plan,
+                "weeklyPlan": compact_plan(mock_plan),
+                **_plan_reset_fields(version),
                 "actPhaseStarted": True,
                 "lastUpdated": datetime.datetime.utcnow()
             }, merge=True)
             
-            return {"status": "success", "plan": mock_plan}
+            return {"status": "success", "plan": {**mock_plan, "version": version}}
 
-        print(f"[{datetime.datetime.utcnow().isoformat()}] MODE: AI - Generating User Plan")
+        logger.info("MODE: AI - Generating User Plan")
         # 1. Check if plan already exists and not forcing refresh
         user_ref = db.collection("user_progress").document(user_id)
-        user_doc = user_ref.get()
+        with FIRESTORE_OP_SECONDS.time(op="user_progress.get"):
+            user_doc = user_ref.get()
         
+        version = (user_doc.to_dict() or {}).get("weeklyPlanVersion", 0) + 1 if user_doc.exists else 1
         target_goal = request.goal
         if not target_goal:
             # Fallback to stored selectedPath if not provided
@@ -217,11 +314,13 @@ async def generate_plan(
             
             if existing_plan and not request.force_refresh:
                 # Update current active weeklyPlan to this one
+                existing_plan = {**compact_plan(existing_plan), "plan_id": existing_plan.get("plan_id") or new_plan_id()}
                 user_ref.update({
                     "weeklyPlan": existing_plan,
+                    **_plan_reset_fields(version),
                     "selectedPath": target_goal # Ensure selectedPath is in sync
                 })
-                return {"status": "exists", "plan": existing_plan}
+                return {"status": "exists", "plan": {**hydrate_plan(existing_plan), "version": version}}
             
             # If we are forcing refresh, or plan doesn't exist for this goal
             pass
@@ -229,21 +328,11 @@ async def generate_plan(
             # New user doc will be created below
             pass
 
-        # 2. Fetch Workouts from Library
+        # 2. Fetch Workouts from Library (cached; embeddings stripped)
         # In a real app with many workouts, we would use vector search here.
         # Since we have < 20, we fetch all.
-        workouts_ref = db.collection("workout_library").stream()
-        workout_library = []
-        workout_map = {} # For quick lookup later
-        
-        for doc in workouts_ref:
-            w_data = doc.to_dict()
-            w_data['id'] = doc.id
-            # Remove embedding to save bandwidth/tokens
-            if 'embedding' in w_data:
-                del w_data['embedding']
-            workout_library.append(w_data)
-            workout_map[doc.id] = w_data
+        workout_library = get_workout_catalog()
+        workout_map = get_workout_map(workout_library) # For quick lookup later
 
         if not workout_library:
             raise HTTPException(status_code=500, detail="Workout library is empty. Please seed data.")
@@ -264,40 +353,43 @@ async def generate_plan(
             
         ai_result["schedule"] = enriched_schedule
         ai_result["generated_at"] = datetime.datetime.utcnow().isoformat()
+        ai_result["plan_id"] = new_plan_id()
         
         # 5. Save to Firestore
-        # We save it to weeklyPlans map AND the current weeklyPlan
+        # We save it to weeklyPlans map AND the current weeklyPlan, both compact
+        stored_plan = compact_plan(ai_result)
         update_data = {
             "weeklyPlans": {
-                target_goal: ai_result
+                target_goal: stored_plan
             },
-            "weeklyPlan": ai_result,
+            "weeklyPlan": stored_plan,
+            **_plan_reset_fields(version),
             "selectedPath": target_goal,
             "actPhaseStarted": True,
             "lastUpdated": datetime.datetime.utcnow()
         }
         
-        user_ref.set(update_data, merge=True)
+        with FIRESTORE_OP_SECONDS.time(op="user_progress.set"):
+            user_ref.set(update_data, merge=True)
         
-        return {"status": "success", "plan": ai_result}
+        return {"status": "success", "plan": {**ai_result, "version": version}}
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in generate_plan: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/plan")
-async def get_plan(token: dict = Depends(verify_firebase_token)):
+@router.get("/plan", response_class=FastJSONResponse)
+async def get_plan(request: Request, token: dict = Depends(verify_firebase_token)):
     try:
         user_id = token['uid']
         db = get_db()
-        doc = db.collection("user_progress").document(user_id).get()
+        with FIRESTORE_OP_SECONDS.time(op="user_progress.get"):
+            doc = db.collection("user_progress").document(user_id).get()
         
         if not doc.exists:
             return {"plan": None}
             
-        data = doc.to_dict()
-        return {"plan": data.get("weeklyPlan")}
+        return etag_json(request, {"plan": materialize_plan(doc.to_dict(), user_id)})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
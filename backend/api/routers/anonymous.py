@@ -1,19 +1,30 @@
+import asyncio
 import json
+import logging
 import os
 import re
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from pydantic import BaseModel
+from typing import List, Optional
 import uuid
 from datetime import datetime, timedelta
-from firebase_admin import firestore
-from backend.services.firebase_service import save_anonymous_session, get_anonymous_session, delete_anonymous_session, get_bucket, get_db, download_file_as_bytes
-from backend.services.ai_service import analyze_body_image, generate_future_physique, recommend_fitness_path, generate_weekly_plan_rag
+from backend.services.firebase_service import save_anonymous_session, get_anonymous_session, update_anonymous_session, consume_anonymous_session, get_db, download_file_as_bytes, upload_bytes, copy_blob, delete_blobs, generate_upload_url, get_uploaded_blob
+from backend.services.ai_service import analyze_body_image, generate_future_physique, recommend_fitness_path, recommend_fitness_path_from_composite, generate_weekly_plan_rag
+from backend.services.image_service import get_or_build_suggest_composite
+from backend.services.catalog_service import get_workout_catalog, get_workout_map
 from backend.services.ai.agent import detect_intent_multi_agent, adjust_workout_multi_agent
 from backend.services.mock_service import try_get_mock_plan, try_get_mock_analyze, try_get_mock_generate, try_get_mock_suggest
+from backend.services.plan_service import (
+    PatchError, PlanConflict, apply_adjustment, catalog_day, check_version, day_patch, find_day,
+    get_anonymous_plan, patch_response, patched_day, save_anonymous_plan, save_anonymous_plan_day,
+)
+from backend.core.deadline import request_deadline
 from backend.core.deps import verify_firebase_token
+from backend.core.responses import FastJSONResponse, fast_json
 from backend.core.config import settings
 
 router = APIRouter(prefix="/anonymous", tags=["anonymous"])
+logger = logging.getLogger(__name__)
 
 class AnalyzeRequest(BaseModel):
     session_id: str
@@ -24,15 +35,34 @@ class GenerateRequest(BaseModel):
 
 class PlanRequest(BaseModel):
     goal: str
+    session_id: Optional[str] = None
 
 class MigrateRequest(BaseModel):
     session_id: str
 
+class UploadIntentRequest(BaseModel):
+    filename: str
+    content_type: str = "image/jpeg"
+    session_id: Optional[str] = None
+
+class UploadFinalizeRequest(BaseModel):
+    session_id: str
+    storage_path: str
+
 class AnonymousChatRequest(BaseModel):
     message: str
     day_id: str
-    current_plan: dict
+    current_plan: Optional[dict] = None
     confirm: bool = False
+    # Plans from /plan are stored server-side: send plan_id/plan_version instead of current_plan
+    plan_id: Optional[str] = None
+    plan_version: Optional[int] = None
+    patch: Optional[List[dict]] = None
+
+def _upload_path(session_id: str, filename: Optional[str]) -> str:
+    # A fresh object per upload: blob caches on other workers may still hold an earlier photo of the same name
+    safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', os.path.basename(filename or "")) or "photo.jpg"
+    return f"anonymous/{session_id}/{uuid.uuid4().hex[:12]}-{safe_name}"
 
 @router.post("/upload")
 async def upload_anonymous_photo(file: UploadFile = File(...), session_id: str = Form(None)):
@@ -40,29 +70,79 @@ async def upload_anonymous_photo(file: UploadFile = File(...), session_id: str =
         session_id = str(uuid.uuid4())
     
     try:
-        # Upload to Firebase Storage
-        bucket = get_bucket()
-        blob_path = f"anonymous/{session_id}/{file.filename}"
-        blob = bucket.blob(blob_path)
-        blob.upload_from_file(file.file, content_type=file.content_type)
-        blob.make_public()
+        # Upload to Firebase Storage (keeps a local copy for the analyze/generate steps)
+        blob_path = _upload_path(session_id, file.filename)
+        photo_bytes = await file.read()
+        blob = upload_bytes(blob_path, photo_bytes, content_type=file.content_type, make_public=True)
         
-        # Save session data
-        session_data = {
-            "session_id": session_id,
-            "uploaded_photo_url": blob.public_url,
-            "storage_path": blob_path,
-            "created_at": datetime.utcnow().isoformat(),
-            "expires_at": (datetime.utcnow() + timedelta(days=7)).isoformat()
-        }
-        save_anonymous_session(session_id, session_data)
+        _record_uploaded_photo(session_id, blob_path, blob.public_url)
         
         return {"session_id": session_id, "url": blob.public_url, "storage_path": blob_path}
     except Exception as e:
-        print(f"Error in upload_anonymous_photo: {e}")
+        logger.exception("Error in upload_anonymous_photo: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/upload-intent")
+async def create_upload_intent(request: UploadIntentRequest):
+    """
+    Issue a signed URL so the browser uploads the photo straight to Storage.
+    The client PUTs the file to `upload_url` with `headers`, then calls /upload-finalize.
+    """
+    session_id = request.session_id
+    if not session_id or session_id == "null":
+        session_id = str(uuid.uuid4())
+
+    if not request.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Only image uploads are supported")
+
+    blob_path = _upload_path(session_id, request.filename)
+
+    try:
+        # Signing may call IAM over the network
+        loop = asyncio.get_running_loop()
+        intent = await loop.run_in_executor(None, generate_upload_url, blob_path, request.content_type)
+        return {"session_id": session_id, **intent}
+    except Exception as e:
+        logger.exception("Error in create_upload_intent: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/upload-finalize")
+async def finalize_upload(request: UploadFinalizeRequest):
+    """Record a photo that was uploaded directly to Storage via /upload-intent."""
+    if not request.storage_path.startswith(f"anonymous/{request.session_id}/"):
+        raise HTTPException(status_code=400, detail="storage_path does not belong to this session")
+
+    try:
+        loop = asyncio.get_running_loop()
+        blob = await loop.run_in_executor(None, get_uploaded_blob, request.storage_path)
+    except Exception as e:
+        logger.exception("Error in finalize_upload: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Uploaded photo not found")
+    if blob.size is not None and blob.size > settings.SIGNED_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Uploaded photo is too large")
+
+    try:
+        _record_uploaded_photo(request.session_id, request.storage_path, blob.public_url)
+        return {"session_id": request.session_id, "url": blob.public_url, "storage_path": request.storage_path}
+    except Exception as e:
+        logger.exception("Error in finalize_upload: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _record_uploaded_photo(session_id: str, blob_path: str, public_url: str):
+    session_data = {
+        "session_id": session_id,
+        "uploaded_photo_url": public_url,
+        "storage_path": blob_path,
+        "created_at": datetime.utcnow().isoformat(),
+        "expires_at": (datetime.utcnow() + timedelta(days=7)).isoformat()
+    }
+    save_anonymous_session(session_id, session_data)
+
 @router.post("/analyze")
+@request_deadline(settings.ANALYZE_DEADLINE_SECONDS)
 async def analyze_anonymous(request: AnalyzeRequest):
     mock_res = try_get_mock_analyze("Anonymous")
     if mock_res:
@@ -77,8 +157,7 @@ async def analyze_anonymous(request: AnalyzeRequest):
     if "expires_at" in session:
         expires_at = datetime.fromisoformat(session["expires_at"])
         if datetime.utcnow() > expires_at:
-            # Optionally delete the expired session here or let a background job do it
-            delete_anonymous_session(request.session_id)
+            # The session sweeper deletes the document and its Storage objects
             raise HTTPException(status_code=404, detail="Session expired")
 
     # Download and Analyze
@@ -90,10 +169,11 @@ async def analyze_anonymous(request: AnalyzeRequest):
         save_anonymous_session(request.session_id, {"analysis_results": analysis})
         return analysis
     except Exception as e:
-        print(f"Error in analyze_anonymous: {e}")
+        logger.exception("Error in analyze_anonymous: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/results/{session_id}")
+@router.get("/results/{session_id}", response_class=FastJSONResponse)
+@fast_json
 async def get_anonymous_results(session_id: str):
     session = get_anonymous_session(session_id)
     if not session:
@@ -101,27 +181,19 @@ async def get_anonymous_results(session_id: str):
     return session
 
 @router.post("/generate")
+@request_deadline(settings.IMAGE_DEADLINE_SECONDS)
 async def generate_anonymous_physique(request: GenerateRequest):
     mock_res = try_get_mock_generate("Anonymous")
     if mock_res:
         # We need to simulate the saving logic too
-        session = get_anonymous_session(request.session_id)
-        if not session:
-             raise HTTPException(status_code=404, detail="Session not found")
-             
-        current_generated = session.get("generated_images", [])
-        existing_idx = next((i for i, item in enumerate(current_generated) if item["goal"] == request.goal), -1)
-        
         # Override mock goal with requested goal
         new_entry = mock_res.copy()
         new_entry["goal"] = request.goal
-        
-        if existing_idx >= 0:
-            current_generated[existing_idx] = new_entry
-        else:
-            current_generated.append(new_entry)
-            
-        save_anonymous_session(request.session_id, {"generated_images": current_generated})
+
+        loop = asyncio.get_running_loop()
+        patch = await loop.run_in_executor(None, update_anonymous_session, request.session_id, lambda session: _upsert_generated_image(session, new_entry))
+        if patch is None:
+             raise HTTPException(status_code=404, detail="Session not found")
         return new_entry
 
     session = get_anonymous_session(request.session_id)
@@ -135,53 +207,41 @@ async def generate_anonymous_physique(request: GenerateRequest):
         # Generate
         generated_bytes = await generate_future_physique(image_bytes, request.goal)
         
-        # Upload generated image
-        bucket = get_bucket()
+        # Upload generated image (keeps a local copy for the suggest step)
         filename = f"{uuid.uuid4()}.jpg"
         save_path = f"anonymous/{request.session_id}/generated/{request.goal}_{filename}"
-        blob = bucket.blob(save_path)
-        blob.upload_from_string(generated_bytes, content_type="image/jpeg")
-        blob.make_public()
+        blob = upload_bytes(save_path, generated_bytes, content_type="image/jpeg", make_public=True)
         
-        # Save to session safely using transaction to avoid race conditions
+        # The three goal generations run concurrently, possibly on different workers; the update
+        # is a transaction so they cannot overwrite each other
         new_entry = {
             "goal": request.goal,
             "url": blob.public_url,
             "path": save_path
         }
-
-        @firestore.transactional
-        def update_session_transaction(transaction, session_ref, entry):
-            snapshot = session_ref.get(transaction=transaction)
-            if not snapshot.exists:
-                return False
-            
-            session_data = snapshot.to_dict()
-            current_generated = session_data.get("generated_images", [])
-            
-            # Check if goal already exists and update it, or append
-            existing_idx = next((i for i, item in enumerate(current_generated) if item["goal"] == entry["goal"]), -1)
-            
-            if existing_idx >= 0:
-                current_generated[existing_idx] = entry
-            else:
-                current_generated.append(entry)
-                
-            transaction.update(session_ref, {"generated_images": current_generated})
-            return True
-
-        db = get_db()
-        session_ref = db.collection('anonymous_sessions').document(request.session_id)
-        transaction = db.transaction()
-        update_session_transaction(transaction, session_ref, new_entry)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, update_anonymous_session, request.session_id, lambda session: _upsert_generated_image(session, new_entry))
         
         return {"url": blob.public_url, "path": save_path, "goal": request.goal}
         
     except Exception as e:
-        print(f"Error in generate_anonymous_physique: {e}")
+        logger.exception("Error in generate_anonymous_physique: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _upsert_generated_image(session: dict, entry: dict) -> dict:
+    current_generated = session.get("generated_images", [])
+    
+    # Check if goal already exists and update it, or append
+    existing_idx = next((i for i, item in enumerate(current_generated) if item["goal"] == entry["goal"]), -1)
+    
+    if existing_idx >= 0:
+        current_generated[existing_idx] = entry
+    else:
+        current_generated.append(entry)
+    return {"generated_images": current_generated}
+
 @router.post("/suggest")
+@request_deadline(settings.ANALYZE_DEADLINE_SECONDS)
 async def suggest_anonymous_path(request: AnalyzeRequest):
     mock_res = try_get_mock_suggest("Anonymous")
     if mock_res:
@@ -207,7 +267,17 @@ async def suggest_anonymous_path(request: AnalyzeRequest):
          raise HTTPException(status_code=400, detail="Missing one or more goal images.")
 
     try:
-        import asyncio
+        if settings.USE_COMPOSITE_SUGGEST:
+            # One downscaled 2x2 grid, reused across repeat suggests for this session
+            composite_bytes, composite_entry = await get_or_build_suggest_composite(
+                f"anonymous/{request.session_id}",
+                [original_path, image_paths['lean'], image_paths['athletic'], image_paths['muscle']],
+                session.get("suggest_composite")
+            )
+            if composite_entry:
+                save_anonymous_session(request.session_id, {"suggest_composite": composite_entry})
+            return await recommend_fitness_path_from_composite(composite_bytes)
+
         # Download images (Parallel)
         loop = asyncio.get_event_loop()
         tasks = [
@@ -229,33 +299,24 @@ async def suggest_anonymous_path(request: AnalyzeRequest):
         return recommendation
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in suggest_anonymous_path: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/plan")
+@router.post("/plan", response_class=FastJSONResponse)
+@request_deadline(settings.PLAN_DEADLINE_SECONDS)
+@fast_json
 async def generate_anonymous_plan(request: PlanRequest):
+    loop = asyncio.get_running_loop()
     mock_plan = try_get_mock_plan("Anonymous")
     if mock_plan:
-        return mock_plan
+        return await loop.run_in_executor(None, save_anonymous_plan, mock_plan, request.session_id)
 
-    print(f"[{datetime.utcnow().isoformat()}] MODE: AI - Generating Anonymous Plan")
+    logger.info("MODE: AI - Generating Anonymous Plan")
     try:
-        db = get_db()
-        
-        # 1. Fetch Workouts from Library
-        workouts_ref = db.collection("workout_library").stream()
-        workout_library = []
-        workout_map = {} 
-        
-        for doc in workouts_ref:
-            w_data = doc.to_dict()
-            w_data['id'] = doc.id
-            if 'embedding' in w_data:
-                del w_data['embedding']
-            workout_library.append(w_data)
-            workout_map[doc.id] = w_data
+        # 1. Fetch Workouts from Library (cached; embeddings stripped)
+        workout_library = get_workout_catalog()
+        workout_map = get_workout_map(workout_library)
 
         if not workout_library:
             raise HTTPException(status_code=500, detail="Workout library is empty.")
@@ -277,14 +338,15 @@ async def generate_anonymous_plan(request: PlanRequest):
         ai_result["schedule"] = enriched_schedule
         ai_result["generated_at"] = datetime.utcnow().isoformat()
         
-        return ai_result
+        return await loop.run_in_executor(None, save_anonymous_plan, ai_result, request.session_id)
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in generate_anonymous_plan: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/chat")
+@router.post("/chat", response_class=FastJSONResponse)
+@request_deadline(settings.CHAT_DEADLINE_SECONDS)
+@fast_json
 async def anonymous_chat_agent(request: AnonymousChatRequest):
     try:
         day_match = re.search(r'day-(\d+)', request.day_id)
@@ -292,30 +354,58 @@ async def anonymous_chat_agent(request: AnonymousChatRequest):
             raise HTTPException(status_code=400, detail="Invalid day_id format")
         day_index = int(day_match.group(1))
 
-        current_plan = request.current_plan or {}
-        schedule = current_plan.get("schedule") or []
-        if not schedule:
-            raise HTTPException(status_code=400, detail="current_plan.schedule is required")
+        stored = request.current_plan is None
+        if stored:
+            if not request.plan_id:
+                raise HTTPException(status_code=400, detail="plan_id or current_plan is required")
+            loop = asyncio.get_running_loop()
+            current_plan = await loop.run_in_executor(None, get_anonymous_plan, request.plan_id)
+            if current_plan is None:
+                raise HTTPException(status_code=404, detail="Plan not found or expired")
+            check_version(current_plan, request.plan_id, request.plan_version)
+        else:
+            current_plan = request.current_plan
+            if not current_plan.get("schedule"):
+                raise HTTPException(status_code=400, detail="current_plan.schedule is required")
 
-        target_day = next((d for d in schedule if d.get("day") == day_index), None)
+        _, target_day = find_day(current_plan, day_index)
         workout_details = target_day.get("workout_details") if target_day else {}
+        # Stored plans, and client-held ones sent with plan_version, get RFC 6902 patches instead of the whole plan back
+        versioned = stored or request.plan_version is not None
+        if versioned and not stored:
+            current_plan = {**current_plan, "plan_id": request.plan_id or current_plan.get("plan_id"), "version": request.plan_version}
 
         if request.confirm:
             if not target_day:
                 raise HTTPException(status_code=404, detail="Day not found in current plan")
+            version = current_plan.get("version")
+            if stored:
+                if not request.patch:
+                    raise HTTPException(status_code=400, detail="patch is required to confirm a change to a stored plan")
+                if request.plan_version is None:
+                    raise HTTPException(status_code=400, detail="plan_version is required to confirm a change to a stored plan")
+                target_day = catalog_day(patched_day(current_plan, day_index, request.patch))
+                version = await loop.run_in_executor(None, save_anonymous_plan_day, current_plan, day_index, target_day)
+            elif versioned:
+                if request.patch:
+                    target_day = patched_day(current_plan, day_index, request.patch)
+                version += 1
             activity = target_day.get("activity") or ("Rest" if target_day.get("is_rest") else "this workout")
             if target_day.get("is_rest"):
                 response_text = f"All set – I've made Day {day_index} a rest day so you can recover."
             else:
                 response_text = f"Great, I've updated Day {day_index} to \"{activity}\"."
-            return {
+            response = {
                 "status": "success",
                 "action": "ADJUST_WORKOUT",
                 "response_text": response_text,
                 "summary": target_day.get("notes"),
-                "updated_day": target_day,
-                "updated_plan": current_plan,
             }
+            if versioned:
+                response.update(patch_response(current_plan, day_patch(current_plan, day_index, target_day), version))
+            else:
+                response.update({"updated_day": target_day, "updated_plan": current_plan})
+            return response
 
         context = {
             "day_index": day_index,
@@ -338,53 +428,24 @@ async def anonymous_chat_agent(request: AnonymousChatRequest):
             )
 
             if isinstance(adjustment_result, dict) and adjustment_result.get("success"):
-                new_schedule = []
-                updated_day_data = None
-
-                for day in current_plan.get("schedule", []):
-                    if day.get("day") == day_index:
-                        day["is_rest"] = adjustment_result["is_rest"]
-                        day["workout_id"] = adjustment_result["new_workout_id"]
-                        selected_workout = adjustment_result.get("selected_workout") or {}
-                        day["activity"] = (
-                            adjustment_result.get("new_activity_title")
-                            or selected_workout.get("display_title")
-                            or selected_workout.get("title")
-                            or day.get("activity")
-                        )
-                        day["notes"] = adjustment_result["summary"]
-
-                        if not day["is_rest"] and day["workout_id"]:
-                            day["workout_details"] = selected_workout
-                        else:
-                            day["workout_details"] = None
-                            if not day.get("activity"):
-                                day["activity"] = "Rest"
-
-                        updated_day_data = day
-                    new_schedule.append(day)
-
-                current_plan["schedule"] = new_schedule
-
-                if request.confirm:
-                    return {
-                        "status": "success",
-                        "action": "ADJUST_WORKOUT",
-                        "response_text": adjustment_result["agent_response"],
-                        "summary": adjustment_result["summary"],
-                        "updated_day": updated_day_data,
-                        "updated_plan": current_plan,
-                    }
+                position, day = find_day(current_plan, day_index)
+                response = {
+                    "status": "proposal",
+                    "action": "ADJUST_WORKOUT",
+                    "response_text": adjustment_result["agent_response"],
+                    "summary": adjustment_result["summary"],
+                    "confirm_required": True,
+                }
+                if day is None:
+                    response.update({"updated_day": None, "updated_plan": current_plan})
+                    return response
+                updated_day_data = apply_adjustment(day, adjustment_result)
+                if versioned:
+                    response.update(patch_response(current_plan, day_patch(current_plan, day_index, updated_day_data)))
                 else:
-                    return {
-                        "status": "proposal",
-                        "action": "ADJUST_WORKOUT",
-                        "response_text": adjustment_result["agent_response"],
-                        "summary": adjustment_result["summary"],
-                        "updated_day": updated_day_data,
-                        "updated_plan": current_plan,
-                        "confirm_required": True,
-                    }
+                    current_plan["schedule"][position] = updated_day_data
+                    response.update({"updated_day": updated_day_data, "updated_plan": current_plan})
+                return response
             else:
                 return {
                     "status": "error",
@@ -400,10 +461,39 @@ async def anonymous_chat_agent(request: AnonymousChatRequest):
 
     except HTTPException:
         raise
+    except PlanConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "plan_id": e.plan_id, "version": e.version})
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        print(f"Anonymous chat error: {e}")
+        logger.exception("Anonymous chat error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _session_blob_paths(session: dict) -> list:
+    paths = [session["storage_path"]] if session.get("storage_path") else []
+    paths += [img["path"] for img in session.get("generated_images", []) if img.get("path")]
+    return paths
+
+async def _copy_session_blobs(session: dict, user_id: str, session_id: str) -> dict:
+    """Server-side copy of the session's photos under users/{user_id}/scans/{session_id}/. Returns old path -> (new path, url)."""
+    prefix = f"anonymous/{session_id}/"
+    loop = asyncio.get_running_loop()
+    copies = {}
+    for path in _session_blob_paths(session):
+        if path.startswith(prefix):
+            copies[path] = f"users/{user_id}/scans/{session_id}/{path[len(prefix):]}"
+    urls = await asyncio.gather(*[loop.run_in_executor(None, copy_blob, src, dest) for src, dest in copies.items()])
+    return {src: (dest, url) for (src, dest), url in zip(copies.items(), urls)}
+
+def _rewrite_blob_refs(session: dict, copied: dict):
+    if session.get("storage_path") in copied:
+        session["storage_path"], session["uploaded_photo_url"] = copied[session["storage_path"]]
+    for img in session.get("generated_images", []):
+        if img.get("path") in copied:
+            img["path"], img["url"] = copied[img["path"]]
+    # The composite is a derived cache under the anonymous prefix; it is rebuilt on demand
+    session.pop("suggest_composite", None)
+
 @router.post("/migrate")
 async def migrate_anonymous_data(request: MigrateRequest, token=Depends(verify_firebase_token)):
     session_id = request.session_id
@@ -415,36 +505,50 @@ async def migrate_anonymous_data(request: MigrateRequest, token=Depends(verify_f
         
     try:
         db = get_db()
-        # Save to user's history/profile. 
-        # We can also update the 'users/{user_id}' doc directly if it's the "current" state
-        # But let's add it to a 'scans' subcollection for now to allow history.
-        
-        # Also, we might want to update the main profile "current_physique" if it's empty.
-        
-        # 1. Add to scans history
-        scan_ref = db.collection('users').document(user_id).collection('scans').document(session_id)
-        # Add user_id to the data
-        session['user_id'] = user_id
-        session['migrated_at'] = datetime.utcnow().isoformat()
-        scan_ref.set(session)
-        
-        # 2. Update user_progress for the Decide phase
-        # Map anonymous session structure to user_progress structure
-        progress_data = {
-            "userId": user_id,
-            "originalImage": session.get("storage_path"),
-            "analysis": session.get("analysis_results", {}),
-            "generatedImages": session.get("generated_images", []),
-            "observeCompleted": True,
-            "decideCompleted": False,
-            "lastUpdated": datetime.utcnow()
-        }
-        db.collection("user_progress").document(user_id).set(progress_data, merge=True)
-        
-        # Clean up anonymous session
-        delete_anonymous_session(session_id)
+        # By default the user's records point at the photos already in Storage (the sweeper only
+        # follows live anonymous_sessions docs, so they are safe once the session is consumed).
+        # MIGRATE_COPY_BLOBS copies them under users/{user_id}/ instead, server-side.
+        copied = await _copy_session_blobs(session, user_id, session_id) if settings.MIGRATE_COPY_BLOBS else {}
+        migrated_at = datetime.utcnow()
+
+        def add_writes(batch, session):
+            if copied:
+                _rewrite_blob_refs(session, copied)
+
+            # 1. Add to scans history
+            # (a 'scans' subcollection rather than the 'users/{user_id}' doc, to allow history)
+            scan_ref = db.collection('users').document(user_id).collection('scans').document(session_id)
+            session['user_id'] = user_id
+            session['migrated_at'] = migrated_at.isoformat()
+            batch.set(scan_ref, session)
+
+            # 2. Update user_progress for the Decide phase
+            # Map anonymous session structure to user_progress structure
+            progress_data = {
+                "userId": user_id,
+                "originalImage": session.get("storage_path"),
+                "analysis": session.get("analysis_results", {}),
+                "generatedImages": session.get("generated_images", []),
+                "observeCompleted": True,
+                "decideCompleted": False,
+                "lastUpdated": migrated_at
+            }
+            batch.set(db.collection("user_progress").document(user_id), progress_data, merge=True)
+
+        # Both writes and the session delete commit in one atomic batch
+        if consume_anonymous_session(session_id, add_writes) is None:
+            raise HTTPException(status_code=404, detail="Anonymous session not found")
+
+        if copied:
+            # The originals are no longer referenced and the sweeper will not find them without the session doc
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, delete_blobs, list(copied))
+            except Exception as e:
+                logger.warning("Could not delete migrated anonymous photos for %s: %s", session_id, e)
         
         return {"status": "success", "message": "Data migrated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in migrate_anonymous_data: {e}")
+        logger.exception("Error in migrate_anonymous_data: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
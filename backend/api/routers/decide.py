@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from backend.core.deadline import request_deadline
 from backend.core.deps import verify_firebase_token
+from backend.core.responses import FastJSONResponse, etag_json
 from backend.services.firebase_service import get_db, download_file_as_bytes
-from backend.services.ai_service import recommend_fitness_path
+from backend.services.ai_service import recommend_fitness_path, recommend_fitness_path_from_composite
+from backend.services.image_service import get_or_build_suggest_composite
 from backend.services.mock_service import try_get_mock_suggest
+from backend.services.plan_service import materialize_plan
+from backend.core.config import settings
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import datetime
 import asyncio
+import logging
 
 router = APIRouter(prefix="/decide", tags=["decide"])
 
+logger = logging.getLogger(__name__)
+
 class GeneratedImage(BaseModel):
     url: str
     path: str
@@ -55,8 +63,8 @@ async def save_state(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/state")
-async def get_state(token: dict = Depends(verify_firebase_token)):
+@router.get("/state", response_class=FastJSONResponse)
+async def get_state(request: Request, token: dict = Depends(verify_firebase_token)):
     try:
         user_id = token['uid']
         db = get_db()
@@ -64,14 +72,20 @@ async def get_state(token: dict = Depends(verify_firebase_token)):
         doc = db.collection("user_progress").document(user_id).get()
         
         if doc.exists:
-            return doc.to_dict()
+            state = doc.to_dict()
+            # Plans are stored compact; expose the active one hydrated, with its edits applied
+            if state.get("weeklyPlan"):
+                state["weeklyPlan"] = materialize_plan(state, user_id)
+                state.pop("weeklyPlanEdits", None)
+            return etag_json(request, state)
         else:
-            return {"observeCompleted": False, "decideCompleted": False}
+            return etag_json(request, {"observeCompleted": False, "decideCompleted": False})
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/suggest")
+@request_deadline(settings.ANALYZE_DEADLINE_SECONDS)
 async def suggest_path(token: dict = Depends(verify_firebase_token)):
     mock_res = try_get_mock_suggest("User")
     if mock_res:
@@ -91,7 +105,7 @@ async def suggest_path(token: dict = Depends(verify_firebase_token)):
         generated_images = data.get("generatedImages", [])
         
         if not original_path or len(generated_images) < 3:
-             print(f"Suggest Error: Missing images. Original: {original_path}, Generated Count: {len(generated_images)}")
+             logger.warning("Suggest: missing images (original=%s, generated=%d)", original_path, len(generated_images))
              raise HTTPException(status_code=400, detail=f"Missing images for analysis. Found {len(generated_images)} generated images.")
 
         # Map goals to paths
@@ -100,6 +114,17 @@ async def suggest_path(token: dict = Depends(verify_firebase_token)):
         if not all(k in image_paths for k in ['lean', 'athletic', 'muscle']):
              raise HTTPException(status_code=400, detail="Missing one or more goal images.")
 
+        if settings.USE_COMPOSITE_SUGGEST:
+            # One downscaled 2x2 grid, reused across repeat suggests for this user
+            composite_bytes, composite_entry = await get_or_build_suggest_composite(
+                f"users/{user_id}/decide",
+                [original_path, image_paths['lean'], image_paths['athletic'], image_paths['muscle']],
+                data.get("suggestComposite")
+            )
+            if composite_entry:
+                db.collection("user_progress").document(user_id).set({"suggestComposite": composite_entry}, merge=True)
+            return await recommend_fitness_path_from_composite(composite_bytes)
+
         # 2. Download images (Parallel)
         # We need bytes for the AI
         loop = asyncio.get_event_loop()
@@ -124,8 +149,7 @@ async def suggest_path(token: dict = Depends(verify_firebase_token)):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in suggest_path: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/commit")
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List
+import logging
 import uuid
 
+from backend.core.config import settings
+from backend.core.deadline import request_deadline
 from backend.core.deps import verify_firebase_token
-from backend.services.firebase_service import download_file_as_bytes, get_bucket, get_db
+from backend.services.firebase_service import download_file_as_bytes, upload_bytes, get_db
 from backend.services.ai_service import analyze_body_image, generate_future_physique
 from backend.services.mock_service import try_get_mock_analyze, try_get_mock_generate
 
 router = APIRouter(prefix="/observe", tags=["observe"])
 
+logger = logging.getLogger(__name__)
+
 class AnalyzeRequest(BaseModel):
     storage_path: str
 
@@ -18,6 +23,7 @@ class GenerateRequest(BaseModel):
     goal: str # lean, athletic, muscle
 
 @router.post("/analyze")
+@request_deadline(settings.ANALYZE_DEADLINE_SECONDS)
 async def analyze_body(request: AnalyzeRequest, token=Depends(verify_firebase_token)):
     mock_res = try_get_mock_analyze("User")
     if mock_res:
@@ -50,6 +56,7 @@ async def get_scan(scan_id: str, token=Depends(verify_firebase_token)):
     return doc.to_dict()
 
 @router.post("/generate")
+@request_deadline(settings.IMAGE_DEADLINE_SECONDS)
 async def generate_physique(request: GenerateRequest, token=Depends(verify_firebase_token)):
     mock_res = try_get_mock_generate("User")
     if mock_res:
@@ -59,34 +66,25 @@ async def generate_physique(request: GenerateRequest, token=Depends(verify_fireb
         return mock_res_copy
 
     try:
-        print(f"Generating physique for goal: {request.goal}")
+        logger.info("Generating physique for goal: %s", request.goal)
         # 1. Download source image
         image_bytes = download_file_as_bytes(request.storage_path)
-        print("Image downloaded successfully")
         
         # 2. Generate
         generated_bytes = await generate_future_physique(image_bytes, request.goal)
-        print("Image generated successfully")
         
         # 3. Upload generated image
-        bucket = get_bucket()
         user_id = token['uid']
         filename = f"{uuid.uuid4()}.jpg"
         save_path = f"users/{user_id}/observe/generated/{request.goal}_{filename}"
-        blob = bucket.blob(save_path)
-        blob.upload_from_string(generated_bytes, content_type="image/jpeg")
-        blob.make_public() # Or use signed URL
+        blob = upload_bytes(save_path, generated_bytes, content_type="image/jpeg", make_public=True) # Or use signed URL
         
         return {"url": blob.public_url, "path": save_path}
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Error in generate_physique: {e}")
+        logger.exception("Error in generate_physique: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     except BaseException as e:
-        import traceback
-        traceback.print_exc()
-        print(f"CRITICAL ERROR in generate_physique: {e}")
+        logger.critical("CRITICAL ERROR in generate_physique: %s", e, exc_info=True)
         # Prevent server shutdown if possible by raising standard HTTP exception
         raise HTTPException(status_code=500, detail="Critical Server Error")
@@ -0,0 +1,660 @@
+"""
+In-process stand-ins for Gemini (ADK Runner), Firestore and Cloud Storage.
+
+They implement just enough of each client's surface for the backend code paths
+to run unchanged, with configurable latency and error injection, so the API can
+be load tested offline. Blocking client calls (Firestore, Storage) sleep with
+time.sleep on purpose: that is how the real clients behave on the event loop.
+"""
+import asyncio
+import copy
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+from pydantic import BaseModel, Field
+
+from backend.services.ai.parsing import JSONScanner
+
+
+class LatencyProfile(BaseModel):
+    """Latency in milliseconds as mean +/- uniform jitter."""
+    mean_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    def sample_seconds(self) -> float:
+        if self.mean_ms <= 0 and self.jitter_ms <= 0:
+            return 0.0
+        return max(0.0, self.mean_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+
+class FakeConfig(BaseModel):
+    model_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(mean_ms=800, jitter_ms=300))
+    image_model_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(mean_ms=4000, jitter_ms=1000))
+    embedding_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(mean_ms=120, jitter_ms=40))
+    firestore_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(mean_ms=25, jitter_ms=10))
+    vector_query_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(mean_ms=80, jitter_ms=30))
+    storage_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(mean_ms=60, jitter_ms=20))
+    # Probability that a model call fails with a 429 before producing output
+    rate_429: float = 0.0
+    # Streaming (SSE) calls: share of model latency before the first chunk, and after the
+    # final content event (the generator's trailing work, e.g. usage metadata)
+    first_token_fraction: float = 0.3
+    stream_tail_fraction: float = 0.15
+    stream_chunks: int = 8
+    library_size: int = 60
+    embedding_dim: int = 2048
+    seed: int = 7
+
+
+# --- Gemini / ADK ---
+
+class _FakeRunConfig:
+    streaming_mode = "sse"
+
+
+class _FakeEvent:
+    def __init__(self, content: types.Content, partial: bool = False):
+        self.content = content
+        self.partial = partial
+
+
+class FakeSessionService:
+    async def create_session(self, app_name: str, user_id: str, session_id: str, **kwargs):
+        return {"app_name": app_name, "user_id": user_id, "session_id": session_id}
+
+    async def delete_session(self, app_name: str, user_id: str, session_id: str, **kwargs):
+        return None
+
+
+class FakeRunner:
+    """
+    Mimics google.adk Runner.run_async: yields a single final event whose
+    content is a canned response chosen from the call site (tracer_name) and prompt.
+    With a streaming run_config it yields the text as partial events first, then the
+    aggregated final event, then idles for the stream's tail like a real SSE call.
+    """
+
+    def __init__(self, model_name: str, instruction: str, tracer_name: str, config: FakeConfig, image_bytes: bytes):
+        self.model_name = model_name
+        self.tracer_name = tracer_name
+        self.instruction = instruction or ""
+        self.session_service = FakeSessionService()
+        self._config = config
+        self._image_bytes = image_bytes
+        # Stand-in for RunConfig(streaming_mode=StreamingMode.SSE); see core._build_runner
+        self.stream_run_config = _FakeRunConfig()
+
+    async def run_async(self, user_id: str, session_id: str, new_message: types.Content, run_config=None):
+        is_image_model = "image" in self.model_name
+        latency = self._config.image_model_latency if is_image_model else self._config.model_latency
+        total = latency.sample_seconds()
+        streaming = run_config is not None and not is_image_model
+        await asyncio.sleep(total * self._config.first_token_fraction if streaming else total)
+        if self._config.rate_429 and random.random() < self._config.rate_429:
+            raise Exception("429 RESOURCE_EXHAUSTED: fake quota exceeded")
+
+        prompt = "".join(part.text or "" for part in (new_message.parts or []))
+        if is_image_model:
+            part = types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=self._image_bytes))
+            yield _FakeEvent(types.Content(role="model", parts=[part]))
+            return
+
+        text = json.dumps(canned_response(self.tracer_name, self.instruction, prompt))
+        if streaming:
+            chunks = max(1, self._config.stream_chunks)
+            size = -(-len(text) // chunks)
+            body = total * (1 - self._config.first_token_fraction - self._config.stream_tail_fraction)
+            for i in range(0, len(text), size):
+                if i:
+                    await asyncio.sleep(body / chunks)
+                yield _FakeEvent(types.Content(role="model", parts=[types.Part(text=text[i:i + size])]), partial=True)
+        yield _FakeEvent(types.Content(role="model", parts=[types.Part(text=text)]))
+        if streaming:
+            await asyncio.sleep(total * self._config.stream_tail_fraction)
+
+
+def canned_response(tracer_name: str, instruction: str, prompt: str) -> Any:
+    if tracer_name == "SkeletonGenerator":
+        focuses = ["Full Body HIIT", "Upper Body", "Rest", "Legs", "Core", "Cardio", "Rest"]
+        return {
+            "weekly_goal": "Benchmark week",
+            "days": [
+                {"day": i + 1, "focus": f, "search_query": f"{f.lower()} workout"}
+                for i, f in enumerate(focuses)
+            ],
+        }
+    if tracer_name == "PlanAssembler":
+        # Keep each retrieved workout_id, as the assembler prompt requires
+        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        scanner = JSONScanner()
+        scanner.feed(prompt)
+        retrieved = scanner.parse() if scanner.complete else {}
+        schedule = []
+        for day in retrieved.get("schedule", []):
+            workout = day.get("selected_workout")
+            schedule.append({
+                "day": day["day"],
+                "day_name": days[(day["day"] - 1) % len(days)],
+                "workout_id": workout["id"] if workout else None,
+                "activity": workout.get("display_title", "Workout") if workout else "Rest",
+                "is_rest": workout is None,
+                "notes": "Fits the flow.",
+            })
+        return {"weekly_focus": "Balanced benchmark week", "schedule": schedule}
+    if tracer_name == "IntentDetector":
+        return {"intent": "ADJUST_WORKOUT"}
+    if tracer_name == "SemanticQueryBuilder":
+        return {"query": "Workout type: Full Body, Duration: 20 minutes, Equipment: Bodyweight"}
+    if tracer_name == "AdjustMessage":
+        return {"summary": "Swapped for a shorter session.", "agent_message": "No problem, here's a shorter option."}
+    if "transformation path" in prompt:
+        estimate = {"time_estimate": "3-6 months", "effort_level": "High", "description": "Benchmark estimate."}
+        return {
+            "lean": estimate,
+            "athletic": estimate,
+            "muscle": estimate,
+            "recommendation": {"suggested_path": "athletic", "reasoning": "Benchmark.", "confidence_score": 0.8},
+        }
+    if "Analyze this body photo" in prompt:
+        return {
+            "category": "Average",
+            "reasoning": "Benchmark analysis.",
+            "estimated_body_fat": 20,
+            "estimated_muscle_mass": 40,
+            "body_type_description": "Athletic",
+            "potential_bodies": [
+                {"type": "Lean & Toned", "goal_key": "lean", "visual_prompt": "lean"},
+                {"type": "Athletic", "goal_key": "athletic", "visual_prompt": "athletic"},
+                {"type": "Muscle", "goal_key": "muscle", "visual_prompt": "muscle"},
+            ],
+        }
+    return {"display_title": "20 Min Benchmark Workout", "difficulty_score": 5, "difficulty": "Intermediate",
+            "difficulty_reason": ["Benchmark"], "equipments": []}
+
+
+def fake_embedding(text: str, dim: int, latency: LatencyProfile) -> List[float]:
+    time.sleep(latency.sample_seconds())
+    digest = hashlib.sha256((text or "").encode("utf-8")).digest()
+    rng = random.Random(digest)
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+# --- Firestore ---
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: Optional[dict], reference: "FakeDocumentRef"):
+        self.id = doc_id
+        self._data = data
+        self.reference = reference
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+def _write_value(target: dict, key: str, value):
+    from google.cloud.firestore_v1.transforms import DELETE_FIELD, Increment
+
+    if value is DELETE_FIELD:
+        target.pop(key, None)
+    elif isinstance(value, Increment):
+        target[key] = target.get(key, 0) + value.value
+    else:
+        target[key] = copy.deepcopy(value)
+
+
+def _deep_merge(target: dict, patch: dict):
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            _write_value(target, key, value)
+
+
+def _update_fields(target: dict, data: dict):
+    # update() keys are field paths: "a.b" or "a.`3`" address nested map members
+    from google.cloud.firestore_v1.field_path import split_field_path
+
+    for path, value in data.items():
+        parts = [part.strip("`") for part in split_field_path(path)]
+        node = target
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        _write_value(node, parts[-1], value)
+
+
+class FakeDocumentRef:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self, transaction=None, **kwargs) -> FakeSnapshot:
+        self._client._sleep()
+        with self._client._lock:
+            data = self._client._docs.get(self.path)
+            if transaction is not None:
+                transaction._record_read(self.path)
+            return FakeSnapshot(self.id, copy.deepcopy(data) if data is not None else None, self)
+
+    def set(self, data: dict, merge: bool = False):
+        self._client._sleep()
+        self._client._apply_set(self.path, data, merge)
+
+    def update(self, data: dict):
+        self._client._sleep()
+        self._client._apply_update(self.path, data)
+
+    def delete(self):
+        self._client._sleep()
+        self._client._apply_delete(self.path)
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+
+class FakeVectorQuery:
+    def __init__(self, collection: "FakeCollection", limit: int):
+        self._collection = collection
+        self._limit = limit
+
+    def get(self, transaction=None, **kwargs) -> List[FakeSnapshot]:
+        client = self._collection._client
+        time.sleep(client.config.vector_query_latency.sample_seconds())
+        docs = self._collection._snapshots()
+        # Deterministic but query-independent ordering is enough for load shape
+        random.Random(len(docs)).shuffle(docs)
+        return docs[:self._limit]
+
+
+class FakeQuery:
+    """The subset of Query used by the backend: where(filter=FieldFilter), order_by, limit, start_after."""
+
+    _OPS = {
+        "<": lambda a, b: a < b, "<=": lambda a, b: a <= b, "==": lambda a, b: a == b,
+        ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+    }
+
+    def __init__(self, collection: "FakeCollection"):
+        self._collection = collection
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._after = None
+
+    def _copy(self, **changes) -> "FakeQuery":
+        query = FakeQuery(self._collection)
+        query._filters, query._order, query._limit, query._after = list(self._filters), self._order, self._limit, self._after
+        for key, value in changes.items():
+            setattr(query, key, value)
+        return query
+
+    def where(self, field_path: str = None, op_string: str = None, value=None, filter=None) -> "FakeQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(_filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path: str, **kwargs) -> "FakeQuery":
+        return self._copy(_order=field_path)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(_limit=count)
+
+    def start_after(self, snapshot: FakeSnapshot) -> "FakeQuery":
+        # Like Firestore, the document id breaks ties between equal order values
+        return self._copy(_after=(snapshot.to_dict().get(self._order), snapshot.id))
+
+    def stream(self):
+        self._collection._client._sleep()
+        docs = [
+            snap for snap in self._collection._snapshots()
+            if all(field in snap._data and self._OPS[op](snap._data[field], value) for field, op, value in self._filters)
+        ]
+        if self._order:
+            docs = [snap for snap in docs if self._order in snap._data]
+            docs.sort(key=lambda snap: (snap._data[self._order], snap.id))
+            if self._after is not None:
+                docs = [snap for snap in docs if (snap._data[self._order], snap.id) > self._after]
+        return iter(docs[:self._limit] if self._limit is not None else docs)
+
+
+class FakeCollection:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentRef:
+        return FakeDocumentRef(self._client, f"{self.path}/{doc_id or uuid.uuid4().hex}")
+
+    def _snapshots(self) -> List[FakeSnapshot]:
+        prefix = self.path + "/"
+        with self._client._lock:
+            items = [
+                (path, copy.deepcopy(data)) for path, data in self._client._docs.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):]
+            ]
+        return [FakeSnapshot(path.rsplit("/", 1)[-1], data, FakeDocumentRef(self._client, path)) for path, data in items]
+
+    def stream(self):
+        self._client._sleep()
+        return iter(self._snapshots())
+
+    def where(self, *args, **kwargs) -> FakeQuery:
+        return FakeQuery(self).where(*args, **kwargs)
+
+    def order_by(self, field_path: str, **kwargs) -> FakeQuery:
+        return FakeQuery(self).order_by(field_path)
+
+    def find_nearest(self, vector_field: str, query_vector, distance_measure, limit: int, **kwargs) -> FakeVectorQuery:
+        return FakeVectorQuery(self, limit)
+
+
+class FakeWriteBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._ops = []
+
+    def set(self, ref: FakeDocumentRef, data: dict, merge: bool = False):
+        self._ops.append(("set", ref.path, data, merge))
+
+    def update(self, ref: FakeDocumentRef, data: dict):
+        self._ops.append(("update", ref.path, data, None))
+
+    def delete(self, ref: FakeDocumentRef):
+        self._ops.append(("delete", ref.path, None, None))
+
+    def commit(self):
+        self._client._sleep()
+        self._apply()
+
+    def _apply(self):
+        for op, path, data, merge in self._ops:
+            if op == "set":
+                self._client._apply_set(path, data, merge)
+            elif op == "update":
+                self._client._apply_update(path, data)
+            else:
+                self._client._apply_delete(path)
+        self._ops = []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Enough of firestore.Transaction for @firestore.transactional to drive it. Commits are
+    optimistic: if a document read in the transaction changed since, the commit raises
+    Aborted and the decorator retries, as Firestore does under contention.
+    """
+
+    _max_attempts = 5
+    _read_only = False
+
+    def __init__(self, client: "FakeFirestore"):
+        super().__init__(client)
+        self._id = None
+        self._reads: Dict[str, int] = {}
+
+    def _record_read(self, path: str):
+        # Called with the client lock held
+        self._reads.setdefault(path, self._client._revisions.get(path, 0))
+
+    def _clean_up(self):
+        self._ops = []
+        self._reads = {}
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        from google.api_core.exceptions import Aborted
+
+        self._client._sleep()
+        with self._client._lock:
+            changed = [path for path, revision in self._reads.items() if self._client._revisions.get(path, 0) != revision]
+            if changed:
+                self._clean_up()
+                raise Aborted(f"Transaction contention on {changed[0]}")
+            self._apply()
+        self._reads = {}
+        self._id = None
+        return []
+
+    def _rollback(self):
+        self._clean_up()
+
+
+class FakeFirestore:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self._docs: Dict[str, dict] = {}
+        # Bumped on every write to a document, for transaction conflict checks
+        self._revisions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def _sleep(self):
+        time.sleep(self.config.firestore_latency.sample_seconds())
+
+    def _apply_set(self, path: str, data: dict, merge: bool):
+        with self._lock:
+            self._revisions[path] = self._revisions.get(path, 0) + 1
+            if merge and path in self._docs:
+                _deep_merge(self._docs[path], data)
+            else:
+                self._docs[path] = {}
+                _deep_merge(self._docs[path], data)
+
+    def _apply_update(self, path: str, data: dict):
+        with self._lock:
+            if path not in self._docs:
+                raise Exception(f"404 No document to update: {path}")
+            self._revisions[path] = self._revisions.get(path, 0) + 1
+            _update_fields(self._docs[path], data)
+
+    def _apply_delete(self, path: str):
+        with self._lock:
+            self._revisions[path] = self._revisions.get(path, 0) + 1
+            self._docs.pop(path, None)
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def collections(self):
+        names = sorted({path.split("/", 1)[0] for path in self._docs})
+        return iter(FakeCollection(self, name) for name in names)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs) -> FakeTransaction:
+        return FakeTransaction(self)
+
+
+# --- Cloud Storage ---
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self._bucket = bucket
+        self.name = name
+
+    @property
+    def public_url(self) -> str:
+        return f"https://storage.fake/{self._bucket.name}/{self.name}"
+
+    @property
+    def size(self) -> Optional[int]:
+        data = self._bucket._objects.get(self.name)
+        return len(data) if data is not None else None
+
+    def upload_from_string(self, data, content_type: str = None):
+        time.sleep(self._bucket.config.storage_latency.sample_seconds())
+        self._bucket._objects[self.name] = data if isinstance(data, bytes) else str(data).encode("utf-8")
+
+    def upload_from_file(self, file_obj, content_type: str = None):
+        self.upload_from_string(file_obj.read(), content_type=content_type)
+
+    def download_as_bytes(self) -> bytes:
+        time.sleep(self._bucket.config.storage_latency.sample_seconds())
+        if self.name not in self._bucket._objects:
+            raise Exception(f"404 No such object: {self.name}")
+        return self._bucket._objects[self.name]
+
+    def make_public(self):
+        time.sleep(self._bucket.config.storage_latency.sample_seconds())
+
+    def exists(self) -> bool:
+        return self.name in self._bucket._objects
+
+    def delete(self):
+        self._bucket._objects.pop(self.name, None)
+
+    def generate_signed_url(self, **kwargs) -> str:
+        return f"https://storage.fake/upload/{self._bucket.name}/{self.name}?signature=fake"
+
+
+class FakeBucket:
+    def __init__(self, config: FakeConfig, name: str = "bench-bucket"):
+        self.config = config
+        self.name = name
+        self._objects: Dict[str, bytes] = {}
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str) -> Optional[FakeBlob]:
+        time.sleep(self.config.storage_latency.sample_seconds())
+        return FakeBlob(self, name) if name in self._objects else None
+
+    def list_blobs(self, prefix: str = "", **kwargs) -> List[FakeBlob]:
+        return [FakeBlob(self, name) for name in list(self._objects) if name.startswith(prefix)]
+
+    def copy_blob(self, blob: FakeBlob, destination_bucket: "FakeBucket", new_name: str) -> FakeBlob:
+        time.sleep(self.config.storage_latency.sample_seconds())
+        destination_bucket._objects[new_name] = self._objects[blob.name]
+        return FakeBlob(destination_bucket, new_name)
+
+    def delete_blobs(self, blobs, **kwargs):
+        for blob in blobs:
+            self._objects.pop(getattr(blob, "name", blob), None)
+
+    def exists(self) -> bool:
+        return True
+
+
+# --- Wiring ---
+
+def sample_jpeg(size=(480, 640), color=(180, 140, 120)) -> bytes:
+    """A small valid JPEG for photo uploads and generated images."""
+    try:
+        from PIL import Image
+        out = io.BytesIO()
+        Image.new("RGB", size, color=color).save(out, format="JPEG", quality=80)
+        return out.getvalue()
+    except ImportError:
+        # Minimal JPEG markers; enough for paths that only move bytes around
+        return b"\xff\xd8\xff\xe0" + bytes(2048) + b"\xff\xd9"
+
+
+def seed_workout_library(db: FakeFirestore, size: int, seed: int = 7):
+    rng = random.Random(seed)
+    focuses = [["Legs", "Glutes"], ["Upper Body", "Arms"], ["Abs", "Core"], ["Cardio", "HIIT"], ["Full Body"], ["General Fitness"]]
+    for i in range(size):
+        focus = focuses[i % len(focuses)]
+        duration = rng.choice([10, 15, 20, 25, 30, 40, 45, 60])
+        doc_id = f"bench_{i:04d}"
+        db.collection("workout_library").document(doc_id).set({
+            "id": doc_id,
+            "title": f"{duration} Min {' '.join(focus)} Workout #{i}",
+            "display_title": f"{duration} Min {focus[0]} Workout",
+            "trainer": rng.choice(["Trainer A", "Trainer B"]),
+            "url": f"https://www.youtube.com/watch?v={doc_id}",
+            "thumbnail": f"https://img.fake/{doc_id}.jpg",
+            "duration_mins": duration,
+            "focus": focus,
+            "difficulty": rng.choice(["Beginner", "Intermediate", "Advanced"]),
+            "difficulty_score": rng.randint(1, 9),
+            "difficulty_reason": ["Benchmark"],
+            "equipments": rng.choice([[], ["Dumbbells"], ["Kettlebell"]]),
+            "playlist_id": f"pl_{i % 5}",
+            "description": "Synthetic workout for load testing.",
+            "embedding": [0.0] * 8,
+        })
+
+
+# Modules that bound get_runner / generate_text_embedding by name at import time
+_RUNNER_MODULES = [
+    "backend.services.ai.core",
+    "backend.services.ai.planning",
+    "backend.services.ai.agent",
+    "backend.services.ai.vision",
+    "backend.services.ai.recommendation",
+    "backend.services.ai.image_gen",
+]
+_EMBEDDING_MODULES = [
+    "backend.services.ai.embedding",
+    "backend.services.ai.planning",
+    "backend.services.ai_service",
+]
+
+
+def install_fakes(config: Optional[FakeConfig] = None):
+    """
+    Point the backend at in-process fakes. Returns (db, bucket) so callers can
+    seed or inspect state. Call before driving the app; it is process-wide.
+    """
+    import importlib
+    from backend.core.config import settings
+    from backend.services import firebase_service
+
+    fake_config = config or FakeConfig()
+    random.seed(fake_config.seed)
+    image_bytes = sample_jpeg()
+
+    settings.GOOGLE_API_KEY = settings.GOOGLE_API_KEY or "fake-key"
+    settings.USE_MOCK_PLAN = False
+    settings.USE_MOCK_ANALYZE = False
+    settings.USE_MOCK_SUGGEST = False
+    settings.USE_MOCK_GENERATE = False
+
+    db = FakeFirestore(fake_config)
+    bucket = FakeBucket(fake_config)
+    seed_workout_library(db, fake_config.library_size, fake_config.seed)
+    firebase_service.set_db(db)
+    firebase_service.set_bucket(bucket)
+
+    def fake_get_runner(model_name: str, instruction: str = "", config: Any = None, tracer_name: str = "fitness_coach_agent", **kwargs):
+        return FakeRunner(model_name, instruction, tracer_name, fake_config, image_bytes)
+
+    def fake_generate_text_embedding(text: str, timeout: Optional[float] = None) -> list:
+        return fake_embedding(text, fake_config.embedding_dim, fake_config.embedding_latency)
+
+    for name in _RUNNER_MODULES:
+        module = importlib.import_module(name)
+        if hasattr(module, "get_runner"):
+            module.get_runner = fake_get_runner
+    for name in _EMBEDDING_MODULES:
+        module = importlib.import_module(name)
+        if hasattr(module, "generate_text_embedding"):
+            module.generate_text_embedding = fake_generate_text_embedding
+
+    return db, bucket
+
+
+def parse_latency(spec: str) -> LatencyProfile:
+    """Parse "800" or "800:300" (mean:jitter, in ms)."""
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)(?::(\d+(?:\.\d+)?))?\s*$', spec or "")
+    if not match:
+        raise ValueError(f"Invalid latency spec: {spec!r}")
+    return LatencyProfile(mean_ms=float(match.group(1)), jitter_ms=float(match.group(2) or 0))
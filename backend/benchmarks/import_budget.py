@@ -0,0 +1,99 @@
+"""
+Import-time budget check for the API.
+
+Imports backend.main in fresh interpreters and fails if the best run exceeds
+IMPORT_BUDGET_MS, or if any heavy SDK got imported eagerly. Those SDKs should
+only load on first use (see backend/core/lazy.py) or in the lifespan.
+
+    python backend/benchmarks/import_budget.py
+    python backend/benchmarks/import_budget.py --budget-ms 800 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from backend.core.config import settings
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+# Packages that must not be imported by `import backend.main`
+DEFERRED_PACKAGES = [
+    "google.adk",
+    "google.genai",
+    "google.cloud.firestore",
+    "google.cloud.storage",
+    "opik",
+    "firebase_admin",
+    "PIL",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"elapsed_ms": elapsed_ms, "modules": sorted(sys.modules)}))
+"""
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import backend.main failed:\n{result.stderr[-4000:]}")
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Top-level imports triggered by backend.main, by cumulative time
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 3:
+            top_level.append((match.group(4), int(match.group(2)) / 1000.0))
+    data["top_level"] = top_level
+    return data
+
+
+def eager_heavy_modules(modules: list) -> list:
+    loaded = set(modules)
+    return [pkg for pkg in DEFERRED_PACKAGES if pkg in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that importing the API stays within budget.")
+    parser.add_argument("--budget-ms", type=float, default=settings.IMPORT_BUDGET_MS, help="Max import time for backend.main")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports of the fastest run")
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r["elapsed_ms"])
+
+    print(f"import backend.main: best {best['elapsed_ms']:.0f} ms over {args.runs} run(s), budget {args.budget_ms:.0f} ms")
+    for name, ms in sorted(best["top_level"], key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    failures = []
+    if best["elapsed_ms"] > args.budget_ms:
+        failures.append(f"import took {best['elapsed_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    eager = eager_heavy_modules(best["modules"])
+    if eager:
+        failures.append(f"heavy packages imported eagerly: {', '.join(eager)}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from backend.benchmarks.fakes import FakeConfig, install_fakes, parse_latency
+from backend.benchmarks.scenarios import SCENARIOS, run_scenario
+
+
+def print_report(result: dict):
+    print(f"\n=== {result['scenario']} | concurrency={result['concurrency']} iterations={result['iterations']} ===")
+    print(f"wall: {result['wall_seconds']:.2f}s  iterations/s: {result['iterations_per_second']:.2f}  failed iterations: {result['failed_iterations']}")
+    header = f"{'endpoint':<24}{'count':>7}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in result["endpoints"]:
+        print(
+            f"{row['endpoint']:<24}{row['count']:>7}{row['errors']:>8}{row['throughput_rps']:>9.2f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline load test against fake Gemini, Firestore and Storage.")
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all", help="Scenario to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Scenario iterations in flight at once")
+    parser.add_argument("--iterations", type=int, default=50, help="Total scenario iterations")
+    parser.add_argument("--model-latency", default="800:300", help="Text model latency mean[:jitter] in ms")
+    parser.add_argument("--image-latency", default="4000:1000", help="Image model latency mean[:jitter] in ms")
+    parser.add_argument("--embedding-latency", default="120:40", help="Embedding latency mean[:jitter] in ms")
+    parser.add_argument("--firestore-latency", default="25:10", help="Firestore op latency mean[:jitter] in ms")
+    parser.add_argument("--vector-latency", default="80:30", help="find_nearest latency mean[:jitter] in ms")
+    parser.add_argument("--storage-latency", default="60:20", help="Storage op latency mean[:jitter] in ms")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability a model call fails with 429")
+    parser.add_argument("--library-size", type=int, default=60, help="Synthetic workout_library size")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--json", dest="json_out", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        model_latency=parse_latency(args.model_latency),
+        image_model_latency=parse_latency(args.image_latency),
+        embedding_latency=parse_latency(args.embedding_latency),
+        firestore_latency=parse_latency(args.firestore_latency),
+        vector_query_latency=parse_latency(args.vector_latency),
+        storage_latency=parse_latency(args.storage_latency),
+        rate_429=args.rate_429,
+        library_size=args.library_size,
+        seed=args.seed,
+    )
+    db, _ = install_fakes(config)
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = []
+    for name in names:
+        result = await run_scenario(name, db, args.concurrency, args.iterations)
+        print_report(result)
+        results.append(result)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"config": config.model_dump(), "results": results}, f, indent=2)
+        print(f"\nWrote {args.json_out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,215 @@
+"""
+Microbenchmarks for the pure helpers on the chat and plan hot paths.
+
+Each case is timed over candidate lists / plans of growing size. Results can be
+saved as JSON and compared against a previous run to catch regressions:
+
+    python backend/benchmarks/microbench.py --save bench.json
+    python backend/benchmarks/microbench.py --baseline bench.json --threshold 1.2
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Add backend directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from backend.services.ai.agent import (
+    _extract_desired_focus,
+    _parse_duration_request,
+    _strip_duration_terms,
+    _select_best_candidate,
+    _select_best_candidate_relaxed,
+)
+from backend.services.ai.planning import enrich_plan_with_details
+from backend.core.responses import FastJSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+
+FOCUS_CHOICES = [
+    ["Legs", "Glutes"], ["Upper Body", "Arms"], ["Abs", "Core"], ["Cardio", "HIIT"],
+    ["Full Body"], ["Back", "Chest"], ["Shoulders", "Triceps"], ["General Fitness"],
+]
+
+MESSAGES = [
+    "make it shorter, 20 mins",
+    "can I do something for legs and glutes instead? between 35 and 40 minutes",
+    "swap this for an upper body session, under 30",
+    "I want a longer cardio / HIIT workout today",
+    "give me a quick core and abs workout at least 15 mins",
+    "replace with full body, 45 minutes, no equipment please",
+]
+
+QUERIES = [
+    "Workout type: Legs, Duration: 20-30 minutes, Equipment: Bodyweight",
+    "Upper body strength 45 mins dumbbells",
+    "Low impact cardio 15 min",
+    "Core and abs, 10 to 20 minutes, no equipment",
+]
+
+
+def make_candidates(size: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    candidates = []
+    for i in range(size):
+        candidates.append({
+            "id": f"fallback_{i}" if i % 50 == 0 else f"w{i:05d}",
+            "title": f"Workout {i}",
+            "display_title": f"Workout {i}",
+            "duration_mins": rng.choice([10, 15, 20, 25, 30, 40, 45, 60, None]),
+            "focus": rng.choice(FOCUS_CHOICES),
+            "difficulty": rng.choice(["Beginner", "Intermediate", "Advanced"]),
+            "url": f"https://www.youtube.com/watch?v=w{i:05d}",
+        })
+    return candidates
+
+
+def make_plans(days: int, seed: int = 7):
+    """(final_plan, retrieved_plan) with `days` schedule entries; roughly 1 in 7 is a rest day."""
+    rng = random.Random(seed)
+    final_schedule, retrieved_schedule = [], []
+    for day in range(1, days + 1):
+        is_rest = day % 7 == 0
+        final_schedule.append({"day": day, "day_name": f"Day {day}", "is_rest": is_rest, "workout_id": None, "activity": "Workout"})
+        retrieved_schedule.append({
+            "day": day,
+            "selected_workout": None if is_rest else {
+                "id": f"w{day:05d}", "title": f"Workout {day}", "display_title": f"Workout {day}",
+                "duration_mins": rng.choice([20, 30, 45]), "focus": rng.choice(FOCUS_CHOICES),
+            },
+        })
+    return {"weekly_focus": "Bench", "schedule": final_schedule}, {"schedule": retrieved_schedule}
+
+
+def build_cases(sizes: List[int]) -> Dict[str, Callable[[], object]]:
+    """Map of case name -> zero-arg callable; inputs are prepared up front so only the helper is timed."""
+    cases: Dict[str, Callable[[], object]] = {}
+
+    cases["extract_desired_focus"] = lambda: [_extract_desired_focus(m) for m in MESSAGES]
+    cases["parse_duration_request"] = lambda: [_parse_duration_request(m, 30) for m in MESSAGES]
+    cases["strip_duration_terms"] = lambda: [_strip_duration_terms(q) for q in QUERIES]
+
+    for size in sizes:
+        candidates = make_candidates(size)
+        existing_ids = [c["id"] for c in candidates[1:7]]
+        prev_focus, next_focus = ["Legs", "Glutes"], ["Cardio"]
+
+        cases[f"select_best_candidate[{size}]"] = (
+            lambda c=candidates, e=existing_ids: _select_best_candidate(c, e, prev_focus, next_focus, 30, None)
+        )
+        # Tight duration bounds: most candidates are filtered, only untimed ones pass
+        cases[f"select_best_candidate_tight[{size}]"] = (
+            lambda c=candidates, e=existing_ids: _select_best_candidate(c, e, prev_focus, next_focus, 5, 1)
+        )
+        cases[f"select_best_candidate_relaxed[{size}]"] = (
+            lambda c=candidates, e=existing_ids: _select_best_candidate_relaxed(c, e, prev_focus, next_focus, ["Core"])
+        )
+
+        final_plan, retrieved_plan = make_plans(size)
+        # enrich mutates its input, so each call gets a fresh copy; the copy cost is timed separately
+        cases[f"enrich_plan_with_details[{size}]"] = (
+            lambda f=final_plan, r=retrieved_plan: enrich_plan_with_details(copy.deepcopy(f), r)
+        )
+        cases[f"enrich_plan_copy_only[{size}]"] = lambda f=final_plan: copy.deepcopy(f)
+
+        # Response rendering for a hydrated plan: FastAPI's default path vs orjson
+        hydrated = enrich_plan_with_details(copy.deepcopy(final_plan), retrieved_plan)
+        cases[f"render_plan_default[{size}]"] = lambda p=hydrated: JSONResponse(jsonable_encoder({"plan": p})).body
+        cases[f"render_plan_orjson[{size}]"] = lambda p=hydrated: FastJSONResponse({"plan": p}).body
+
+    return cases
+
+
+def time_case(fn: Callable[[], object], repeats: int, min_time: float) -> Dict[str, float]:
+    """Like timeit.autorange: grow the loop count until one repeat takes min_time, then take `repeats` samples."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+
+    return {
+        "loops": loops,
+        "min_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+        "stdev_us": (statistics.stdev(samples) if len(samples) > 1 else 0.0) * 1e6,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Names of cases whose median got slower than baseline * threshold."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("median_us"):
+            continue
+        ratio = result["median_us"] / base["median_us"]
+        result["vs_baseline"] = ratio
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for agent selection and plan enrichment helpers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Candidate list / schedule sizes")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this substring")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a JSON file written by --save")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Fail if median is slower than baseline by this factor")
+    args = parser.parse_args()
+
+    cases = {name: fn for name, fn in build_cases(args.sizes).items() if args.filter in name}
+    results: Dict[str, dict] = {}
+    for name, fn in cases.items():
+        results[name] = time_case(fn, args.repeats, args.min_time)
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f).get("results", {}), args.threshold)
+
+    print(f"{'case':<44}{'median us':>12}{'min us':>12}{'stdev':>10}{'vs base':>10}")
+    for name, r in results.items():
+        ratio = f"{r['vs_baseline']:.2f}x" if "vs_baseline" in r else "-"
+        flag = "  <-- regression" if name in regressions else ""
+        print(f"{name:<44}{r['median_us']:>12.2f}{r['min_us']:>12.2f}{r['stdev_us']:>10.2f}{ratio:>10}{flag}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nWrote {args.save}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.2f}x baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
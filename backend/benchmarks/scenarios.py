@@ -0,0 +1,194 @@
+"""
+Scenario drivers for the offline load test.
+
+Each scenario is one "virtual user" iteration against the ASGI app in-process.
+Requests go through httpx.ASGITransport, so routing, validation, dependencies and
+middleware all run; only Google services are replaced (see fakes.py).
+"""
+import asyncio
+import math
+import time
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from fastapi import Header, HTTPException
+
+from backend.benchmarks.fakes import FakeFirestore, sample_jpeg
+
+API = "/api/v1"
+
+
+async def _bench_verify_token(authorization: Optional[str] = Header(None)):
+    # "Bearer <uid>" -> a decoded token for that uid; skips Firebase entirely
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
+    return {"uid": authorization.split(" ", 1)[1].strip()}
+
+
+def build_app():
+    """Import the app and swap auth for the benchmark token. The lifespan is not run."""
+    from backend.main import app
+    from backend.core.deps import verify_firebase_token
+
+    app.dependency_overrides[verify_firebase_token] = _bench_verify_token
+    return app
+
+
+class LatencyRecorder:
+    """Collects per-endpoint latencies and status codes."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            self.samples[name].append(time.perf_counter() - start)
+            raise
+        self.samples[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(recorder: LatencyRecorder, wall_seconds: float) -> List[dict]:
+    rows = []
+    for name in sorted(recorder.samples):
+        values = recorder.samples[name]
+        rows.append({
+            "endpoint": name,
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "throughput_rps": len(values) / wall_seconds if wall_seconds else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": max(values) * 1000 if values else 0.0,
+        })
+    return rows
+
+
+# --- Scenarios ---
+
+async def anonymous_funnel(client: httpx.AsyncClient, recorder: LatencyRecorder, db: FakeFirestore, photo: bytes):
+    """upload -> analyze -> generate x3 (parallel, like the UI) -> suggest -> plan -> results."""
+    response = await recorder.request(
+        client, "anonymous.upload", "POST", f"{API}/anonymous/upload",
+        files={"file": ("photo.jpg", photo, "image/jpeg")},
+        data={"session_id": str(uuid.uuid4())},
+    )
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+
+    await recorder.request(client, "anonymous.analyze", "POST", f"{API}/anonymous/analyze", json={"session_id": session_id})
+    await asyncio.gather(*[
+        recorder.request(client, "anonymous.generate", "POST", f"{API}/anonymous/generate", json={"session_id": session_id, "goal": goal})
+        for goal in ("lean", "athletic", "muscle")
+    ])
+    await recorder.request(client, "anonymous.suggest", "POST", f"{API}/anonymous/suggest", json={"session_id": session_id})
+    await recorder.request(client, "anonymous.plan", "POST", f"{API}/anonymous/plan", json={"goal": "athletic"})
+    await recorder.request(client, "anonymous.results", "GET", f"{API}/anonymous/results/{session_id}")
+
+
+# Days of the seeded plan that are rest days; act_chat adjusts a day next to one
+SEED_REST_DAYS = (3, 7)
+
+
+def _seed_user_plan(db: FakeFirestore, uid: str):
+    workouts = [snap.to_dict() for snap in db.collection("workout_library").stream()]
+    day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    schedule = []
+    for i, day_name in enumerate(day_names):
+        workout = workouts[i % len(workouts)] if workouts and i + 1 not in SEED_REST_DAYS else None
+        schedule.append({
+            "day": i + 1,
+            "day_name": day_name,
+            "is_rest": workout is None,
+            "activity": workout["title"] if workout else "Rest",
+            "workout_id": workout["id"] if workout else None,
+            # Rest days as older plans stored them, with explicit null details
+            "workout_details": {k: v for k, v in workout.items() if k != "embedding"} if workout else None,
+        })
+    db.collection("user_progress").document(uid).set({
+        "weeklyPlan": {"weekly_focus": "Benchmark", "schedule": schedule},
+        "actPhaseStarted": True,
+    })
+
+
+async def act_chat(client: httpx.AsyncClient, recorder: LatencyRecorder, db: FakeFirestore, photo: bytes):
+    """Adjust a seeded plan through /act/chat, using the stored plan like the app does."""
+    uid = f"bench-{uuid.uuid4().hex[:12]}"
+    _seed_user_plan(db, uid)
+    await recorder.request(
+        client, "act.chat", "POST", f"{API}/act/chat",
+        headers={"Authorization": f"Bearer {uid}"},
+        json={"message": "make it shorter, 20 mins", "day_id": "day-2"},
+    )
+
+
+async def act_generate_plan(client: httpx.AsyncClient, recorder: LatencyRecorder, db: FakeFirestore, photo: bytes):
+    """Force a fresh RAG plan for a user (skeleton -> retrieval -> assembly)."""
+    uid = f"bench-{uuid.uuid4().hex[:12]}"
+    await recorder.request(
+        client, "act.generate-plan", "POST", f"{API}/act/generate-plan",
+        headers={"Authorization": f"Bearer {uid}"},
+        json={"force_refresh": True, "goal": "athletic"},
+    )
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[None]]] = {
+    "anonymous-funnel": anonymous_funnel,
+    "act-chat": act_chat,
+    "act-generate-plan": act_generate_plan,
+}
+
+
+async def run_scenario(name: str, db: FakeFirestore, concurrency: int, iterations: int, timeout: float = 300.0) -> dict:
+    """
+    Run `iterations` scenario iterations with at most `concurrency` in flight.
+    Returns {"scenario", "wall_seconds", "iterations_per_second", "failed_iterations", "endpoints"}.
+    """
+    scenario = SCENARIOS[name]
+    app = build_app()
+    recorder = LatencyRecorder()
+    photo = sample_jpeg()
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+        async def one_iteration():
+            nonlocal failed
+            async with semaphore:
+                try:
+                    await scenario(client, recorder, db, photo)
+                except Exception:
+                    failed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one_iteration() for _ in range(iterations)])
+        wall_seconds = time.perf_counter() - start
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "iterations": iterations,
+        "wall_seconds": wall_seconds,
+        "iterations_per_second": iterations / wall_seconds if wall_seconds else 0.0,
+        "failed_iterations": failed,
+        "endpoints": summarize(recorder, wall_seconds),
+    }
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Define BASE_DIR first to locate .env correctly
@@ -16,5 +17,84 @@ class Settings:
     USE_MOCK_ANALYZE = os.getenv("USE_MOCK_ANALYZE", "false").lower() == "true"
     USE_MOCK_SUGGEST = os.getenv("USE_MOCK_SUGGEST", "false").lower() == "true"
     USE_MOCK_GENERATE = os.getenv("USE_MOCK_GENERATE", "false").lower() == "true"
+    # Send one downscaled 2x2 composite to the suggest model instead of four full-size images
+    USE_COMPOSITE_SUGGEST = os.getenv("USE_COMPOSITE_SUGGEST", "false").lower() == "true"
+    COMPOSITE_TILE_SIZE = int(os.getenv("COMPOSITE_TILE_SIZE", "512"))
+    COMPOSITE_JPEG_QUALITY = int(os.getenv("COMPOSITE_JPEG_QUALITY", "85"))
+    # Short-lived local cache for Storage blobs we just uploaded or downloaded
+    BLOB_CACHE_ENABLED = os.getenv("BLOB_CACHE_ENABLED", "true").lower() == "true"
+    BLOB_CACHE_MAX_MEMORY_MB = int(os.getenv("BLOB_CACHE_MAX_MEMORY_MB", "64"))
+    BLOB_CACHE_MAX_DISK_MB = int(os.getenv("BLOB_CACHE_MAX_DISK_MB", "512"))
+    BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fitness_coach_blob_cache"))
+    BLOB_CACHE_TTL_SECONDS = int(os.getenv("BLOB_CACHE_TTL_SECONDS", "1800"))
+    # Direct-to-Storage uploads via V4 signed URLs
+    SIGNED_UPLOAD_EXPIRY_MINUTES = int(os.getenv("SIGNED_UPLOAD_EXPIRY_MINUTES", "15"))
+    SIGNED_UPLOAD_MAX_BYTES = int(os.getenv("SIGNED_UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+    SIGNED_UPLOAD_PUBLIC_READ = os.getenv("SIGNED_UPLOAD_PUBLIC_READ", "true").lower() == "true"
+    # anonymous_sessions: read-through cache with write-behind merges flushed every interval (0 = write-through)
+    ANON_SESSION_CACHE_ENABLED = os.getenv("ANON_SESSION_CACHE_ENABLED", "true").lower() == "true"
+    ANON_SESSION_CACHE_MAX_SIZE = int(os.getenv("ANON_SESSION_CACHE_MAX_SIZE", "5000"))
+    ANON_SESSION_CACHE_TTL_SECONDS = int(os.getenv("ANON_SESSION_CACHE_TTL_SECONDS", "300"))
+    ANON_SESSION_FLUSH_INTERVAL_SECONDS = float(os.getenv("ANON_SESSION_FLUSH_INTERVAL_SECONDS", "0.5"))
+    # /anonymous/migrate: false keeps referencing the session's photos in place; true copies them under users/{uid}/
+    MIGRATE_COPY_BLOBS = os.getenv("MIGRATE_COPY_BLOBS", "false").lower() == "true"
+    # Background sweeper for expired anonymous sessions and their Storage objects; interval 0 disables it
+    SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "3600"))
+    SESSION_SWEEP_PAGE_SIZE = int(os.getenv("SESSION_SWEEP_PAGE_SIZE", "200"))
+    SESSION_SWEEP_MAX_PER_RUN = int(os.getenv("SESSION_SWEEP_MAX_PER_RUN", "5000"))
+    SESSION_SWEEP_CONCURRENCY = int(os.getenv("SESSION_SWEEP_CONCURRENCY", "8"))
+    SESSION_SWEEP_MAX_DELETES_PER_SECOND = float(os.getenv("SESSION_SWEEP_MAX_DELETES_PER_SECOND", "50"))
+    # Verified Firebase ID token cache (entries never outlive the token's exp)
+    AUTH_TOKEN_CACHE_MAX_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAX_SIZE", "10000"))
+    AUTH_TOKEN_CACHE_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "600"))
+    AUTH_TOKEN_CACHE_EXP_MARGIN_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_EXP_MARGIN_SECONDS", "30"))
+    # Logging: LOG_FORMAT is "json" or "text"; LOG_LEVELS is e.g. "backend.services.ai=DEBUG,opik=WARNING"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    LOG_DEBUG_RATE_LIMIT = int(os.getenv("LOG_DEBUG_RATE_LIMIT", "20"))
+    LOG_DEBUG_RATE_INTERVAL_SECONDS = float(os.getenv("LOG_DEBUG_RATE_INTERVAL_SECONDS", "60"))
+    # Opik tracing is configured once in the app lifespan (or on first get_runner in scripts)
+    OPIK_ENABLED = os.getenv("OPIK_ENABLED", "true").lower() == "true"
+    # Identical get_runner() calls share a Runner; 0 builds a new one per call
+    RUNNER_CACHE_MAX_SIZE = int(os.getenv("RUNNER_CACHE_MAX_SIZE", "32"))
+    # workout_library snapshot used for plan generation; 0 disables caching
+    WORKOUT_CATALOG_TTL_SECONDS = int(os.getenv("WORKOUT_CATALOG_TTL_SECONDS", "300"))
+    # Bulk Firestore writes in maintenance scripts (seed/migrate/reset); 500 is the per-request cap
+    BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "500"))
+    BULK_WRITE_MAX_OPS_PER_SECOND = int(os.getenv("BULK_WRITE_MAX_OPS_PER_SECOND", "5000"))
+    BULK_WRITE_MAX_ATTEMPTS = int(os.getenv("BULK_WRITE_MAX_ATTEMPTS", "8"))
+    # YouTube Data API response cache for the seeders: online | refresh | replay | off
+    YOUTUBE_CACHE_MODE = os.getenv("YOUTUBE_CACHE_MODE", "online").lower()
+    YOUTUBE_CACHE_DIR = os.getenv("YOUTUBE_CACHE_DIR", os.path.join(BASE_DIR, ".youtube_cache"))
+    YOUTUBE_CACHE_TTL_SECONDS = int(os.getenv("YOUTUBE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    # Startup warmup: steps run in the lifespan; /readyz reports 503 until they finish
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_STEPS = os.getenv("WARMUP_STEPS", "tracing,firestore,storage,auth_certs,ai_sdk,runners,catalog")
+    WARMUP_IN_BACKGROUND = os.getenv("WARMUP_IN_BACKGROUND", "false").lower() == "true"
+    WARMUP_STEP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_STEP_TIMEOUT_SECONDS", "20"))
+    # Dependency health probes run in the background; /connectivity/* answers from the cache
+    HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "60"))
+    HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "10"))
+    HEALTH_CHECK_MIN_REFRESH_SECONDS = float(os.getenv("HEALTH_CHECK_MIN_REFRESH_SECONDS", "10"))
+    HEALTH_CHECK_AI_MODEL = os.getenv("HEALTH_CHECK_AI_MODEL", "gemini-2.0-flash")
+    # /connectivity/ai?deep=true sends a real prompt (unauthenticated, uses model quota); off unless debugging
+    HEALTH_CHECK_DEEP_AI_ENABLED = os.getenv("HEALTH_CHECK_DEEP_AI_ENABLED", "false").lower() == "true"
+    # Budget for `import backend.main`, checked by benchmarks/import_budget.py
+    IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1500"))
+    # gzip for responses of at least RESPONSE_GZIP_MIN_SIZE bytes; 0 disables compression
+    RESPONSE_GZIP_MIN_SIZE = int(os.getenv("RESPONSE_GZIP_MIN_SIZE", "1024"))
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+    # Deadline budgets for AI-backed routes; model and search calls get whatever is left (see core/deadline.py)
+    CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "30"))
+    PLAN_DEADLINE_SECONDS = float(os.getenv("PLAN_DEADLINE_SECONDS", "90"))
+    ANALYZE_DEADLINE_SECONDS = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "45"))
+    IMAGE_DEADLINE_SECONDS = float(os.getenv("IMAGE_DEADLINE_SECONDS", "90"))
+    # Caps for a single model call (retries included) and a single workout search, in or out of a request
+    AI_CALL_TIMEOUT_SECONDS = float(os.getenv("AI_CALL_TIMEOUT_SECONDS", "60"))
+    SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "10"))
+    # A 429 retry is only attempted if its backoff plus this much time for the attempt still fits
+    AI_RETRY_MIN_ATTEMPT_SECONDS = float(os.getenv("AI_RETRY_MIN_ATTEMPT_SECONDS", "5"))
 
 settings = Settings()
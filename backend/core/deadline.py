@@ -0,0 +1,164 @@
+"""
+Request deadlines.
+
+A route decorated with `request_deadline(seconds)` runs under a budget held in a contextvar.
+Model and search calls size their timeouts from what is left (`remaining()` / `call_deadline`),
+and the endpoint is cancelled when the budget runs out (504) or the client disconnects, so
+in-flight upstream calls stop instead of finishing for nobody.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+from backend.core.metrics import HTTP_CLIENT_DISCONNECTS_TOTAL, HTTP_DEADLINE_EXCEEDED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() deadline for the current request or call; None means unbounded
+_deadline_var: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+_REQUEST_PARAM = "_deadline_request"
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current deadline ran out before the call finished."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (negative once past it), or None without one."""
+    deadline = _deadline_var.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def timeout_for(cap: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout for one blocking call (e.g. an RPC in an executor thread, which cannot be
+    cancelled): the remaining budget, capped at `cap`. Raises DeadlineExceeded if none is left.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the call started")
+    if cap is None:
+        return left
+    return cap if left is None else min(cap, left)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Run the block under a deadline `seconds` from now; an enclosing, earlier deadline wins."""
+    target = time.monotonic() + seconds
+    current = _deadline_var.get()
+    token = _deadline_var.set(target if current is None else min(current, target))
+    try:
+        yield
+    finally:
+        _deadline_var.reset(token)
+
+
+@asynccontextmanager
+async def call_deadline(cap: float):
+    """
+    Bound one async call by `cap` seconds and the enclosing deadline, whichever is sooner.
+    The body is cancelled on expiry and DeadlineExceeded is raised in its place.
+    """
+    with deadline(cap):
+        timeout = timeout_for()
+        try:
+            async with asyncio.timeout(timeout):
+                yield
+        except DeadlineExceeded:
+            raise
+        except TimeoutError as e:
+            raise DeadlineExceeded(f"Call exceeded its {timeout:.1f}s budget") from e
+
+
+def _caused_by_timeout(exc: BaseException) -> bool:
+    while exc is not None:
+        if isinstance(exc, TimeoutError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+async def _wait_for_disconnect(request: Request):
+    # FastAPI has read the body before the endpoint runs, so the next message on the
+    # receive channel is http.disconnect (GET requests first yield one empty http.request)
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _run_until_deadline(call, request: Request):
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    # The task copies the current context, deadline included
+    task = asyncio.ensure_future(call)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait((task, watcher), timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # Let the endpoint unwind (closing model streams, deleting sessions) before we answer
+            await asyncio.gather(task, return_exceptions=True)
+
+    if task in done:
+        try:
+            return task.result()
+        except HTTPException as e:
+            # Routes wrap failures as HTTPException(500, str(e)); a timed-out upstream call is a 504
+            if e.status_code != 500 or not _caused_by_timeout(e):
+                raise
+            HTTP_DEADLINE_EXCEEDED_TOTAL.inc(route=route)
+            raise HTTPException(status_code=504, detail=e.detail) from e
+        except TimeoutError as e:
+            HTTP_DEADLINE_EXCEEDED_TOTAL.inc(route=route)
+            raise HTTPException(status_code=504, detail=str(e) or "Request deadline exceeded") from e
+
+    if watcher in done:
+        HTTP_CLIENT_DISCONNECTS_TOTAL.inc(route=route)
+        logger.info("Client disconnected; cancelled %s", route)
+        # Nobody is listening; 499 is only for logs and metrics
+        return Response(status_code=499)
+
+    HTTP_DEADLINE_EXCEEDED_TOTAL.inc(route=route)
+    logger.warning("Deadline exceeded; cancelled %s", route)
+    raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+
+def request_deadline(seconds: float):
+    """
+    Route decorator: run the endpoint under a `seconds` budget, cancelling it with a 504 when
+    the budget runs out and with an (unsent) 499 when the client disconnects first. Endpoints
+    without a `Request` parameter get one injected for disconnect detection.
+    """
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        request_param = next((p.name for p in signature.parameters.values() if p.annotation is Request), None)
+        inject = request_param is None
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.pop(_REQUEST_PARAM) if inject else kwargs[request_param]
+            with deadline(seconds):
+                return await _run_until_deadline(endpoint(*args, **kwargs), request)
+
+        if inject:
+            extra = inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), extra])
+        return wrapper
+
+    return decorator
@@ -1,14 +1,117 @@
+import asyncio
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
-import firebase_admin
-from firebase_admin import auth as firebase_auth
 from fastapi import Header, HTTPException
 
+from backend.core.config import settings
+from backend.core.lazy import lazy_import
+from backend.core.metrics import registry, AUTH_VERIFY_SECONDS
+
 logger = logging.getLogger(__name__)
 
+firebase_admin = lazy_import("firebase_admin")
+firebase_auth = lazy_import("firebase_admin.auth")
+
+# Verified tokens keyed by sha256(token) -> (decoded_token, cache_until)
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+_token_stats = {
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "verifications": 0,
+    "failures": 0,
+    "verify_ms_total": 0.0,
+    "verify_ms_max": 0.0,
+}
+
+
+def _token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+
+def _get_cached_token(key: str) -> Optional[dict]:
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            _token_stats["cache_misses"] += 1
+            return None
+        decoded_token, cache_until = entry
+        if time.time() >= cache_until:
+            del _token_cache[key]
+            _token_stats["cache_misses"] += 1
+            return None
+        _token_cache.move_to_end(key)
+        _token_stats["cache_hits"] += 1
+        return decoded_token
+
+
+def _cache_token(key: str, decoded_token: dict):
+    # Never serve a token past its own exp; keep a small margin for clock skew
+    exp = decoded_token.get("exp")
+    cache_until = time.time() + settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+    if isinstance(exp, (int, float)):
+        cache_until = min(cache_until, exp - settings.AUTH_TOKEN_CACHE_EXP_MARGIN_SECONDS)
+    if cache_until <= time.time():
+        return
+
+    with _token_cache_lock:
+        _token_cache[key] = (decoded_token, cache_until)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > settings.AUTH_TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+
+
+def _verify_token_timed(id_token: str) -> dict:
+    start = time.perf_counter()
+    try:
+        return firebase_auth.verify_id_token(id_token)
+    finally:
+        elapsed = time.perf_counter() - start
+        AUTH_VERIFY_SECONDS.observe(elapsed)
+        elapsed_ms = elapsed * 1000
+        with _token_cache_lock:
+            _token_stats["verifications"] += 1
+            _token_stats["verify_ms_total"] += elapsed_ms
+            _token_stats["verify_ms_max"] = max(_token_stats["verify_ms_max"], elapsed_ms)
+
+
+def get_token_cache_stats() -> dict:
+    with _token_cache_lock:
+        stats = dict(_token_stats)
+        stats["cache_size"] = len(_token_cache)
+    verifications = stats["verifications"]
+    stats["verify_ms_avg"] = stats["verify_ms_total"] / verifications if verifications else 0.0
+    return stats
+
 
-def verify_firebase_token(authorization: Optional[str] = Header(None)):
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
+
+
+def warm_token_verifier() -> bool:
+    """
+    Fetch Google's ID token signing certs once so the first authenticated request
+    does not pay for it. firebase_admin keeps them in an HTTP cache that honours Cache-Control.
+    """
+    if not firebase_admin._apps:
+        return False
+    try:
+        from firebase_admin import _token_gen
+        client = firebase_auth._get_client(None)
+        client._token_verifier.request(url=_token_gen.ID_TOKEN_CERT_URI, method="GET")
+        return True
+    except Exception as exc:
+        logger.warning("Token verifier warmup failed: %s", exc)
+        return False
+
+
+async def verify_firebase_token(authorization: Optional[str] = Header(None)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
 
@@ -16,9 +119,31 @@ def verify_firebase_token(authorization: Optional[str] = Header(None)):
         raise HTTPException(status_code=503, detail="Firebase Admin SDK not initialized")
 
     id_token = authorization.split(" ", 1)[1].strip()
+    key = _token_key(id_token)
+
+    cached = _get_cached_token(key)
+    if cached is not None:
+        return cached
+
     try:
-        decoded_token = firebase_auth.verify_id_token(id_token)
-        return decoded_token
+        # RSA verification (and the occasional cert fetch) is blocking, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        decoded_token = await loop.run_in_executor(None, _verify_token_timed, id_token)
     except Exception as exc:
+        with _token_cache_lock:
+            _token_stats["failures"] += 1
         logger.warning("Token verification failed: %s", exc)
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    _cache_token(key, decoded_token)
+    return decoded_token
+
+
+def _token_cache_gauges() -> dict:
+    return {
+        f"auth_token_{key}": (f"Firebase ID token cache {key.replace('_', ' ')}", value)
+        for key, value in get_token_cache_stats().items()
+    }
+
+
+registry.register_gauge_collector(_token_cache_gauges)
@@ -0,0 +1,34 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    Lets hot modules keep `types.Part(...)`-style call sites while deferring
+    heavy SDK imports (google.genai, firebase_admin, ...) until they are needed.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            # import_module holds the import lock, so concurrent first use is safe
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
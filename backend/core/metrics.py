@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Latency buckets in seconds, from cache hits up to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = series
+            series[idx] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        # Callbacks returning {metric_name: (documentation, value)} for gauges computed at scrape time
+        self._gauge_collectors: List[Callable[[], Dict[str, Tuple[str, float]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_gauge_collector(self, collector: Callable[[], Dict[str, Tuple[str, float]]]):
+        with self._lock:
+            self._gauge_collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._gauge_collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                gauges = collector()
+            except Exception:
+                continue
+            for name, (documentation, value) in gauges.items():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- Metrics used across the backend ---
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Route handler latency", ("method", "route", "status")
+)
+HTTP_DEADLINE_EXCEEDED_TOTAL = registry.counter(
+    "http_request_deadline_exceeded_total", "Requests answered 504 because their deadline budget ran out", ("route",)
+)
+HTTP_CLIENT_DISCONNECTS_TOTAL = registry.counter(
+    "http_request_client_disconnects_total", "Requests cancelled because the client disconnected", ("route",)
+)
+AI_CALL_SECONDS = registry.histogram(
+    "ai_agent_call_seconds", "run_agent latency per call site", ("tracer_name", "model", "status")
+)
+AI_RETRIES_TOTAL = registry.counter(
+    "ai_agent_retries_total", "run_agent retries after 429/RESOURCE_EXHAUSTED", ("tracer_name", "model")
+)
+AI_RETRIES_SKIPPED_TOTAL = registry.counter(
+    "ai_agent_retries_skipped_total", "429 retries not attempted because they would not fit the remaining deadline", ("tracer_name", "model")
+)
+AI_FIRST_TOKEN_SECONDS = registry.histogram(
+    "ai_agent_first_token_seconds", "stream_agent time from call start to first streamed text", ("tracer_name", "model")
+)
+AI_EARLY_EXIT_TOTAL = registry.counter(
+    "ai_agent_early_exit_total", "stream_agent calls closed once the caller's completion predicate was met", ("tracer_name", "model")
+)
+PLAN_STAGE_SECONDS = registry.histogram(
+    "plan_generation_stage_seconds", "generate_weekly_plan_rag latency per stage", ("stage",)
+)
+WORKOUT_SEARCH_STAGE_SECONDS = registry.histogram(
+    "workout_search_stage_seconds", "search_workouts_tool latency per stage", ("stage",)
+)
+AUTH_VERIFY_SECONDS = registry.histogram(
+    "auth_token_verify_seconds", "Firebase ID token verification latency on cache miss"
+)
+FIRESTORE_OP_SECONDS = registry.histogram(
+    "firestore_op_seconds", "Firestore operation latency", ("op",)
+)
+STORAGE_OP_SECONDS = registry.histogram(
+    "storage_op_seconds", "Cloud Storage operation latency", ("op",)
+)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,58 @@
+import datetime
+import functools
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def _default(obj: Any):
+    # orjson handles datetime but not subclasses such as Firestore's DatetimeWithNanoseconds
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    return jsonable_encoder(obj)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; anything orjson can't encode falls back to jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(endpoint):
+    """
+    Return the endpoint's dict as a FastJSONResponse. Setting response_class alone is not
+    enough: FastAPI still runs jsonable_encoder over plain return values, which is most of
+    the cost for plan-sized payloads. Returned Response objects pass through untouched.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response):
+            return result
+        return FastJSONResponse(result)
+
+    return wrapper
+
+
+def etag_json(request: Request, content: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    FastJSONResponse with a weak ETag over the body, or an empty 304 when the client's
+    If-None-Match already has it. Weak because gzip may re-encode the same representation.
+    """
+    body = dumps(content)
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": "private, no-cache"}
+    # If-None-Match uses weak comparison: W/"x" and "x" match
+    candidates = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag.removeprefix("W/") in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -1,19 +1,51 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from backend.api import connectivity
-from backend.services.firebase_service import initialize_firebase
+from backend.services.firebase_service import initialize_firebase, flush_anonymous_sessions
+from backend.core.config import settings
+from backend.core.logging_config import setup_logging, shutdown_logging, request_id_var, new_request_id
+from backend.core.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from backend.services.warmup_service import run_warmup, get_warmup_state, is_ready
+from backend.services.health_service import health_monitor
+from backend.services.sweeper_service import session_sweeper
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    setup_logging()
     # Startup: Initialize Firebase
-    print("Initializing Firebase...")
+    logger.info("Initializing Firebase...")
     if initialize_firebase():
-        print("Firebase initialized successfully")
+        logger.info("Firebase initialized successfully")
+    else:
+        logger.error("Failed to initialize Firebase")
+    # Warm connections, runners, the workout catalog and auth certs before taking traffic
+    # (or alongside it when WARMUP_IN_BACKGROUND; /readyz reports progress either way)
+    warmup_task = None
+    if settings.WARMUP_IN_BACKGROUND:
+        warmup_task = asyncio.create_task(run_warmup())
     else:
-        print("Failed to initialize Firebase")
+        await run_warmup()
+    # Dependency probes run on an interval so /connectivity/* never blocks on them
+    health_monitor.start()
+    # Expired anonymous sessions (and their photos) are cleaned up off the request path
+    session_sweeper.start()
     yield
-    # Shutdown logic if needed
+    await session_sweeper.stop()
+    await health_monitor.stop()
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    # Write out anonymous session changes still queued in the write-behind cache
+    await asyncio.get_running_loop().run_in_executor(None, flush_anonymous_sessions)
+    # Shutdown: flush queued log records
+    shutdown_logging()
 
 app = FastAPI(title="Fitness Coach API", description="Backend for Fitness Coach Application", lifespan=lifespan)
 
@@ -26,6 +58,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Plans and session results are large, repetitive JSON; compress anything past the threshold
+if settings.RESPONSE_GZIP_MIN_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.RESPONSE_GZIP_MIN_SIZE, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    # Correlate all log lines for this request; honour an upstream X-Request-ID if present
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        request_id_var.reset(token)
+        # Label by route template (not raw path) to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Include routers
 app.include_router(connectivity.router, prefix="/api/v1", tags=["connectivity"])
 from backend.api.routers import observe, decide, act, anonymous
@@ -39,3 +98,18 @@ app.include_router(anonymous.router, prefix="/api/v1", tags=["anonymous"])
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "Fitness Coach Backend Running. Go to /docs for API documentation."}
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    # Liveness: the process is up and serving
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    # Readiness: warmup has finished; load balancers should hold traffic until then
+    state = get_warmup_state()
+    return JSONResponse(state, status_code=200 if is_ready() else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -20,7 +20,7 @@ async def main():
         print("\n--- Verification ---")
         schedule = plan.get("schedule", [])
         for day in schedule:
-            details = day.get("workout_details", {})
+            details = day.get("workout_details") or {}
             url = details.get("url")
             thumbnail = details.get("thumbnail")
             title = details.get("title")
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend.services.catalog_service import get_workout_catalog, get_workout_map
+from backend.services.firebase_service import get_db
+from backend.services.bulk_write_service import BulkWriteJob
+from backend.services.plan_service import compact_progress_plans
+
+def migrate_plans(dry_run: bool = False):
+    print("Starting migration of user_progress plans to the compact schema...")
+    db = get_db()
+    if not db:
+        print("Database connection failed.")
+        return
+
+    # Details of workouts missing from the catalog stay embedded; nothing could restore them
+    workout_map = get_workout_map(get_workout_catalog())
+    if not workout_map:
+        print("Workout catalog is empty; refusing to strip workout details.")
+        return
+
+    docs = list(db.collection('user_progress').stream())
+    print(f"Found {len(docs)} user_progress documents to check.")
+
+    migrated = 0
+    saved_bytes = 0
+    with BulkWriteJob(db, "Compact plan migration", progress=print) as job:
+        for doc in docs:
+            data = doc.to_dict() or {}
+            updates = compact_progress_plans(data, workout_map)
+            if not updates:
+                continue
+            migrated += 1
+            saved_bytes += sum(len(repr(data.get(field))) - len(repr(value)) for field, value in updates.items())
+            if dry_run:
+                print(f"Would compact {doc.id}: {', '.join(sorted(updates))}")
+            else:
+                # Whole-field replacement: update() does not merge into the old maps
+                job.update(doc.reference, updates)
+
+    for failure in job.failures:
+        print(f"Failed to update {failure['path']}: {failure['message']}")
+    action = "Would compact" if dry_run else "Compacted"
+    print(f"Migration complete. {action} {migrated} documents (~{saved_bytes // 1024} KiB of embedded workout details).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite stored weekly plans to keep workout ids instead of embedded workout_details.")
+    parser.add_argument("--dry_run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    migrate_plans(dry_run=args.dry_run)
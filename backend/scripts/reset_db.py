@@ -6,6 +6,7 @@ import argparse
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from backend.services.firebase_service import get_db
+from backend.services.bulk_write_service import BulkWriteJob
 
 def reset_workout_library():
     print("Initializing Firebase...")
@@ -15,35 +16,23 @@ def reset_workout_library():
         return
 
     collection_ref = db.collection('workout_library')
-    docs = list(collection_ref.stream())
+    # Only references are needed; don't download documents (and their embeddings) just to delete them
+    refs = list(collection_ref.list_documents(page_size=1000))
     
-    if not docs:
+    if not refs:
         print("Collection 'workout_library' is already empty.")
         return
 
-    print(f"Found {len(docs)} documents in 'workout_library'. Deleting...")
+    print(f"Found {len(refs)} documents in 'workout_library'. Deleting...")
     
-    batch = db.batch()
-    count = 0
-    total_deleted = 0
-    
-    for doc in docs:
-        batch.delete(doc.reference)
-        count += 1
-        
-        # Commit every 20 deletes (limit is 500, but safer to be smaller)
-        if count >= 20:
-            batch.commit()
-            total_deleted += count
-            print(f"Deleted {total_deleted} documents...")
-            batch = db.batch()
-            count = 0
-            
-    if count > 0:
-        batch.commit()
-        total_deleted += count
-        
-    print(f"Successfully deleted {total_deleted} documents from 'workout_library'.")
+    with BulkWriteJob(db, "Delete workout_library", progress=print) as job:
+        for ref in refs:
+            job.delete(ref)
+
+    stats = job.stats()
+    print(f"Successfully deleted {stats['written']} documents from 'workout_library'.")
+    if stats['failed']:
+        print(f"Failed to delete {stats['failed']} documents: {[f['path'] for f in job.failures]}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Reset workout_library collection")
@@ -3,12 +3,11 @@ import os
 import sys
 import json
 import argparse
+import hashlib
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 
-# Google API Client
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from pydantic import BaseModel, Field, ValidationError
 
 import firebase_admin
 from firebase_admin import credentials, firestore
@@ -18,6 +17,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from backend.services.ai_service import generate_text_embedding
 from backend.services.ai.core import get_runner, run_agent, extract_text_from_content
 from backend.core.config import settings
+from backend.services.bulk_write_service import BulkWriteJob
+from backend.services.youtube_service import YouTubeClient, YouTubeCacheMiss, CACHE_MODES
 
 # Google ADK Imports
 from google.adk.agents.llm_agent import Agent
@@ -36,13 +37,8 @@ opik.configure(use_local=False)
 
 # --- Helpers ---
 
-def get_youtube_service():
-    """Initializes and returns the YouTube Data API service."""
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        print("Error: GOOGLE_API_KEY not found in environment.")
-        return None
-    return build('youtube', 'v3', developerKey=api_key)
+# Cached YouTube Data API client; main() replaces it according to --youtube_cache
+youtube_client = YouTubeClient()
 
 def parse_iso_duration(duration_str: str) -> int:
     """Parses ISO 8601 duration (PT#M#S) to minutes."""
@@ -69,23 +65,12 @@ def search_youtube_playlists(trainer_name: str) -> List[Dict[str, Any]]:
     Returns a list of playlists with title, id, and thumbnails.
     """
     print(f"Tool called: Searching playlists for {trainer_name}...")
-    youtube = get_youtube_service()
-    if not youtube:
-        print("Error: YouTube service not initialized.")
-        return []
-
     try:
         # Search for playlists
-        request = youtube.search().list(
-            part="snippet",
-            maxResults=15,
-            q=f"{trainer_name} workout",
-            type="playlist"
-        )
-        response = request.execute()
+        items = youtube_client.search_playlists(f"{trainer_name} workout", limit=15)
         
         playlists = []
-        for item in response.get("items", []):
+        for item in items:
             snippet = item.get("snippet", {})
             playlists.append({
                 "title": snippet.get("title"),
@@ -104,7 +89,14 @@ def search_youtube_playlists(trainer_name: str) -> List[Dict[str, Any]]:
 async def get_curated_playlists(trainer_name: str) -> List[Dict[str, Any]]:
     """
     Uses an ADK Agent to search and filter playlists.
+    The approved list is cached with the YouTube responses so replay runs skip the agent.
     """
+    cached = youtube_client.get_cached_value("curation", trainer=trainer_name)
+    if cached is not None:
+        print(f"Using cached curation for {trainer_name}: {len(cached)} playlists.")
+        return cached
+    if youtube_client.mode == "replay":
+        raise YouTubeCacheMiss(f"No cached curation for {trainer_name}")
     
     # 1. Define the tool
     tools = [search_youtube_playlists]
@@ -189,6 +181,7 @@ async def get_curated_playlists(trainer_name: str) -> List[Dict[str, Any]]:
         cleaned_text = final_text.replace("```json", "").replace("```", "").strip()
         playlists = json.loads(cleaned_text)
         print(f"Agent selected {len(playlists)} valid playlists.")
+        youtube_client.set_cached_value("curation", playlists, trainer=trainer_name)
         return playlists
     except Exception as e:
         print(f"Failed to parse agent response: {e}")
@@ -222,20 +215,11 @@ def infer_focus(title):
     if not focus: focus.append("General Fitness")
     return list(set(focus))
 
-async def enrich_workout_metadata(title: str, description: str, duration_str: str) -> Dict[str, Any]:
-    """
-    Uses Gemini to infer difficulty, equipment, and a clean display title.
-    """
-    prompt = f"""
+ENRICHMENT_RULES = """
     You are a fitness data classifier. Your task is to analyze workout video metadata and infer structured, frontend-ready fields.
 
     Classify the workout using ONLY the provided information. Do NOT add creativity, opinions, or assumptions beyond the metadata.
 
-    INPUT:
-    - Video Title: {title}
-    - Description: {description[:500]}
-    - Duration (ISO 8601): {duration_str}
-
     INSTRUCTIONS:
 
     1. display_title
@@ -297,133 +281,223 @@ async def enrich_workout_metadata(title: str, description: str, duration_str: st
         - If bodyweight-only, return an empty array [].
         - Do NOT include "None" as a value.
 
-    **Requirements**:
-    1. display_title: Clean, short (5-7 words) title. Remove trainer name, emojis, marketing fluff (e.g. "Brutal", "No Repeat"). Keep workout type/focus (e.g. "20 Min HIIT Full Body").
-    2. difficulty_score: Integer 0-10 based on duration, intensity (HIIT/Tabata=High), impact, etc.
-    3. difficulty: "Beginner" (0-2), "Intermediate" (3-6), or "Advanced" (7-10).
-    4. difficulty_reason: Array of 2-4 short strings explaining the score (e.g. "High impact jumps", "Long duration").
-    5. equipments: Array of strings (e.g. "Dumbbells", "Kettlebell", "None"). Use "None" if bodyweight only.
-
     OUTPUT RULES:
     - Return ONLY valid JSON.
     - Do NOT include markdown, comments, or extra text.
     - Ensure all fields are present and correctly typed
+"""
 
+SINGLE_OUTPUT_FORMAT = """
     **Output JSON**:
-    {{
+    {
       "display_title": "string",
       "difficulty_score": int,
       "difficulty": "string",
       "difficulty_reason": ["string"],
       "equipments": ["string"]
-    }}
-    """
-    
-    runner = get_runner(
+    }
+"""
+
+BATCH_OUTPUT_FORMAT = """
+    You will receive a JSON array of videos, each with an "id". Classify every video independently.
+
+    **Output JSON**: an array with exactly one object per input video, in any order:
+    [
+      {
+        "id": "string (copied from the input)",
+        "display_title": "string",
+        "difficulty_score": int,
+        "difficulty": "string",
+        "difficulty_reason": ["string"],
+        "equipments": ["string"]
+      }
+    ]
+"""
+
+class EnrichedMetadata(BaseModel):
+    display_title: str = Field(min_length=1)
+    difficulty_score: int = Field(ge=0, le=10)
+    difficulty: Literal["Beginner", "Intermediate", "Advanced"]
+    difficulty_reason: List[str] = Field(min_length=1)
+    equipments: List[str]
+
+def validate_enrichment(item: Any) -> Optional[Dict[str, Any]]:
+    """Returns the cleaned metadata, or None if the item does not match the schema."""
+    try:
+        metadata = EnrichedMetadata.model_validate(item)
+    except ValidationError:
+        return None
+    expected = "Beginner" if metadata.difficulty_score <= 2 else "Intermediate" if metadata.difficulty_score <= 6 else "Advanced"
+    if metadata.difficulty != expected:
+        return None
+    data = metadata.model_dump()
+    data["equipments"] = [e for e in data["equipments"] if e.strip().lower() not in ("none", "bodyweight")]
+    return data
+
+def fallback_metadata(title: str) -> Dict[str, Any]:
+    return {
+        "display_title": title[:50],
+        "difficulty_score": 5,
+        "difficulty": "Intermediate",
+        "difficulty_reason": ["Default fallback"],
+        "equipments": []
+    }
+
+def get_enrichment_runner(batch: bool = False):
+    # The rules live in the (cached) runner instruction; each call only sends the video metadata
+    return get_runner(
         model_name="gemini-2.0-flash",
-        config=types.GenerateContentConfig(response_mime_type="application/json")
+        instruction=ENRICHMENT_RULES + (BATCH_OUTPUT_FORMAT if batch else SINGLE_OUTPUT_FORMAT),
+        config=types.GenerateContentConfig(response_mime_type="application/json"),
+        tracer_name="seed_enrichment_batch" if batch else "seed_enrichment"
     )
+
+async def enrich_workout_metadata(title: str, description: str, duration_str: str) -> Dict[str, Any]:
+    """
+    Uses Gemini to infer difficulty, equipment, and a clean display title.
+    """
+    prompt = f"""
+    INPUT:
+    - Video Title: {title}
+    - Description: {description[:500]}
+    - Duration (ISO 8601): {duration_str}
+    """
     
     try:
         parts = [types.Part(text=prompt)]
-        result_content = await run_agent(runner, parts)
+        result_content = await run_agent(get_enrichment_runner(), parts)
         text_response = extract_text_from_content(result_content)
-        return json.loads(text_response)
+        enriched = validate_enrichment(json.loads(text_response))
+        if enriched is None:
+            raise ValueError(f"response does not match schema: {text_response[:200]}")
+        return enriched
     except Exception as e:
         print(f"     ! Metadata enrichment failed: {e}")
         # Fallback
-        return {
-            "display_title": title[:50],
-            "difficulty_score": 5,
-            "difficulty": "Intermediate",
-            "difficulty_reason": ["Default fallback"],
-            "equipments": []
-        }
+        return fallback_metadata(title)
 
-async def process_playlist(db, playlist_info, trainer_name, limit_per_playlist=5):
+async def enrich_workout_metadata_batch(videos: List[Dict[str, str]]) -> Dict[str, Optional[Dict[str, Any]]]:
     """
-    Fetches videos from a playlist using YouTube Data API.
+    Classifies several videos in one model call.
+    `videos` items have id, title, description and duration; returns id -> metadata,
+    with None for every video whose item was missing or failed validation.
     """
-    playlist_id = playlist_info['id']
-    playlist_title = playlist_info['title']
-    print(f"  -> Processing Playlist: {playlist_title}")
-    
-    youtube = get_youtube_service()
-    if not youtube:
-        return 0
-
+    payload = [
+        {
+            "id": v["id"],
+            "title": v["title"],
+            "description": v["description"][:500],
+            "duration": v["duration"],
+        }
+        for v in videos
+    ]
+    results: Dict[str, Optional[Dict[str, Any]]] = {v["id"]: None for v in videos}
     try:
-        # 1. Get Playlist Items (Video IDs)
-        # We fetch a bit more than limit to account for private videos etc
-        pl_request = youtube.playlistItems().list(
-            part="snippet,contentDetails",
-            playlistId=playlist_id,
-            maxResults=limit_per_playlist + 2 
-        )
-        pl_response = pl_request.execute()
-        
-        video_ids = []
-        for item in pl_response.get("items", []):
-            vid_id = item.get("contentDetails", {}).get("videoId")
-            if vid_id:
-                video_ids.append(vid_id)
-        
-        if not video_ids:
-            print("     ! No videos found in playlist.")
-            return 0
-            
-        # 2. Get Video Details (Duration, Tags, etc.)
-        vid_request = youtube.videos().list(
-            part="snippet,contentDetails",
-            id=",".join(video_ids[:limit_per_playlist])
-        )
-        vid_response = vid_request.execute()
-        
-        collection_ref = db.collection('workout_library')
-        count = 0
-        
-        for video in vid_response.get("items", []):
+        parts = [types.Part(text=json.dumps(payload, ensure_ascii=False))]
+        result_content = await run_agent(get_enrichment_runner(batch=True), parts)
+        items = json.loads(extract_text_from_content(result_content))
+        if isinstance(items, dict):
+            items = items.get("items") or items.get("videos") or []
+        for item in items if isinstance(items, list) else []:
+            vid_id = item.get("id") if isinstance(item, dict) else None
+            if vid_id in results and results[vid_id] is None:
+                results[vid_id] = validate_enrichment(item)
+    except Exception as e:
+        print(f"     ! Batch enrichment of {len(videos)} videos failed: {e}")
+    return results
+
+# --- Seeding Pipeline ---
+#
+# fetch (YouTube) -> enrich (LLM) -> embed -> write (batched Firestore)
+# Each stage has its own worker count and a bounded queue so a slow stage
+# applies backpressure instead of buffering the whole catalog in memory.
+
+PIPELINE_VERSION = "v3.1"
+
+def content_hash(trainer_name: str, playlist_id: str, title: str, description: str, duration_str: str) -> str:
+    """Hash of everything that feeds enrichment and embedding; unchanged hash means the stored doc is current."""
+    payload = json.dumps([PIPELINE_VERSION, trainer_name, playlist_id, title, description, duration_str])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class Checkpoint:
+    """Video id -> content hash of every workout written, persisted so an interrupted run can resume."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.hashes: Dict[str, str] = {}
+        if path and os.path.exists(path):
             try:
-                vid_id = video.get("id")
-                snippet = video.get("snippet", {})
-                content_details = video.get("contentDetails", {})
-                
-                title = snippet.get("title")
-                description = snippet.get("description", "")
-                thumbnail_url = snippet.get("thumbnails", {}).get("high", {}).get("url", "")
-                
-                duration_str = content_details.get("duration", "PT20M")
-                duration_mins = parse_iso_duration(duration_str)
-                
-                focus = infer_focus(title)
-                
-                # Enrich Metadata (LLM Call)
-                print(f"     > Enriching metadata for: {title[:30]}...")
-                enriched_data = await enrich_workout_metadata(title, description, duration_str)
-                
-                doc_id = f"{vid_id}"
-                
-                workout = {
-                    "id": doc_id,
-                    "title": title,
-                    "trainer": trainer_name,
-                    "url": f"https://www.youtube.com/watch?v={vid_id}",
-                    "duration_mins": duration_mins,
-                    "focus": focus,
-                    "description": f"From program: {playlist_title}. {title} - {description[:100]}...",
-                    "thumbnail": thumbnail_url,
-                    "playlist_id": playlist_id,
-                    
-                    # Enriched Fields
-                    "display_title": enriched_data.get("display_title", title),
-                    "difficulty": enriched_data.get("difficulty", "Intermediate"),
-                    "difficulty_score": enriched_data.get("difficulty_score", 5),
-                    "difficulty_reason": enriched_data.get("difficulty_reason", []),
-                    "equipments": enriched_data.get("equipments", [])
-                }
-                
-                # Generate Embedding
-                text_to_embed = f"""
+                with open(path) as f:
+                    self.hashes = json.load(f).get("videos", {})
+                print(f"Loaded checkpoint with {len(self.hashes)} videos from {path}")
+            except Exception as e:
+                print(f"Warning: could not read checkpoint {path}: {e}")
+
+    def is_current(self, vid_id: str, digest: str) -> bool:
+        return self.hashes.get(vid_id) == digest
+
+    def mark(self, items: Dict[str, str]):
+        self.hashes.update(items)
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": PIPELINE_VERSION, "videos": self.hashes}, f)
+        os.replace(tmp_path, self.path)
+
+def fetch_playlist_videos(playlist_id: str, limit_per_playlist: int) -> List[Dict[str, Any]]:
+    """Blocking YouTube calls (through the response cache): playlist items, then video details."""
+    # We fetch a bit more than limit to account for private videos etc
+    video_ids = youtube_client.list_playlist_video_ids(playlist_id, limit_per_playlist + 2)
+    if not video_ids:
+        return []
+    return youtube_client.list_videos(video_ids)[:limit_per_playlist]
+
+def fetch_existing_hashes(db, vid_ids: List[str]) -> Dict[str, str]:
+    """content_hash of workouts already in Firestore, in one batched read."""
+    if not vid_ids:
+        return {}
+    collection_ref = db.collection('workout_library')
+    refs = [collection_ref.document(vid_id) for vid_id in vid_ids]
+    existing = {}
+    for snap in db.get_all(refs, field_paths=["content_hash"]):
+        if snap.exists:
+            digest = (snap.to_dict() or {}).get("content_hash")
+            if digest:
+                existing[snap.id] = digest
+    return existing
+
+def build_workout(video: Dict[str, Any], playlist_info: Dict[str, Any], trainer_name: str, enriched_data: Dict[str, Any]) -> Dict[str, Any]:
+    vid_id = video.get("id")
+    snippet = video.get("snippet", {})
+    title = snippet.get("title")
+    description = snippet.get("description", "")
+    duration_str = video.get("contentDetails", {}).get("duration", "PT20M")
+
+    return {
+        "id": vid_id,
+        "title": title,
+        "trainer": trainer_name,
+        "url": f"https://www.youtube.com/watch?v={vid_id}",
+        "duration_mins": parse_iso_duration(duration_str),
+        "focus": infer_focus(title),
+        "description": f"From program: {playlist_info['title']}. {title} - {description[:100]}...",
+        "thumbnail": snippet.get("thumbnails", {}).get("high", {}).get("url", ""),
+        "playlist_id": playlist_info['id'],
+
+        # Enriched Fields
+        "display_title": enriched_data.get("display_title", title),
+        "difficulty": enriched_data.get("difficulty", "Intermediate"),
+        "difficulty_score": enriched_data.get("difficulty_score", 5),
+        "difficulty_reason": enriched_data.get("difficulty_reason", []),
+        "equipments": enriched_data.get("equipments", [])
+    }
+
+def build_embedding_text(workout: Dict[str, Any]) -> str:
+    return f"""
                     Workout type: {', '.join(workout.get('focus', []))}
                     Trainer: {workout.get('trainer')}
                     Difficulty: {workout.get('difficulty')}
@@ -431,43 +505,262 @@ async def process_playlist(db, playlist_info, trainer_name, limit_per_playlist=5
                     Duration: {workout.get('duration_mins')} minutes
                     Equipment: {', '.join(workout.get('equipments', [])) or 'Bodyweight'}
                     """
-                embedding = generate_text_embedding(text_to_embed)
-                if embedding:
-                    # Store as Vector for Firestore Vector Search
-                    workout['embedding'] = Vector(embedding)
-                    collection_ref.document(doc_id).set(workout)
-                    print(f"     + Saved: {title[:30]}...")
-                    count += 1
-                
+
+class SeedPipeline:
+    def __init__(self, db, checkpoint: Checkpoint, limit_per_playlist: int, fetch_workers: int,
+                 enrich_workers: int, embed_workers: int, queue_size: int, enrich_batch_size: int = 1,
+                 force: bool = False, dry_run: bool = False):
+        self.db = db
+        self.checkpoint = checkpoint
+        self.limit_per_playlist = limit_per_playlist
+        self.fetch_workers = fetch_workers
+        self.enrich_workers = enrich_workers
+        self.embed_workers = embed_workers
+        self.enrich_batch_size = max(1, enrich_batch_size)
+        self.force = force
+        self.dry_run = dry_run
+        self.playlist_queue: asyncio.Queue = asyncio.Queue()
+        self.enrich_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.write_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {"playlists": 0, "videos": 0, "skipped": 0, "enriched": 0, "enrich_calls": 0, "enrich_retries": 0, "embedded": 0, "saved": 0, "failed": 0}
+
+    async def fetch_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.playlist_queue.get()
+            if item is None:
+                return
+            trainer_name, playlist_info = item
+            print(f"  -> Processing Playlist: {playlist_info['title']}")
+            try:
+                videos = await loop.run_in_executor(None, fetch_playlist_videos, playlist_info['id'], self.limit_per_playlist)
+                if not videos:
+                    print(f"     ! No videos found in playlist {playlist_info['title']}.")
+                    continue
+                existing = {} if self.force else await loop.run_in_executor(
+                    None, fetch_existing_hashes, self.db, [v.get("id") for v in videos if v.get("id")]
+                )
+                self.stats["playlists"] += 1
+                for video in videos:
+                    vid_id = video.get("id")
+                    if not vid_id:
+                        continue
+                    snippet = video.get("snippet", {})
+                    digest = content_hash(
+                        trainer_name, playlist_info['id'], snippet.get("title") or "",
+                        snippet.get("description", ""), video.get("contentDetails", {}).get("duration", "PT20M"),
+                    )
+                    self.stats["videos"] += 1
+                    if not self.force and (self.checkpoint.is_current(vid_id, digest) or existing.get(vid_id) == digest):
+                        self.stats["skipped"] += 1
+                        continue
+                    await self.enrich_queue.put((trainer_name, playlist_info, video, digest))
             except Exception as e:
-                print(f"     ! Error saving video: {e}")
-                
-        return count
-        
-    except Exception as e:
-        print(f"  ! Error processing playlist {playlist_title}: {e}")
-        return 0
+                print(f"  ! Error processing playlist {playlist_info['title']}: {e}")
+
+    async def _next_enrich_batch(self) -> tuple:
+        """Up to enrich_batch_size queued videos; waits briefly to fill a batch. Returns (items, saw_sentinel)."""
+        item = await self.enrich_queue.get()
+        if item is None:
+            return [], True
+        items = [item]
+        while len(items) < self.enrich_batch_size:
+            try:
+                item = await asyncio.wait_for(self.enrich_queue.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return items, True
+            items.append(item)
+        return items, False
+
+    async def enrich_worker(self):
+        while True:
+            items, done = await self._next_enrich_batch()
+            if items:
+                await self._enrich_items(items)
+            if done:
+                return
+
+    async def _enrich_items(self, items: List[tuple]):
+        videos = []
+        for _, _, video, _ in items:
+            snippet = video.get("snippet", {})
+            videos.append({
+                "id": video.get("id"),
+                "title": snippet.get("title") or "",
+                "description": snippet.get("description", ""),
+                "duration": video.get("contentDetails", {}).get("duration", "PT20M"),
+            })
+
+        if len(videos) > 1:
+            print(f"     > Enriching metadata for {len(videos)} videos in one call...")
+            enriched = await enrich_workout_metadata_batch(videos)
+            self.stats["enrich_calls"] += 1
+        else:
+            enriched = {v["id"]: None for v in videos}
+
+        # Anything missing or invalid in the batch response is retried on its own
+        for (trainer_name, playlist_info, video, digest), v in zip(items, videos):
+            enriched_data = enriched.get(v["id"])
+            if enriched_data is None:
+                if len(videos) > 1:
+                    self.stats["enrich_retries"] += 1
+                print(f"     > Enriching metadata for: {v['title'][:30]}...")
+                enriched_data = await enrich_workout_metadata(v["title"], v["description"], v["duration"])
+                self.stats["enrich_calls"] += 1
+            workout = build_workout(video, playlist_info, trainer_name, enriched_data)
+            workout["content_hash"] = digest
+            self.stats["enriched"] += 1
+            await self.embed_queue.put(workout)
+
+    async def embed_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            workout = await self.embed_queue.get()
+            if workout is None:
+                return
+            try:
+                embedding = await loop.run_in_executor(None, generate_text_embedding, build_embedding_text(workout))
+            except Exception as e:
+                print(f"     ! Embedding failed for {workout['id']}: {e}")
+                embedding = None
+            if not embedding:
+                self.stats["failed"] += 1
+                continue
+            # Store as Vector for Firestore Vector Search
+            workout['embedding'] = Vector(embedding)
+            self.stats["embedded"] += 1
+            await self.write_queue.put(workout)
+
+    def _commit(self, job: Optional[BulkWriteJob], workouts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue and flush a group of workouts; returns the ones Firestore confirmed."""
+        if self.dry_run or job is None:
+            return workouts
+        collection_ref = self.db.collection('workout_library')
+        failed_before = len(job.failures)
+        written_before = job.stats()["written"]
+        for workout in workouts:
+            job.set(collection_ref.document(workout['id']), workout)
+        written = job.flush()["written"] - written_before
+        failed_paths = {f["path"] for f in job.failures[failed_before:]}
+        for failure in job.failures[failed_before:]:
+            print(f"     ! Error saving {failure['path']}: {failure['message']}")
+        if written != len(workouts) - len(failed_paths):
+            # Writes we can't account for must not reach the checkpoint, or later runs would skip them
+            print(f"     ! Only {written} of {len(workouts) - len(failed_paths)} writes were confirmed; not marking this group saved")
+            return []
+        return [w for w in workouts if f"workout_library/{w['id']}" not in failed_paths]
+
+    async def write_worker(self):
+        loop = asyncio.get_running_loop()
+        job = None if self.dry_run else BulkWriteJob(self.db, "Seed workout_library", progress=print)
+        pending: List[Dict[str, Any]] = []
+        done = False
+        while not done:
+            try:
+                # Flush a partial batch if the upstream stages go quiet
+                workout = await asyncio.wait_for(self.write_queue.get(), timeout=2.0)
+            except asyncio.TimeoutError:
+                workout = False
+            if workout is None:
+                done = True
+            elif workout:
+                pending.append(workout)
+            if pending and (done or workout is False or len(pending) >= settings.BULK_WRITE_BATCH_SIZE):
+                try:
+                    saved = await loop.run_in_executor(None, self._commit, job, pending)
+                    self.checkpoint.mark({w['id']: w['content_hash'] for w in saved})
+                    self.stats["saved"] += len(saved)
+                    self.stats["failed"] += len(pending) - len(saved)
+                    for w in saved:
+                        print(f"     + Saved: {w['title'][:30]}...")
+                except Exception as e:
+                    self.stats["failed"] += len(pending)
+                    print(f"     ! Error saving batch of {len(pending)}: {e}")
+                pending = []
+        if job is not None:
+            await loop.run_in_executor(None, job.close)
+
+    async def run(self, trainers: List[str], curate_workers: int) -> Dict[str, int]:
+        fetchers = [asyncio.create_task(self.fetch_worker()) for _ in range(self.fetch_workers)]
+        enrichers = [asyncio.create_task(self.enrich_worker()) for _ in range(self.enrich_workers)]
+        embedders = [asyncio.create_task(self.embed_worker()) for _ in range(self.embed_workers)]
+        writer = asyncio.create_task(self.write_worker())
+
+        # Curation feeds playlists in as each trainer finishes
+        curate_semaphore = asyncio.Semaphore(curate_workers)
+
+        async def curate(trainer: str):
+            async with curate_semaphore:
+                print(f"\n--- Starting Curation for {trainer} ---")
+                try:
+                    playlists = await get_curated_playlists(trainer)
+                except YouTubeCacheMiss as e:
+                    print(f"  ! Skipping {trainer}: {e}")
+                    return
+                for pl in playlists:
+                    if pl.get("id"):
+                        await self.playlist_queue.put((trainer, pl))
+
+        await asyncio.gather(*[curate(t) for t in trainers])
+
+        # Drain stage by stage: one sentinel per worker once the previous stage is done
+        for stage_queue, workers in (
+            (self.playlist_queue, fetchers),
+            (self.enrich_queue, enrichers),
+            (self.embed_queue, embedders),
+        ):
+            for _ in workers:
+                await stage_queue.put(None)
+            await asyncio.gather(*workers)
+        await self.write_queue.put(None)
+        await writer
+        return self.stats
 
 async def main():
     parser = argparse.ArgumentParser(description="Seed workout data using ADK Agent curation.")
     parser.add_argument("--trainers", nargs="+", default=["Caroline Girvan"], help="Trainers to search")
     parser.add_argument("--videos_per_playlist", type=int, default=3, help="Max videos to seed per playlist")
+    parser.add_argument("--curate_concurrency", type=int, default=2, help="Trainers curated in parallel")
+    parser.add_argument("--fetch_concurrency", type=int, default=4, help="Playlists fetched from YouTube in parallel")
+    parser.add_argument("--enrich_concurrency", type=int, default=4, help="Parallel LLM enrichment calls")
+    parser.add_argument("--enrich_batch_size", type=int, default=10, help="Videos classified per enrichment call (1 = one call per video)")
+    parser.add_argument("--embed_concurrency", type=int, default=4, help="Parallel embedding calls")
+    parser.add_argument("--queue_size", type=int, default=50, help="Max items buffered between stages")
+    parser.add_argument("--checkpoint", default=os.path.join(os.path.dirname(__file__), ".seed_v3_checkpoint.json"), help="Resume file ('' to disable)")
+    parser.add_argument("--force", action="store_true", help="Re-seed videos even if unchanged")
+    parser.add_argument("--dry_run", action="store_true", help="Run every stage except the Firestore write")
+    parser.add_argument("--youtube_cache", choices=CACHE_MODES, default=settings.YOUTUBE_CACHE_MODE,
+                        help="YouTube response cache: online (TTL + ETag revalidation), refresh, replay (offline), off")
+    parser.add_argument("--youtube_cache_ttl", type=int, default=settings.YOUTUBE_CACHE_TTL_SECONDS, help="Seconds before a cached response is revalidated")
     args = parser.parse_args()
+
+    global youtube_client
+    youtube_client = YouTubeClient(mode=args.youtube_cache, ttl_seconds=args.youtube_cache_ttl)
     
     db = initialize_firebase()
     if not db: return
 
-    total_saved = 0
-    
-    for trainer in args.trainers:
-        print(f"\n--- Starting Curation for {trainer} ---")
-        curated_playlists = await get_curated_playlists(trainer)
-        
-        for pl in curated_playlists:
-            saved_count = await process_playlist(db, pl, trainer, args.videos_per_playlist)
-            total_saved += saved_count
-            
-    print(f"\nTotal workouts seeded: {total_saved}")
+    pipeline = SeedPipeline(
+        db,
+        Checkpoint(args.checkpoint or None),
+        limit_per_playlist=args.videos_per_playlist,
+        fetch_workers=args.fetch_concurrency,
+        enrich_workers=args.enrich_concurrency,
+        embed_workers=args.embed_concurrency,
+        queue_size=args.queue_size,
+        enrich_batch_size=args.enrich_batch_size,
+        force=args.force,
+        dry_run=args.dry_run,
+    )
+    stats = await pipeline.run(args.trainers, args.curate_concurrency)
+
+    print(f"\nTotal workouts seeded: {stats['saved']}")
+    print(f"Videos seen: {stats['videos']}, unchanged/skipped: {stats['skipped']}, failed: {stats['failed']}")
+    print(f"Enrichment: {stats['enrich_calls']} model calls for {stats['enriched']} videos ({stats['enrich_retries']} retried individually)")
+    print(f"YouTube cache ({youtube_client.mode}): {youtube_client.stats}")
 
 if __name__ == "__main__":
     asyncio.run(main())
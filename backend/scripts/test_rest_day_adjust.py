@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+import httpx
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from backend.benchmarks.fakes import FakeConfig, install_fakes
+from backend.benchmarks.scenarios import SEED_REST_DAYS, _seed_user_plan, build_app
+from backend.services.plan_service import materialize_plan
+
+API = "http://test/api/v1"
+
+
+async def test_adjust_day_next_to_rest_day():
+    """Hydrate a stored plan with a rest day, then adjust its neighbour on every chat path."""
+    db, _ = install_fakes(FakeConfig())
+    app = build_app()
+    uid = "rest-day-user"
+    _seed_user_plan(db, uid)
+
+    rest_day = SEED_REST_DAYS[0]
+    plan = materialize_plan(db.collection("user_progress").document(uid).get().to_dict(), uid)
+    hydrated_rest = next(d for d in plan["schedule"] if d["day"] == rest_day)
+    assert hydrated_rest["is_rest"] and "workout_details" not in hydrated_rest, hydrated_rest
+
+    day_id = f"day-{rest_day - 1}"
+    message = "make it shorter, 20 mins"
+    headers = {"Authorization": f"Bearer {uid}"}
+    requests = {
+        "act versioned": ("/act/chat", {"message": message, "day_id": day_id, "plan_id": plan["plan_id"], "plan_version": plan["version"]}),
+        "act legacy": ("/act/chat", {"message": message, "day_id": day_id, "current_plan": plan}),
+        "anonymous": ("/anonymous/chat", {"message": message, "day_id": day_id, "current_plan": plan}),
+    }
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=API, timeout=60) as client:
+        for name, (path, body) in requests.items():
+            response = await client.post(path, json=body, headers=headers)
+            assert response.status_code == 200, f"{name}: {response.status_code} {response.text}"
+            assert response.json().get("status") == "proposal", f"{name}: {response.json()}"
+            print(f"{name}: ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_adjust_day_next_to_rest_day())
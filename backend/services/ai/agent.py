@@ -1,13 +1,94 @@
 import json
+import logging
 import re
 import uuid
 from typing import List, Dict, Any, Optional
-from google.genai import types
-from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from backend.services.ai.core import get_runner, run_agent, extract_text_from_content
-from backend.services.ai.planning import search_workouts_tool
+from backend.core.deadline import DeadlineExceeded
+from backend.core.lazy import lazy_import
+from backend.services.ai.core import get_runner, run_agent, run_agent_text, extract_text_from_content
+from backend.services.ai.parsing import JSONScanner, parse_model_output
+from backend.services.ai.planning import search_workouts
+from backend.services.ai.schemas import AdjustmentMessageOutput, AdjustmentOutput, IntentOutput, SemanticQueryOutput
+
+types = lazy_import("google.genai.types")
+
+logger = logging.getLogger(__name__)
+
+ADJUST_MESSAGE_INSTRUCTION = """
+    You are a friendly fitness coach assistant.
+    You must output ONLY JSON.
+    Write a short summary for the UI and a conversational message for the user.
+    If the user asked for a rest day and is_rest is true, clearly explain that you are suggesting a rest day and why it makes sense.
+    If the proposed workout does not match the requested duration window or focus, briefly explain the mismatch (for example, no workouts under 15 minutes) before suggesting the closest option.
+    Do not mention saving or confirming anything; just talk to the user.
+    Output:
+    {
+      "summary": "short summary for the day card",
+      "agent_message": "natural language explanation for the chat bubble"
+    }
+    """
+
+INTENT_INSTRUCTION = """
+    You are an intent classifier for a fitness coach AI.
+    You must output ONLY JSON.
+    Classify the intent into one of these categories:
+    - ADJUST_WORKOUT: User wants to change duration, difficulty, or swap the workout, or is asking you to suggest a different workout for this day.
+      Examples: "too hard", "only have 20 mins", "change this", "Between 10 to 15 mins please", "shorter", "longer", "suggest a full body hiit workout", "give me a different workout", "swap this for legs and glutes".
+    - EXPLAIN_WORKOUT: User asks about the workout details or technique.
+      Examples: "what is this?", "how to do pushups", "explain the focus".
+    - MOTIVATION: User seeks encouragement.
+    - OTHER: Anything else.
+    
+    Output JSON:
+    {
+      "intent": "ADJUST_WORKOUT|EXPLAIN_WORKOUT|MOTIVATION|OTHER"
+    }
+    """
+
+SEMANTIC_QUERY_INSTRUCTION = """
+    You create a single semantic search query for a workout database.
+    You must output ONLY JSON.
+    Use this embedding format as guidance:
+    Workout type: <focus>
+    Trainer: <trainer>
+    Difficulty: <difficulty>
+    Difficulty score: <score>
+    Duration: <minutes> minutes
+    Equipment: <equipment list or Bodyweight>
+
+    Build a concise query that includes:
+    - desired focus or workout type
+    - duration constraint if provided
+    - equipment if relevant
+    - avoid repeating adjacent day focus when possible
+
+    Output JSON:
+    { "query": "<one-line query>" }
+    """
+
+def get_adjust_message_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        instruction=ADJUST_MESSAGE_INSTRUCTION,
+        config=types.GenerateContentConfig(response_mime_type="application/json"),
+        tracer_name="AdjustMessage"
+    )
+
+def get_intent_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        instruction=INTENT_INSTRUCTION,
+        config=types.GenerateContentConfig(response_mime_type="application/json"),
+        tracer_name="IntentDetector"
+    )
+
+def get_semantic_query_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        instruction=SEMANTIC_QUERY_INSTRUCTION,
+        config=types.GenerateContentConfig(response_mime_type="application/json"),
+        tracer_name="SemanticQueryBuilder"
+    )
 
 async def detect_intent(message: str, context: Dict[str, Any]) -> str:
     """
@@ -41,6 +122,8 @@ async def detect_intent(message: str, context: Dict[str, Any]) -> str:
         if "EXPLAIN" in intent: return "EXPLAIN_WORKOUT"
         if "MOTIVATION" in intent: return "MOTIVATION"
         return "OTHER"
+    except DeadlineExceeded:
+        raise
     except Exception:
         return "OTHER"
 
@@ -106,19 +189,20 @@ async def adjust_workout(
     
     try:
         parts = [types.Part(text=prompt)]
-        content = await run_agent(runner, parts)
-        text_resp = extract_text_from_content(content)
-        result = json.loads(text_resp)
+        text_resp = await run_agent_text(runner, parts, until=JSONScanner().feed)
+        result = parse_model_output(text_resp, AdjustmentOutput, "adjust_workout")
         
         # Construct the response
         return {
             "success": True,
-            "new_workout_id": result.get("new_workout_id"),
-            "new_activity_title": result.get("new_activity_title"),
-            "is_rest": result.get("is_rest", False),
-            "summary": result.get("reasoning_summary", "Updated workout."),
-            "agent_response": result.get("agent_message", "Updated your plan.")
+            "new_workout_id": result.new_workout_id,
+            "new_activity_title": result.new_activity_title,
+            "is_rest": result.is_rest,
+            "summary": result.reasoning_summary or "Updated workout.",
+            "agent_response": result.agent_message or "Updated your plan."
         }
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -210,25 +294,7 @@ async def build_adjustment_message(
     max_duration: Optional[int],
     min_duration: Optional[int]
 ) -> Dict[str, str]:
-    instruction = """
-    You are a friendly fitness coach assistant.
-    You must output ONLY JSON.
-    Write a short summary for the UI and a conversational message for the user.
-    If the user asked for a rest day and is_rest is true, clearly explain that you are suggesting a rest day and why it makes sense.
-    If the proposed workout does not match the requested duration window or focus, briefly explain the mismatch (for example, no workouts under 15 minutes) before suggesting the closest option.
-    Do not mention saving or confirming anything; just talk to the user.
-    Output:
-    {
-      "summary": "short summary for the day card",
-      "agent_message": "natural language explanation for the chat bubble"
-    }
-    """
-    runner = get_runner(
-        model_name="gemini-2.0-flash",
-        instruction=instruction,
-        config=types.GenerateContentConfig(response_mime_type="application/json"),
-        tracer_name="AdjustMessage"
-    )
+    runner = get_adjust_message_runner()
     workout_details = target_day.get("workout_details") or {}
     current_title = target_day.get("activity")
     current_duration = workout_details.get("duration_mins")
@@ -263,15 +329,13 @@ async def build_adjustment_message(
     prompt = json.dumps(payload)
     try:
         parts = [types.Part(text=prompt)]
-        content = await run_agent(runner, parts)
-        text_resp = extract_text_from_content(content)
-        clean_text = text_resp.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean_text)
-        if isinstance(data, list):
-            data = data[0]
-        summary = str(data.get("summary") or "Updated workout.")
-        agent_message = str(data.get("agent_message") or "Updated your plan.")
+        text_resp = await run_agent_text(runner, parts, until=JSONScanner().feed)
+        data = parse_model_output(text_resp, AdjustmentMessageOutput, "build_adjustment_message")
+        summary = data.summary or "Updated workout."
+        agent_message = data.agent_message or "Updated your plan."
         return {"summary": summary, "agent_message": agent_message}
+    except DeadlineExceeded:
+        raise
     except Exception:
         if is_rest:
             return {
@@ -325,29 +389,7 @@ def _extract_desired_focus(message: str) -> List[str]:
     return result
 
 async def detect_intent_multi_agent(message: str, context: Dict[str, Any]) -> Dict[str, Any]:
-    instruction = """
-    You are an intent classifier for a fitness coach AI.
-    You must output ONLY JSON.
-    Classify the intent into one of these categories:
-    - ADJUST_WORKOUT: User wants to change duration, difficulty, or swap the workout, or is asking you to suggest a different workout for this day.
-      Examples: "too hard", "only have 20 mins", "change this", "Between 10 to 15 mins please", "shorter", "longer", "suggest a full body hiit workout", "give me a different workout", "swap this for legs and glutes".
-    - EXPLAIN_WORKOUT: User asks about the workout details or technique.
-      Examples: "what is this?", "how to do pushups", "explain the focus".
-    - MOTIVATION: User seeks encouragement.
-    - OTHER: Anything else.
-    
-    Output JSON:
-    {
-      "intent": "ADJUST_WORKOUT|EXPLAIN_WORKOUT|MOTIVATION|OTHER"
-    }
-    """
-    
-    runner = get_runner(
-        model_name="gemini-2.0-flash",
-        instruction=instruction,
-        config=types.GenerateContentConfig(response_mime_type="application/json"),
-        tracer_name="IntentDetector"
-    )
+    runner = get_intent_runner()
     
     prompt = f"""
     User Message: "{message}"
@@ -361,14 +403,10 @@ async def detect_intent_multi_agent(message: str, context: Dict[str, Any]) -> Di
     base_intent = "OTHER"
     try:
         parts = [types.Part(text=prompt)]
-        content = await run_agent(runner, parts)
-        text_resp = extract_text_from_content(content)
-        clean_text = text_resp.replace("```json", "").replace("```", "").strip()
-        result = json.loads(clean_text)
-        if isinstance(result, list):
-            result = result[0]
-        if isinstance(result, dict):
-            base_intent = str(result.get("intent", "OTHER")).upper()
+        text_resp = await run_agent_text(runner, parts, until=JSONScanner().feed)
+        base_intent = parse_model_output(text_resp, IntentOutput, "detect_intent").intent.upper()
+    except DeadlineExceeded:
+        raise
     except Exception:
         base_intent = "OTHER"
     
@@ -424,29 +462,26 @@ def _select_best_candidate(
     max_duration: Optional[int],
     min_duration: Optional[int]
 ) -> Optional[Dict[str, Any]]:
-    filtered = []
+    existing = set(existing_ids or [])
+    adjacent_set = {f.lower() for f in prev_focus or []} | {f.lower() for f in next_focus or []}
+    first_match = None
     for c in candidates:
         workout_id = c.get("id")
         if not workout_id or str(workout_id).startswith("fallback"):
             continue
-        if workout_id in existing_ids:
+        if workout_id in existing:
             continue
         duration = c.get("duration_mins")
         if max_duration is not None and isinstance(duration, (int, float)) and duration > max_duration:
             continue
         if min_duration is not None and isinstance(duration, (int, float)) and duration < min_duration:
             continue
-        filtered.append(c)
-    if not filtered:
-        return None
-    prev_set = set([f.lower() for f in prev_focus or []])
-    next_set = set([f.lower() for f in next_focus or []])
-    for c in filtered:
-        focus = [f.lower() for f in c.get("focus", []) or []]
-        if prev_set.intersection(focus) or next_set.intersection(focus):
-            continue
-        return c
-    return filtered[0]
+        # First eligible candidate that doesn't repeat an adjacent day's focus wins
+        if not adjacent_set or adjacent_set.isdisjoint(f.lower() for f in c.get("focus", []) or []):
+            return c
+        if first_match is None:
+            first_match = c
+    return first_match
 
 def _select_best_candidate_relaxed(
     candidates: List[Dict[str, Any]],
@@ -455,54 +490,47 @@ def _select_best_candidate_relaxed(
     next_focus: List[str],
     target_focus: List[str]
 ) -> Optional[Dict[str, Any]]:
-    cleaned = []
+    existing = set(existing_ids or [])
+    prev_set = {f.lower() for f in prev_focus or []}
+    next_set = {f.lower() for f in next_focus or []}
+    target_set = {f.lower() for f in target_focus or []}
+
+    def norm_focus(cand: Dict[str, Any]) -> set:
+        values = cand.get("focus", []) or []
+        if isinstance(values, list):
+            return {str(f).lower() for f in values}
+        if isinstance(values, str):
+            return {values.lower()}
+        return set()
+
+    def duration_key(item: Dict[str, Any]):
+        duration = item.get("duration_mins")
+        return duration if isinstance(duration, (int, float)) else 10**9
+
+    # Normalize each candidate's focus once, then bucket in a single pass
+    same_focus_no_adj, same_focus, any_no_adj, cleaned = [], [], [], []
     for c in candidates:
         workout_id = c.get("id")
         if not workout_id or str(workout_id).startswith("fallback"):
             continue
-        if workout_id in existing_ids:
+        if workout_id in existing:
             continue
+        focus = norm_focus(c)
+        adjacent = bool(prev_set & focus or next_set & focus)
+        on_target = bool(target_set & focus)
         cleaned.append(c)
-    if not cleaned:
-        return None
-    prev_set = set([f.lower() for f in prev_focus or []])
-    next_set = set([f.lower() for f in next_focus or []])
-    target_set = set([f.lower() for f in target_focus or []])
-
-    def norm_focus(cand: Dict[str, Any]) -> List[str]:
-        values = cand.get("focus", []) or []
-        if isinstance(values, list):
-            return [str(f).lower() for f in values]
-        if isinstance(values, str):
-            return [values.lower()]
-        return []
-
-    def sort_by_duration(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        return sorted(
-            items,
-            key=lambda x: x.get("duration_mins") if isinstance(x.get("duration_mins"), (int, float)) else 10**9
-        )
+        if on_target:
+            same_focus.append(c)
+            if not adjacent:
+                same_focus_no_adj.append(c)
+        if not adjacent:
+            any_no_adj.append(c)
 
-    def avoid_adjacent(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        result: List[Dict[str, Any]] = []
-        for c in items:
-            focus = set(norm_focus(c))
-            if prev_set.intersection(focus) or next_set.intersection(focus):
-                continue
-            result.append(c)
-        return result
-
-    same_focus = [c for c in cleaned if target_set.intersection(norm_focus(c))]
-    same_focus_no_adj = avoid_adjacent(same_focus)
-    any_no_adj = avoid_adjacent(cleaned)
-
-    if same_focus_no_adj:
-        return sort_by_duration(same_focus_no_adj)[0]
-    if same_focus:
-        return sort_by_duration(same_focus)[0]
-    if any_no_adj:
-        return sort_by_duration(any_no_adj)[0]
-    return sort_by_duration(cleaned)[0]
+    # min() keeps the first of equal durations, same as a stable sort
+    for bucket in (same_focus_no_adj, same_focus, any_no_adj, cleaned):
+        if bucket:
+            return min(bucket, key=duration_key)
+    return None
 
 async def build_semantic_query_agent(
     user_message: str,
@@ -515,33 +543,7 @@ async def build_semantic_query_agent(
     prev_focus: List[str],
     next_focus: List[str]
 ) -> str:
-    instruction = """
-    You create a single semantic search query for a workout database.
-    You must output ONLY JSON.
-    Use this embedding format as guidance:
-    Workout type: <focus>
-    Trainer: <trainer>
-    Difficulty: <difficulty>
-    Difficulty score: <score>
-    Duration: <minutes> minutes
-    Equipment: <equipment list or Bodyweight>
-
-    Build a concise query that includes:
-    - desired focus or workout type
-    - duration constraint if provided
-    - equipment if relevant
-    - avoid repeating adjacent day focus when possible
-
-    Output JSON:
-    { "query": "<one-line query>" }
-    """
-    
-    runner = get_runner(
-        model_name="gemini-2.0-flash",
-        instruction=instruction,
-        config=types.GenerateContentConfig(response_mime_type="application/json"),
-        tracer_name="SemanticQueryBuilder"
-    )
+    runner = get_semantic_query_runner()
 
     workout_details = target_day.get("workout_details") or {}
     prompt = f"""
@@ -559,13 +561,10 @@ async def build_semantic_query_agent(
     
     try:
         parts = [types.Part(text=prompt)]
-        content = await run_agent(runner, parts)
-        text_resp = extract_text_from_content(content)
-        clean_text = text_resp.replace("```json", "").replace("```", "").strip()
-        result = json.loads(clean_text)
-        if isinstance(result, list):
-            result = result[0]
-        return str(result.get("query", "")).strip()
+        text_resp = await run_agent_text(runner, parts, until=JSONScanner().feed)
+        return parse_model_output(text_resp, SemanticQueryOutput, "build_semantic_query").query.strip()
+    except DeadlineExceeded:
+        raise
     except Exception:
         return ""
 
@@ -593,8 +592,8 @@ async def adjust_workout_multi_agent(
     ]
     prev_day = next((d for d in current_plan.get("schedule", []) if d.get("day") == day_index - 1), None)
     next_day = next((d for d in current_plan.get("schedule", []) if d.get("day") == day_index + 1), None)
-    prev_focus = (prev_day or {}).get("workout_details", {}).get("focus", [])
-    next_focus = (next_day or {}).get("workout_details", {}).get("focus", [])
+    prev_focus = ((prev_day or {}).get("workout_details") or {}).get("focus") or []
+    next_focus = ((next_day or {}).get("workout_details") or {}).get("focus") or []
     intent = str(intent_data.get("intent", "OTHER")).upper()
     durations = _parse_duration_request(user_message, current_duration)
     max_duration = durations.get("max_duration")
@@ -634,9 +633,11 @@ async def adjust_workout_multi_agent(
     )
     if query_text:
         query_text = _strip_duration_terms(query_text)
-    print(f"[Adjust] intent={intent} day={day_index} current_duration={current_duration} max={max_duration} min={min_duration}")
-    print(f"[Adjust] query={query_text}")
-    results_json = search_workouts_tool(
+    logger.debug(
+        "Adjust intent=%s day=%s current_duration=%s max=%s min=%s query=%r",
+        intent, day_index, current_duration, max_duration, min_duration, query_text
+    )
+    results_json = await search_workouts(
         query=query_text or target_day.get("activity") or "",
         max_duration=max_duration,
         min_duration=min_duration
@@ -647,7 +648,7 @@ async def adjust_workout_multi_agent(
         candidates = []
     if not isinstance(candidates, list):
         candidates = []
-    print(f"[Adjust] candidates_count={len(candidates)}")
+    logger.debug("Adjust candidates_count=%d", len(candidates))
     selected = _select_best_candidate(
         candidates,
         existing_ids,
@@ -676,7 +677,7 @@ async def adjust_workout_multi_agent(
             if alt:
                 selected = alt
     if not selected and (max_duration is not None or min_duration is not None):
-        print("[Adjust] relaxing duration constraints")
+        logger.debug("Adjust relaxing duration constraints")
         selected = _select_best_candidate_relaxed(
             candidates,
             existing_ids,
@@ -685,7 +686,7 @@ async def adjust_workout_multi_agent(
             target_focus
         )
     if not selected and candidates:
-        print("[Adjust] relaxing focus constraints")
+        logger.debug("Adjust relaxing focus constraints")
         selected = _select_best_candidate(
             candidates,
             existing_ids,
@@ -1,29 +1,67 @@
 import os
+import logging
+import threading
+import time
 import uuid
 import base64
 import json
 import asyncio
-from typing import Optional, Dict, Any, List
-
-from google import genai
-from google.genai import types
-from google.adk.agents.llm_agent import Agent
-from google.adk.runners import Runner
-from google.adk.models import Gemini
-from google.adk.sessions import InMemorySessionService
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Optional, Dict, Any, List, TYPE_CHECKING
+
 from backend.core.config import settings
+from backend.core.lazy import lazy_import
+from backend.core.deadline import DeadlineExceeded, call_deadline, expired, remaining
+from backend.core.metrics import AI_CALL_SECONDS, AI_RETRIES_TOTAL, AI_RETRIES_SKIPPED_TOTAL, AI_FIRST_TOKEN_SECONDS, AI_EARLY_EXIT_TOTAL
+
+# google.genai, google.adk and opik take seconds to import; load them on first use
+types = lazy_import("google.genai.types")
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
 
-# Opik Integration
-import opik
-from opik.integrations.adk import OpikTracer, track_adk_agent_recursive
+logger = logging.getLogger(__name__)
 
-# Configure Opik (assumes OPIK_API_KEY is set in environment or local setup)
-opik.configure(use_local=False)
+_tracing_configured = False
+_tracing_lock = threading.Lock()
+
+# Runners are stateless apart from their session service, which run_agent cleans up after
+# each call, so identical call sites share one Runner (and its Gemini client/connection pool)
+_runner_cache = OrderedDict()
+_runner_cache_lock = threading.Lock()
 
 # Ensure API key is set for ADK/GenAI
 if settings.GOOGLE_API_KEY:
     os.environ["GOOGLE_API_KEY"] = settings.GOOGLE_API_KEY
 
+def configure_tracing() -> bool:
+    """
+    Configure Opik once per process (assumes OPIK_API_KEY is set in environment or local setup).
+    Called from the app lifespan; get_runner also calls it so scripts keep working.
+    """
+    global _tracing_configured
+    if not settings.OPIK_ENABLED:
+        return False
+    with _tracing_lock:
+        if _tracing_configured:
+            return True
+        try:
+            import opik
+            opik.configure(use_local=False)
+            _tracing_configured = True
+        except Exception as e:
+            logger.warning("Opik configuration failed, continuing without tracing: %s", e)
+    return _tracing_configured
+
+def _attach_tracer(agent, name: str, tags: list, metadata: dict):
+    if not configure_tracing():
+        return
+    from opik.integrations.adk import OpikTracer, track_adk_agent_recursive
+    opik_tracer = OpikTracer(name=name, tags=tags, metadata=metadata, project_name="fitness_coach")
+    # Add Opik callbacks
+    track_adk_agent_recursive(agent, opik_tracer)
+
 async def check_ai_connection() -> Dict[str, Any]:
     status = {
         "initialized": False,
@@ -39,17 +77,10 @@ async def check_ai_connection() -> Dict[str, Any]:
     status["api_key_present"] = True
     
     try:
-        # Configure Opik tracer for test
-        opik_tracer = OpikTracer(
-            name="test_agent",
-            tags=["health-check"],
-            metadata={
-                "environment": "development",
-                "model": "gemini-2.0-flash",
-                "framework": "google-adk",
-            },
-            project_name="fitness_coach"
-        )
+        from google.adk.agents.llm_agent import Agent
+        from google.adk.models import Gemini
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
 
         # Use a simple agent to test connection
         agent = Agent(
@@ -57,8 +88,12 @@ async def check_ai_connection() -> Dict[str, Any]:
             model=Gemini(model="gemini-2.0-flash"),
         )
         
-        # Add Opik callbacks
-        track_adk_agent_recursive(agent, opik_tracer)
+        # Configure Opik tracer for test
+        _attach_tracer(agent, "test_agent", ["health-check"], {
+            "environment": "development",
+            "model": "gemini-2.0-flash",
+            "framework": "google-adk",
+        })
         
         session_service = InMemorySessionService()
         runner = Runner(
@@ -91,21 +126,74 @@ async def check_ai_connection() -> Dict[str, Any]:
         
     return status
 
-def get_runner(model_name: str, instruction: str = "", config: types.GenerateContentConfig = None, tracer_name: str = "fitness_coach_agent") -> Runner:
+async def check_ai_connection_light(model_name: str = "gemini-2.0-flash") -> Dict[str, Any]:
+    """
+    Cheap connectivity probe: fetch model metadata instead of generating content,
+    so health checks don't spend generation quota.
+    """
+    status = {
+        "initialized": False,
+        "api_key_present": False,
+        "connectivity": "unknown",
+        "error": None
+    }
+
+    if not settings.GOOGLE_API_KEY:
+        status["error"] = "GOOGLE_API_KEY not found in environment variables"
+        return status
+
+    status["api_key_present"] = True
+
+    try:
+        from google import genai
+        client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+        model = await client.aio.models.get(model=model_name)
+        status["initialized"] = True
+        status["connectivity"] = "connected"
+        status["details"] = f"Model metadata reachable: {getattr(model, 'name', model_name)}"
+    except Exception as e:
+        status["connectivity"] = "failed"
+        status["error"] = str(e)
+
+    return status
+
+def _runner_cache_key(model_name: str, instruction: str, config, tracer_name: str) -> tuple:
+    config_key = config.model_dump_json(exclude_none=True) if config is not None else ""
+    return (model_name, instruction or "", config_key, tracer_name)
+
+def get_runner(model_name: str, instruction: str = "", config: "types.GenerateContentConfig" = None, tracer_name: str = "fitness_coach_agent") -> "Runner":
     if not settings.GOOGLE_API_KEY:
         raise ValueError("GOOGLE_API_KEY is not set")
-    
-    # Configure Opik tracer
-    opik_tracer = OpikTracer(
-        name=tracer_name,
-        tags=["ai-service"],
-        metadata={
-            "environment": "development",
-            "model": model_name,
-            "framework": "google-adk",
-        },
-        project_name="fitness_coach"
-    )
+
+    if settings.RUNNER_CACHE_MAX_SIZE <= 0:
+        return _build_runner(model_name, instruction, config, tracer_name)
+
+    key = _runner_cache_key(model_name, instruction, config, tracer_name)
+    with _runner_cache_lock:
+        runner = _runner_cache.get(key)
+        if runner is not None:
+            _runner_cache.move_to_end(key)
+            return runner
+
+    runner = _build_runner(model_name, instruction, config, tracer_name)
+    with _runner_cache_lock:
+        # Another caller may have built the same runner meanwhile; keep the first one
+        runner = _runner_cache.setdefault(key, runner)
+        _runner_cache.move_to_end(key)
+        while len(_runner_cache) > settings.RUNNER_CACHE_MAX_SIZE:
+            _runner_cache.popitem(last=False)
+    return runner
+
+def get_runner_cache_size() -> int:
+    with _runner_cache_lock:
+        return len(_runner_cache)
+
+def _build_runner(model_name: str, instruction: str, config, tracer_name: str) -> "Runner":
+    from google.adk.agents.llm_agent import Agent
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.adk.models import Gemini
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
 
     model = Gemini(model=model_name)
     agent = Agent(
@@ -115,16 +203,51 @@ def get_runner(model_name: str, instruction: str = "", config: types.GenerateCon
         generate_content_config=config,
     )
     
-    # Add Opik callbacks
-    track_adk_agent_recursive(agent, opik_tracer)
+    # Configure Opik tracer
+    _attach_tracer(agent, tracer_name, ["ai-service"], {
+        "environment": "development",
+        "model": model_name,
+        "framework": "google-adk",
+    })
     
-    return Runner(
+    runner = Runner(
         agent=agent,
         app_name="fitness_coach_app",
         session_service=InMemorySessionService()
     )
+    # Metric labels for run_agent
+    runner.tracer_name = tracer_name
+    runner.model_name = model_name
+    # stream_agent asks for SSE so text arrives as partial events
+    runner.stream_run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    return runner
 
-async def run_agent(runner: Runner, parts: list, max_retries: int = 3) -> types.Content:
+async def run_agent(runner: "Runner", parts: list, max_retries: int = 3) -> "types.Content":
+    """
+    Run one model call to completion. It is bounded by AI_CALL_TIMEOUT_SECONDS and the
+    request's deadline (DeadlineExceeded on expiry); cancelling the caller closes the stream.
+    """
+    labels = {
+        "tracer_name": getattr(runner, "tracer_name", "unknown"),
+        "model": getattr(runner, "model_name", "unknown"),
+    }
+    start = time.perf_counter()
+    status = "error"
+    try:
+        async with call_deadline(settings.AI_CALL_TIMEOUT_SECONDS):
+            result = await _run_agent_with_retries(runner, parts, max_retries, labels)
+        status = "ok"
+        return result
+    except DeadlineExceeded:
+        status = "timeout"
+        raise
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        AI_CALL_SECONDS.observe(time.perf_counter() - start, status=status, **labels)
+
+async def _run_agent_with_retries(runner: "Runner", parts: list, max_retries: int, labels: dict) -> "types.Content":
     content = types.Content(role="user", parts=parts)
     
     final_content = None
@@ -138,24 +261,136 @@ async def run_agent(runner: Runner, parts: list, max_retries: int = 3) -> types.
         await runner.session_service.create_session(app_name="fitness_coach_app", user_id=uid, session_id=sid)
         
         try:
-            async for event in runner.run_async(user_id=uid, session_id=sid, new_message=content):
-                if event.content:
-                    final_content = event.content
+            async with aclosing(runner.run_async(user_id=uid, session_id=sid, new_message=content)) as events:
+                async for event in events:
+                    if event.content:
+                        final_content = event.content
             return final_content
             
         except Exception as e:
             error_msg = str(e)
-            if ("429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg) and attempt < max_retries:
-                print(f"  [429 Error] Retrying in {delay}s... (Attempt {attempt+1}/{max_retries})")
+            if ("429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg) and attempt < max_retries and _retry_fits(delay, labels):
+                logger.warning("429 from model, retrying in %ss (attempt %d/%d)", delay, attempt + 1, max_retries)
+                AI_RETRIES_TOTAL.inc(**labels)
                 await asyncio.sleep(delay)
                 delay *= 2  # Exponential backoff
             else:
                 # If it's not a 429 or we've exhausted retries, re-raise
                 raise e
+        finally:
+            await _delete_session(runner, uid, sid)
                 
     return final_content
 
-def extract_text_from_content(content: types.Content) -> str:
+def _retry_fits(delay: float, labels: dict) -> bool:
+    # Sleeping into a deadline only to be cancelled wastes a worker; fail now instead
+    left = remaining()
+    if left is None or left >= delay + settings.AI_RETRY_MIN_ATTEMPT_SECONDS:
+        return True
+    logger.warning("429 from model, not retrying: %.1fs left of the deadline", left)
+    AI_RETRIES_SKIPPED_TOTAL.inc(**labels)
+    return False
+
+async def stream_agent(
+    runner: "Runner",
+    parts: list,
+    until: Optional[Callable[[str], bool]] = None,
+    max_retries: int = 3,
+) -> AsyncIterator[str]:
+    """
+    Streaming run_agent: yields the model's text as it arrives. `until` is called with each
+    new chunk; once it returns True the event stream is closed instead of being drained,
+    e.g. `until=JSONScanner().feed` stops at the end of the first JSON object.
+    A 429 is retried only if no text has been yielded yet and the retry fits the deadline.
+    Timeouts are the consumer's: wrap the iteration in call_deadline (run_agent_text does).
+    """
+    labels = {
+        "tracer_name": getattr(runner, "tracer_name", "unknown"),
+        "model": getattr(runner, "model_name", "unknown"),
+    }
+    start = time.perf_counter()
+    status = "error"
+    try:
+        async for chunk in _stream_agent_with_retries(runner, parts, until, max_retries, labels, start):
+            yield chunk
+        status = "ok"
+    except GeneratorExit:
+        # The caller stopped reading; it has what it needed
+        status = "ok"
+        raise
+    except asyncio.CancelledError:
+        status = "timeout" if expired() else "cancelled"
+        raise
+    finally:
+        AI_CALL_SECONDS.observe(time.perf_counter() - start, status=status, **labels)
+
+async def _stream_agent_with_retries(runner: "Runner", parts: list, until, max_retries: int, labels: dict, start: float) -> AsyncIterator[str]:
+    content = types.Content(role="user", parts=parts)
+    run_kwargs = {}
+    if getattr(runner, "stream_run_config", None) is not None:
+        run_kwargs["run_config"] = runner.stream_run_config
+    delay = 2
+    yielded = False
+
+    for attempt in range(max_retries + 1):
+        uid = str(uuid.uuid4())[:8]
+        sid = str(uuid.uuid4())[:8]
+        await runner.session_service.create_session(app_name="fitness_coach_app", user_id=uid, session_id=sid)
+
+        try:
+            text = ""
+            async with aclosing(runner.run_async(user_id=uid, session_id=sid, new_message=content, **run_kwargs)) as events:
+                async for event in events:
+                    chunk = extract_text_from_content(event.content)
+                    if not chunk:
+                        continue
+                    # Partial events carry deltas; the final event repeats the aggregated text
+                    if getattr(event, "partial", False) or not chunk.startswith(text):
+                        delta, text = chunk, text + chunk
+                    else:
+                        delta, text = chunk[len(text):], chunk
+                    if not delta:
+                        continue
+                    if not yielded:
+                        AI_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, **labels)
+                        yielded = True
+                    yield delta
+                    if until is not None and until(delta):
+                        AI_EARLY_EXIT_TOTAL.inc(**labels)
+                        return
+            return
+
+        except Exception as e:
+            error_msg = str(e)
+            if not yielded and ("429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg) and attempt < max_retries and _retry_fits(delay, labels):
+                logger.warning("429 from model, retrying in %ss (attempt %d/%d)", delay, attempt + 1, max_retries)
+                AI_RETRIES_TOTAL.inc(**labels)
+                await asyncio.sleep(delay)
+                delay *= 2
+            else:
+                raise
+        finally:
+            await _delete_session(runner, uid, sid)
+
+async def run_agent_text(runner: "Runner", parts: list, until: Optional[Callable[[str], bool]] = None, max_retries: int = 3) -> str:
+    """
+    The full text of a stream_agent call (up to where `until` stopped it), bounded like run_agent.
+    """
+    chunks = []
+    async with call_deadline(settings.AI_CALL_TIMEOUT_SECONDS):
+        async with aclosing(stream_agent(runner, parts, until=until, max_retries=max_retries)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+    return "".join(chunks)
+
+async def _delete_session(runner: "Runner", user_id: str, session_id: str):
+    # Cached runners are long-lived; drop per-call sessions so they don't accumulate
+    try:
+        await runner.session_service.delete_session(app_name="fitness_coach_app", user_id=user_id, session_id=session_id)
+    except Exception as e:
+        logger.debug("Session cleanup failed: %s", e)
+
+def extract_text_from_content(content: "types.Content") -> str:
     if not content or not content.parts:
         return ""
     text = ""
@@ -171,7 +406,7 @@ def decode_inline_data(data: object) -> bytes:
         return base64.b64decode(data)
     raise ValueError("Unsupported inline data format from model response")
 
-def extract_image_from_content(content: types.Content) -> bytes:
+def extract_image_from_content(content: "types.Content") -> bytes:
     if not content or not content.parts:
         raise ValueError("Model returned no content")
         
@@ -1,8 +1,12 @@
-from google import genai
+import logging
+from typing import Optional
+
 from backend.core.config import settings
 
-def generate_text_embedding(text: str) -> list:
-    """Generates a text embedding vector for the given text."""
+logger = logging.getLogger(__name__)
+
+def generate_text_embedding(text: str, timeout: Optional[float] = None) -> list:
+    """Generates a text embedding vector for the given text. `timeout` is in seconds."""
     # ADK might not expose embeddings directly yet, or it's on the model.
     # The ADK `Gemini` model might not have embed_content.
     # We should fallback to direct genai client for embeddings if ADK doesn't support it clearly.
@@ -17,16 +21,21 @@ def generate_text_embedding(text: str) -> list:
         return []
         
     try:
+        from google import genai
         client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+        config = {
+            "task_type": "SEMANTIC_SIMILARITY",
+            "output_dimensionality": 2048,
+        }
+        if timeout is not None:
+            # HttpOptions.timeout is in milliseconds
+            config["http_options"] = {"timeout": max(1, int(timeout * 1000))}
         response = client.models.embed_content(
             model="models/gemini-embedding-001",
             contents=text,
-            config={
-                "task_type": "SEMANTIC_SIMILARITY",
-                "output_dimensionality": 2048,
-            }
+            config=config
         )
         return response.embeddings[0].values
     except Exception as e:
-        print(f"Embedding generation failed: {e}")
+        logger.warning("Embedding generation failed: %s", e)
         return []
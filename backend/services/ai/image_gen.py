@@ -1,6 +1,14 @@
-from google.genai import types
+from backend.core.lazy import lazy_import
 from backend.services.ai.core import get_runner, run_agent, extract_image_from_content
 
+types = lazy_import("google.genai.types")
+
+def get_image_runner():
+    return get_runner(
+        model_name="gemini-2.5-flash-image", # Using flash-exp which often supports generation in preview
+        config=types.GenerateContentConfig(response_modalities=["IMAGE"])
+    )
+
 async def generate_future_physique(image_bytes: bytes, goal_key: str, mime_type: str = "image/jpeg") -> bytes:
     # Goal prompts map
     goals = {
@@ -17,10 +25,7 @@ async def generate_future_physique(image_bytes: bytes, goal_key: str, mime_type:
         "Generate a photorealistic, high-quality, 8k image. Ensure the body looks natural and not cartoonish."
     )
     
-    runner = get_runner(
-        model_name="gemini-2.5-flash-image", # Using flash-exp which often supports generation in preview
-        config=types.GenerateContentConfig(response_modalities=["IMAGE"])
-    )
+    runner = get_image_runner()
     
     parts = [
         types.Part(inline_data=types.Blob(mime_type=mime_type, data=image_bytes)),
@@ -0,0 +1,202 @@
+import json
+import logging
+import re
+from typing import Any, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from backend.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+AI_JSON_PARSE_TOTAL = registry.counter(
+    "ai_json_parse_total", "Model JSON outputs by call site and outcome (ok, repaired, truncated, failed)", ("call", "outcome")
+)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class ModelOutputError(ValueError):
+    """Model output had no usable JSON, or it failed schema validation."""
+
+
+class JSONScanner:
+    """
+    Incremental scanner for the first balanced JSON object or array in model output.
+
+    Feed it text as it streams in; `complete` flips once the value's closing bracket
+    arrives, so callers can stop reading early. Leading prose and ``` fences are skipped,
+    and brackets inside strings are ignored.
+
+        scanner = JSONScanner()
+        for chunk in chunks:
+            if scanner.feed(chunk):
+                break
+        data = scanner.parse()
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete or not chunk:
+            return self.complete
+        start = 0
+        for i, ch in enumerate(chunk):
+            if not self.started:
+                if ch not in _CLOSERS:
+                    continue
+                self.started = True
+                start = i
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._stack.append(_CLOSERS[ch])
+            elif self._stack and ch == self._stack[-1]:
+                self._stack.pop()
+                if not self._stack:
+                    self._buffer.append(chunk[start:i + 1])
+                    self.complete = True
+                    return True
+        if self.started:
+            self._buffer.append(chunk[start:])
+        return False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._buffer)
+
+    def parse(self) -> Any:
+        """Parse what has been scanned, repairing common defects (and truncation) if needed."""
+        return _loads(self.text)[0]
+
+
+def _outside_strings(text: str, fn) -> str:
+    # Apply `fn` to the stretches of `text` that are not inside JSON string literals
+    out, start, in_string, escaped = [], 0, False, False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                out.append(text[start:i + 1])
+                start = i + 1
+            elif ch == "\n":
+                # Raw newlines are invalid inside strings; models emit them in long descriptions
+                out.append(text[start:i] + "\\n")
+                start = i + 1
+        elif ch == '"':
+            out.append(fn(text[start:i]))
+            start = i
+            in_string = True
+    tail = text[start:]
+    out.append(tail if in_string else fn(tail))
+    return "".join(out)
+
+
+def _fix_tokens(segment: str) -> str:
+    segment = re.sub(r",\s*([}\]])", r"\1", segment)
+    segment = re.sub(r"\bTrue\b", "true", segment)
+    segment = re.sub(r"\bFalse\b", "false", segment)
+    return re.sub(r"\bNone\b", "null", segment)
+
+
+def _close_truncated(text: str) -> str:
+    # Close an unterminated string and any open brackets, dropping a dangling key or comma
+    stack, in_string, escaped = [], False, False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif stack and ch == stack[-1]:
+            stack.pop()
+    if in_string:
+        text += '"'
+    if not stack:
+        return text
+    text = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*|:\s*)$', "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fixes for defects models commonly produce: trailing commas, Python
+    literals (True/False/None), raw newlines inside strings and truncated output.
+    """
+    return _close_truncated(_outside_strings(text.strip(), _fix_tokens))
+
+
+def _loads(text: str) -> Tuple[Any, bool]:
+    """(value, repaired)"""
+    try:
+        return json.loads(text), False
+    except ValueError:
+        pass
+    try:
+        return json.loads(repair_json(text)), True
+    except ValueError as e:
+        raise ModelOutputError(f"Unparseable model JSON: {e}") from e
+
+
+def parse_model_output(text: str, schema: Type[ModelT], call: str, allow_truncated: bool = True) -> ModelT:
+    """
+    Extract, repair and validate a model's JSON answer against `schema`, counting the
+    outcome per call site. A top-level array is unwrapped to its first element, as
+    JSON-mode models sometimes wrap the object they were asked for.
+
+    With allow_truncated=False, output that stops before its closing bracket is rejected
+    instead of being closed off: for answers where a missing tail (e.g. the last days of
+    a plan) would still validate but be wrong.
+    """
+    outcome = "failed"
+    try:
+        scanner = JSONScanner()
+        scanner.feed(text or "")
+        if not scanner.started:
+            raise ModelOutputError(f"No JSON found in model output: {(text or '')[:200]!r}")
+        if not scanner.complete and not allow_truncated:
+            outcome = "truncated"
+            raise ModelOutputError(f"Truncated model JSON ({len(scanner.text)} chars)")
+        data, repaired = _loads(scanner.text)
+        if isinstance(data, list) and data:
+            data = data[0]
+        try:
+            result = schema.model_validate(data)
+        except ValidationError as e:
+            raise ModelOutputError(f"Model JSON failed {schema.__name__} validation: {e}") from e
+        outcome = "repaired" if repaired else "ok"
+        if repaired:
+            logger.info("Repaired malformed model JSON from %s", call)
+        return result
+    finally:
+        AI_JSON_PARSE_TOTAL.inc(call=call, outcome=outcome)
+
+
+def dump_output(result: BaseModel) -> dict:
+    """The validated output as a dict shaped like the model's JSON: no defaults filled in."""
+    return result.model_dump(exclude_unset=True)
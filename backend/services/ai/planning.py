@@ -1,32 +1,29 @@
 import json
 import asyncio
+import logging
+import time
 import uuid
 import datetime
+import functools
 from typing import List, Dict, Any, Optional
 
-from google.genai import types
-from google.adk.agents import Agent, SequentialAgent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models import Gemini
-
-from backend.services.ai.core import get_runner, run_agent, extract_text_from_content, check_ai_connection
+from backend.services.ai.core import get_runner, run_agent_text, check_ai_connection
 from backend.services.ai.embedding import generate_text_embedding
+from backend.services.ai.parsing import JSONScanner, dump_output, parse_model_output
+from backend.services.ai.schemas import PlanOutput, SkeletonOutput
 from backend.services.firebase_service import get_db
-from opik.integrations.adk import OpikTracer, track_adk_agent_recursive
-import opik
+from backend.core.config import settings
+from backend.core.deadline import DeadlineExceeded, timeout_for
+from backend.core.lazy import lazy_import
+from backend.core.metrics import WORKOUT_SEARCH_STAGE_SECONDS, PLAN_STAGE_SECONDS
+
+types = lazy_import("google.genai.types")
 
-# Configure Opik
-opik.configure(use_local=False)
-opik_tracer = OpikTracer(
-    name="fitness-planner-pipeline",
-    tags=["planning", "rag", "multi-agent"],
-    project_name="fitness_coach"
-)
+logger = logging.getLogger(__name__)
 
 # --- Tools ---
 
-def search_workouts_tool(query: str, max_duration: Optional[int] = None, min_duration: Optional[int] = None) -> str:
+def search_workouts_tool(query: str, max_duration: Optional[int] = None, min_duration: Optional[int] = None, timeout: Optional[float] = None) -> str:
     """
     Searches for workouts using semantic vector search against the workout library.
     
@@ -34,26 +31,26 @@ def search_workouts_tool(query: str, max_duration: Optional[int] = None, min_dur
         query: The search query description (e.g. "high intensity leg workout").
         max_duration: Optional maximum duration in minutes.
         min_duration: Optional minimum duration in minutes.
+        timeout: Optional timeout in seconds for each of the embedding and vector query RPCs.
         
     Returns:
         JSON string list of matching workouts with details (id, title, focus, difficulty).
     """
-    import sys
-    print(f"[Tool] Searching workouts for: '{query}' (max={max_duration}, min={min_duration})", file=sys.stderr)
-    print(f"[Tool] Searching workouts for: '{query}' (max={max_duration}, min={min_duration})")
+    logger.debug("Searching workouts for %r (max=%s, min=%s)", query, max_duration, min_duration)
     
     db = get_db()
     if not db:
-        print("[Tool] Database connection failed.")
+        logger.error("Workout search: database connection failed")
         return json.dumps([{"id": "fallback_db_error", "title": "Rest or Stretch (System Error)", "focus": ["Recovery"], "difficulty": "Beginner"}])
     
     text_to_embed = f"{query}"
     # Remove focus parameter logic
     
-    query_embedding = generate_text_embedding(text_to_embed)
+    with WORKOUT_SEARCH_STAGE_SECONDS.time(stage="embed"):
+        query_embedding = generate_text_embedding(text_to_embed, timeout=timeout)
     
     if not query_embedding:
-        print("[Tool] Embedding generation failed.")
+        logger.warning("Workout search: embedding generation failed for %r", query)
         return json.dumps([{"id": "fallback_embedding_error", "title": "Rest or Stretch (AI Error)", "focus": ["Recovery"], "difficulty": "Beginner"}])
         
     try:
@@ -64,7 +61,7 @@ def search_workouts_tool(query: str, max_duration: Optional[int] = None, min_dur
         from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
         
         # We assume the 'embedding' field exists and is indexed
-        print(f"[Tool] Executing vector query with dim={len(query_embedding)}...")
+        logger.debug("Executing vector query with dim=%d", len(query_embedding))
         
         # Fetch a limited number of nearest neighbors for post-filtering
         vector_query = collection.find_nearest(
@@ -74,9 +71,11 @@ def search_workouts_tool(query: str, max_duration: Optional[int] = None, min_dur
             limit=20  # Limit neighbors to reduce latency while keeping diversity
         )
         
-        results = vector_query.get()
-        print(f"[Tool] Vector query returned {len(results)} results.")
+        with WORKOUT_SEARCH_STAGE_SECONDS.time(stage="query"):
+            results = vector_query.get(timeout=timeout)
+        logger.debug("Vector query returned %d results", len(results))
         
+        filter_start = time.perf_counter()
         workouts = []
         raw_docs = [doc.to_dict() for doc in results]
 
@@ -125,18 +124,30 @@ def search_workouts_tool(query: str, max_duration: Optional[int] = None, min_dur
                 }
                 workouts.append(workout_clean)
 
+        WORKOUT_SEARCH_STAGE_SECONDS.observe(time.perf_counter() - filter_start, stage="filter")
+
         if not workouts:
             return json.dumps([{"id": "fallback", "title": "Rest or Stretch", "focus": ["Recovery"], "difficulty": "Beginner"}])
 
-        print(f"[Tool] Found {len(workouts)} workouts for query: '{query}'")
-        print(f"[Tool] Workouts: {workouts}")
+        logger.debug("Found %d workouts for %r: %s", len(workouts), query, [w["id"] for w in workouts])
 
         return json.dumps(workouts)
         
     except Exception as e:
-        print(f"[Tool] Vector search failed: {e}")
+        logger.exception("Vector search failed for %r", query)
         return json.dumps([{"id": "fallback_exception", "title": "Rest or Stretch (Search Error)", "focus": ["Recovery"], "difficulty": "Beginner"}])
 
+async def search_workouts(query: str, max_duration: Optional[int] = None, min_duration: Optional[int] = None) -> str:
+    """
+    search_workouts_tool off the event loop. Its RPCs get the request's remaining budget
+    (capped at SEARCH_TIMEOUT_SECONDS) since the executor thread itself can't be cancelled.
+    """
+    timeout = timeout_for(settings.SEARCH_TIMEOUT_SECONDS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(search_workouts_tool, query, max_duration, min_duration, timeout=timeout)
+    )
+
 # --- Agents ---
 
 # Instructions
@@ -195,46 +206,53 @@ ASSEMBLER_INSTRUCTION = """
     }
     """
 
+def get_skeleton_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        instruction=SKELETON_INSTRUCTION,
+        tracer_name="SkeletonGenerator"
+    )
+
+def get_assembler_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        instruction=ASSEMBLER_INSTRUCTION,
+        tracer_name="PlanAssembler"
+    )
+
 async def generate_weekly_plan_rag(user_goal: str, available_workouts: list = None) -> dict:
     """
     Generates a 1-week workout plan using ADK Agents and Vector Search (Manual Orchestration).
     """
-    print(f"Generating plan for: {user_goal}")
+    logger.info("Generating plan for goal %r", user_goal)
 
     # 1. Run Skeleton Agent
-    print("--- Step 1: Generating Skeleton ---")
     
-    skeleton_runner = get_runner(
-        model_name="gemini-2.0-flash",
-        instruction=SKELETON_INSTRUCTION,
-        tracer_name="SkeletonGenerator"
-    )
+    skeleton_runner = get_skeleton_runner()
     
     prompt = f"Create a workout plan for goal: {user_goal}"
     content = types.Content(role="user", parts=[types.Part(text=prompt)])
     
     skeleton_text = ""
     try:
-        skeleton_content = await run_agent(skeleton_runner, [types.Part(text=prompt)])
-        skeleton_text = extract_text_from_content(skeleton_content)
+        with PLAN_STAGE_SECONDS.time(stage="skeleton"):
+            skeleton_text = await run_agent_text(skeleton_runner, [types.Part(text=prompt)], until=JSONScanner().feed)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"Skeleton Agent Error: {e}")
+        logger.exception("Skeleton agent failed")
         return _fallback_error_plan(str(e))
 
     # Parse Skeleton
     try:
-        clean_skel = skeleton_text.replace("```json", "").replace("```", "").strip()
-        # Handle potential leading text before json
-        if "{" in clean_skel:
-            clean_skel = clean_skel[clean_skel.find("{"):clean_skel.rfind("}")+1]
-        skeleton_json = json.loads(clean_skel)
-        print("Skeleton generated successfully.")
+        skeleton_json = dump_output(parse_model_output(skeleton_text, SkeletonOutput, "plan_skeleton", allow_truncated=False))
+        logger.debug("Skeleton generated")
     except Exception as e:
-        print(f"Skeleton parsing failed: {e}\nText: {skeleton_text}")
+        logger.warning("Skeleton parsing failed: %s (text=%.500r)", e, skeleton_text)
         return _fallback_error_plan("Failed to parse skeleton")
 
     # 2. Manual Retrieval Loop
-    print("--- Step 2: Retrieving Workouts ---")
+    retrieval_start = time.perf_counter()
     schedule = []
     days = skeleton_json.get("days", [])
     
@@ -254,7 +272,7 @@ async def generate_weekly_plan_rag(user_goal: str, available_workouts: list = No
         if not is_rest and query:
              try:
                  # Call tool directly
-                 results_json = search_workouts_tool(query)
+                 results_json = await search_workouts(query)
                  results = json.loads(results_json)
                  
                  if results and isinstance(results, list) and len(results) > 0:
@@ -264,11 +282,13 @@ async def generate_weekly_plan_rag(user_goal: str, available_workouts: list = No
                      if not str(first.get("id", "")).startswith("fallback"):
                          selected_workout = first
                      else:
-                         print(f"  Day {day_num}: Tool returned fallback for '{query}'")
+                         logger.info("Day %s: search returned fallback for %r", day_num, query)
                  else:
-                     print(f"  Day {day_num}: No results for '{query}'")
-             except Exception as e:
-                 print(f"  Day {day_num}: Retrieval error: {e}")
+                     logger.info("Day %s: no results for %r", day_num, query)
+             except DeadlineExceeded:
+                 raise
+             except Exception:
+                 logger.exception("Day %s: retrieval error", day_num)
         
         schedule.append({
             "day": day_num,
@@ -277,15 +297,11 @@ async def generate_weekly_plan_rag(user_goal: str, available_workouts: list = No
         })
         
     retrieved_plan = {"schedule": schedule}
+    PLAN_STAGE_SECONDS.observe(time.perf_counter() - retrieval_start, stage="retrieval")
     
     # 3. Run Assembler Agent
-    print("--- Step 3: Assembling Plan ---")
     
-    assembler_runner = get_runner(
-        model_name="gemini-2.0-flash",
-        instruction=ASSEMBLER_INSTRUCTION,
-        tracer_name="PlanAssembler"
-    )
+    assembler_runner = get_assembler_runner()
     
     # Pass the plan explicitly in the prompt to avoid "code writing" behavior
     retrieved_plan_str = json.dumps(retrieved_plan, indent=2)
@@ -299,30 +315,45 @@ async def generate_weekly_plan_rag(user_goal: str, available_workouts: list = No
     
     final_text = ""
     try:
-        assembler_content = await run_agent(assembler_runner, [types.Part(text=assemble_prompt)])
-        final_text = extract_text_from_content(assembler_content)
+        with PLAN_STAGE_SECONDS.time(stage="assembler"):
+            final_text = await run_agent_text(assembler_runner, [types.Part(text=assemble_prompt)], until=JSONScanner().feed)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"Assembler Agent Error: {e}")
+        logger.exception("Assembler agent failed")
         return _fallback_error_plan(str(e))
                  
     # Parse Final Plan
     final_plan_json = None
     try:
-        clean_text = final_text.replace("```json", "").replace("```", "").strip()
-        if "{" in clean_text:
-            clean_text = clean_text[clean_text.find("{"):clean_text.rfind("}")+1]
-        final_plan_json = json.loads(clean_text)
-        print("Plan assembled successfully.")
+        final_plan_json = dump_output(parse_model_output(final_text, PlanOutput, "plan_assembler", allow_truncated=False))
+        logger.debug("Plan assembled")
     except Exception as e:
-        print(f"Final plan parsing failed: {e}\nText: {final_text}")
+        logger.warning("Final plan parsing failed: %s (text=%.500r)", e, final_text)
         return _fallback_error_plan("Failed to parse final plan")
 
+    problem = _plan_days_problem(final_plan_json, days)
+    if problem:
+        logger.warning("Assembled plan rejected: %s (text=%.500r)", problem, final_text)
+        return _fallback_error_plan("Incomplete final plan")
+
     # 4. Enrich Final Plan
     if final_plan_json:
         return enrich_plan_with_details(final_plan_json, retrieved_plan)
             
     return _fallback_error_plan("Unknown error")
 
+def _plan_days_problem(plan: dict, skeleton_days: List[dict]) -> Optional[str]:
+    """
+    Why the assembled plan does not cover the skeleton's days one-for-one, or None.
+    Missing workout ids are left to enrich_plan_with_details, which restores or rests them.
+    """
+    expected = sorted(day.get("day") for day in skeleton_days)
+    assembled = sorted(day.get("day") for day in plan.get("schedule", []))
+    if assembled != expected:
+        return f"days {assembled} do not match the skeleton's {expected}"
+    return None
+
 def _fallback_error_plan(error_msg):
     return {
         "weekly_focus": f"Error Generating Plan: {error_msg}",
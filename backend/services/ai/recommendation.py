@@ -1,23 +1,12 @@
-import json
-from google.genai import types
-from backend.services.ai.core import get_runner, run_agent, extract_text_from_content
+from backend.core.lazy import lazy_import
+from backend.core.deadline import DeadlineExceeded
+from backend.services.ai.core import get_runner, run_agent_text
+from backend.services.ai.parsing import JSONScanner, dump_output, parse_model_output
+from backend.services.ai.schemas import RecommendationOutput
 
-async def recommend_fitness_path(
-    original_image_bytes: bytes,
-    lean_image_bytes: bytes,
-    athletic_image_bytes: bytes,
-    muscle_image_bytes: bytes,
-    mime_type: str = "image/jpeg"
-) -> dict:
-    prompt = """
-    You are an expert fitness coach helping a user choose a transformation path.
-    
-    I will provide 4 images:
-    1. The user's current physique (Original)
-    2. A potential 'Lean & Toned' future self (Lean)
-    3. A potential 'Athletic Build' future self (Athletic)
-    4. A potential 'Muscle Gain' future self (Muscle)
-    
+types = lazy_import("google.genai.types")
+
+RECOMMENDATION_OUTPUT_INSTRUCTIONS = """
     Your task:
     Analyze the gap between the current state and each goal. Provide a realistic assessment.
     
@@ -47,6 +36,43 @@ async def recommend_fitness_path(
     
     Do NOT provide medical advice. Be realistic about natural transformation timelines.
     """
+
+FOUR_IMAGE_INTRO = """
+    You are an expert fitness coach helping a user choose a transformation path.
+    
+    I will provide 4 images:
+    1. The user's current physique (Original)
+    2. A potential 'Lean & Toned' future self (Lean)
+    3. A potential 'Athletic Build' future self (Athletic)
+    4. A potential 'Muscle Gain' future self (Muscle)
+    
+"""
+
+COMPOSITE_INTRO = """
+    You are an expert fitness coach helping a user choose a transformation path.
+    
+    I will provide ONE image arranged as a 2x2 grid, each tile labelled:
+    - Top-left: The user's current physique (Original)
+    - Top-right: A potential 'Lean & Toned' future self (Lean)
+    - Bottom-left: A potential 'Athletic Build' future self (Athletic)
+    - Bottom-right: A potential 'Muscle Gain' future self (Muscle)
+    
+"""
+
+def get_recommendation_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        config=types.GenerateContentConfig(response_mime_type="application/json")
+    )
+
+async def recommend_fitness_path(
+    original_image_bytes: bytes,
+    lean_image_bytes: bytes,
+    athletic_image_bytes: bytes,
+    muscle_image_bytes: bytes,
+    mime_type: str = "image/jpeg"
+) -> dict:
+    prompt = FOUR_IMAGE_INTRO + RECOMMENDATION_OUTPUT_INSTRUCTIONS
     
     parts = [
         types.Part(text=prompt),
@@ -60,15 +86,27 @@ async def recommend_fitness_path(
         types.Part(inline_data=types.Blob(mime_type=mime_type, data=muscle_image_bytes)),
     ]
     
-    runner = get_runner(
-        model_name="gemini-2.0-flash",
-        config=types.GenerateContentConfig(response_mime_type="application/json")
-    )
+    return await _run_recommendation(parts)
+
+async def recommend_fitness_path_from_composite(composite_image_bytes: bytes, mime_type: str = "image/jpeg") -> dict:
+    """Same as recommend_fitness_path, but from a single downscaled 2x2 composite (see image_service)."""
+    prompt = COMPOSITE_INTRO + RECOMMENDATION_OUTPUT_INSTRUCTIONS
+
+    parts = [
+        types.Part(text=prompt),
+        types.Part(inline_data=types.Blob(mime_type=mime_type, data=composite_image_bytes)),
+    ]
+
+    return await _run_recommendation(parts)
+
+async def _run_recommendation(parts: list) -> dict:
+    runner = get_recommendation_runner()
     
     try:
-        result_content = await run_agent(runner, parts)
-        text_response = extract_text_from_content(result_content)
-        return json.loads(text_response)
+        text_response = await run_agent_text(runner, parts, until=JSONScanner().feed)
+        return dump_output(parse_model_output(text_response, RecommendationOutput, "recommend_fitness_path"))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return {
             "error": "Failed to parse AI response", 
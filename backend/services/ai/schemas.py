@@ -0,0 +1,103 @@
+"""
+Expected shapes of the JSON each model call returns, checked by parsing.parse_model_output.
+Fields the prompts ask for are declared; anything else the model adds is kept (extra="allow").
+"""
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+
+class _ModelOutput(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+def _lower(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+# --- Chat (agent.py) ---
+
+class IntentOutput(_ModelOutput):
+    intent: str = "OTHER"
+
+
+class SemanticQueryOutput(_ModelOutput):
+    query: str = ""
+
+
+class AdjustmentMessageOutput(_ModelOutput):
+    summary: Optional[str] = None
+    agent_message: Optional[str] = None
+
+
+class AdjustmentOutput(_ModelOutput):
+    new_workout_id: Optional[str] = None
+    new_activity_title: Optional[str] = None
+    is_rest: bool = False
+    reasoning_summary: Optional[str] = None
+    agent_message: Optional[str] = None
+
+
+# --- Plan generation (planning.py) ---
+
+class SkeletonDay(_ModelOutput):
+    day: int
+    focus: str = ""
+    search_query: str = ""
+
+
+class SkeletonOutput(_ModelOutput):
+    days: List[SkeletonDay]
+
+
+class PlanDay(_ModelOutput):
+    day: int
+    day_name: Optional[str] = None
+    is_rest: bool = False
+    workout_id: Optional[str] = None
+    activity: Optional[str] = None
+
+
+class PlanOutput(_ModelOutput):
+    weekly_focus: Optional[str] = None
+    schedule: List[PlanDay]
+
+
+# --- Observe / decide (vision.py, recommendation.py) ---
+
+class PotentialBody(_ModelOutput):
+    type: str
+    goal_key: Literal["lean", "athletic", "muscle"]
+    visual_prompt: str
+
+    _normalize_goal = field_validator("goal_key", mode="before")(_lower)
+
+
+class BodyAnalysisOutput(_ModelOutput):
+    category: str
+    reasoning: Optional[str] = None
+    estimated_body_fat: Optional[float] = None
+    estimated_muscle_mass: Optional[float] = None
+    body_type_description: Optional[str] = None
+    potential_bodies: List[PotentialBody] = []
+
+
+class PathEstimate(_ModelOutput):
+    time_estimate: Optional[str] = None
+    effort_level: Optional[str] = None
+    description: Optional[str] = None
+
+
+class PathRecommendation(_ModelOutput):
+    suggested_path: Literal["lean", "athletic", "muscle"]
+    reasoning: Optional[str] = None
+    confidence_score: Optional[float] = None
+
+    _normalize_path = field_validator("suggested_path", mode="before")(_lower)
+
+
+class RecommendationOutput(_ModelOutput):
+    lean: Optional[PathEstimate] = None
+    athletic: Optional[PathEstimate] = None
+    muscle: Optional[PathEstimate] = None
+    recommendation: PathRecommendation
@@ -1,6 +1,16 @@
-import json
-from google.genai import types
-from backend.services.ai.core import get_runner, run_agent, extract_text_from_content
+from backend.core.lazy import lazy_import
+from backend.core.deadline import DeadlineExceeded
+from backend.services.ai.core import get_runner, run_agent_text
+from backend.services.ai.parsing import JSONScanner, dump_output, parse_model_output
+from backend.services.ai.schemas import BodyAnalysisOutput
+
+types = lazy_import("google.genai.types")
+
+def get_vision_runner():
+    return get_runner(
+        model_name="gemini-2.0-flash",
+        config=types.GenerateContentConfig(response_mime_type="application/json")
+    )
 
 async def analyze_body_image(image_bytes: bytes, mime_type: str = "image/jpeg") -> dict:
     prompt = """
@@ -24,10 +34,7 @@ async def analyze_body_image(image_bytes: bytes, mime_type: str = "image/jpeg")
     Do NOT provide medical advice. These are visual estimates only.
     """
     
-    runner = get_runner(
-        model_name="gemini-2.0-flash",
-        config=types.GenerateContentConfig(response_mime_type="application/json")
-    )
+    runner = get_vision_runner()
     
     parts = [
         types.Part(inline_data=types.Blob(mime_type=mime_type, data=image_bytes)),
@@ -35,8 +42,9 @@ async def analyze_body_image(image_bytes: bytes, mime_type: str = "image/jpeg")
     ]
     
     try:
-        result_content = await run_agent(runner, parts)
-        text_response = extract_text_from_content(result_content)
-        return json.loads(text_response)
+        text_response = await run_agent_text(runner, parts, until=JSONScanner().feed)
+        return dump_output(parse_model_output(text_response, BodyAnalysisOutput, "analyze_body_image"))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return {"category": "Unknown", "reasoning": f"Failed to parse AI response: {str(e)}"}
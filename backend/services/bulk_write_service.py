@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# gRPC codes worth retrying: contention (ABORTED), throttling and transient backend errors
+RETRYABLE_CODES = {
+    4,   # DEADLINE_EXCEEDED
+    8,   # RESOURCE_EXHAUSTED
+    10,  # ABORTED
+    13,  # INTERNAL
+    14,  # UNAVAILABLE
+}
+
+
+class BulkWriteJob:
+    """
+    Thin wrapper around Firestore's BulkWriter for maintenance scripts.
+
+    Writes are grouped into batches of up to BULK_WRITE_BATCH_SIZE ops and sent
+    in parallel (ramping from 500 ops/s, per Firestore's 500/50/5 guidance).
+    Failed writes with a retryable status are retried with linear backoff up to
+    BULK_WRITE_MAX_ATTEMPTS; everything else is recorded in `failures`. A summary
+    is reported through `progress` (logger.info by default) on close.
+
+        with BulkWriteJob(db, "reset workout_library") as job:
+            for doc in docs:
+                job.delete(doc.reference)
+    """
+
+    def __init__(
+        self,
+        db,
+        label: str = "bulk write",
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        progress: Optional[Callable[[str], None]] = None,
+        progress_every: int = 500,
+    ):
+        from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions, BulkRetry, SendMode
+
+        self.label = label
+        self.max_attempts = max_attempts or settings.BULK_WRITE_MAX_ATTEMPTS
+        self.progress = progress or logger.info
+        self.progress_every = progress_every
+
+        options = BulkWriterOptions(
+            initial_ops_per_second=500,
+            max_ops_per_second=max(500, settings.BULK_WRITE_MAX_OPS_PER_SECOND),
+            mode=SendMode.parallel,
+            retry=BulkRetry.linear,
+        )
+        self._writer = db.bulk_writer(options=options)
+        self._writer.batch_size = min(batch_size or settings.BULK_WRITE_BATCH_SIZE, 500)
+        self._writer.on_write_result(self._handle_result)
+        self._writer.on_write_error(self._handle_error)
+        self._writer.on_batch_result(self._handle_batch)
+
+        # Callbacks run on the writer's sender threads
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.written = 0
+        self.retried = 0
+        self.batches = 0
+        self.failures: List[dict] = []
+        self._last_reported = 0
+        self._started = time.perf_counter()
+
+    # --- Operations ---
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self.queued += 1
+        self._writer.set(reference, data, merge=merge)
+
+    def update(self, reference, field_updates: dict):
+        self.queued += 1
+        self._writer.update(reference, field_updates)
+
+    def delete(self, reference):
+        self.queued += 1
+        self._writer.delete(reference)
+
+    def flush(self) -> dict:
+        """Block until every queued write has been committed or has failed for good."""
+        self._drain()
+        return self.stats()
+
+    def close(self) -> dict:
+        # BulkWriter.close() rejects the retries it schedules itself, so drain them while still open
+        self._drain()
+        self._writer.close()
+        stats = self.stats()
+        self.progress(
+            f"{self.label}: {stats['written']}/{stats['queued']} written in {stats['batches']} batches "
+            f"({stats['retried']} retries, {stats['failed']} failed) in {stats['elapsed_seconds']}s"
+        )
+        return stats
+
+    def _drain(self):
+        # BulkWriter.flush() shuts its executor down when it finishes, and a later flush()
+        # returns at once unless a full batch happened to restart it; restart it ourselves
+        self._writer._ensure_executor()
+        self._writer.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- BulkWriter callbacks ---
+
+    def _handle_result(self, reference, result, writer):
+        with self._lock:
+            self.written += 1
+
+    def _handle_error(self, failure, writer) -> bool:
+        if failure.code in RETRYABLE_CODES and failure.attempts < self.max_attempts:
+            with self._lock:
+                self.retried += 1
+            return True
+        with self._lock:
+            self.failures.append({
+                "path": failure.operation.reference.path,
+                "code": failure.code,
+                "message": failure.message,
+                "attempts": failure.attempts,
+            })
+        logger.warning("%s: giving up on %s after %d attempts: %s", self.label, failure.operation.reference.path, failure.attempts, failure.message)
+        return False
+
+    def _handle_batch(self, batch, response, writer):
+        with self._lock:
+            self.batches += 1
+            done = self.written + len(self.failures)
+            report = done - self._last_reported >= self.progress_every
+            if report:
+                self._last_reported = done
+        if report:
+            self.progress(f"{self.label}: {done}/{self.queued} done...")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "written": self.written,
+                "failed": len(self.failures),
+                "retried": self.retried,
+                "batches": self.batches,
+                "elapsed_seconds": round(time.perf_counter() - self._started, 2),
+            }
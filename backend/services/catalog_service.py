@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.core.config import settings
+from backend.core.metrics import FIRESTORE_OP_SECONDS
+from backend.services.firebase_service import get_db
+
+logger = logging.getLogger(__name__)
+
+# workout_library without embeddings, as (loaded_at, workouts)
+_catalog: Optional[tuple] = None
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog() -> List[dict]:
+    db = get_db()
+    if db is None:
+        raise RuntimeError("Firestore is not initialized")
+    with FIRESTORE_OP_SECONDS.time(op="workout_library.stream"):
+        workout_docs = list(db.collection("workout_library").stream())
+    workouts = []
+    for doc in workout_docs:
+        w_data = doc.to_dict()
+        w_data['id'] = doc.id
+        # Remove embedding to save bandwidth/tokens
+        w_data.pop('embedding', None)
+        workouts.append(w_data)
+    return workouts
+
+
+def get_workout_catalog(force_refresh: bool = False) -> List[dict]:
+    """
+    The workout library (minus embeddings), cached for WORKOUT_CATALOG_TTL_SECONDS.
+    Returns shallow copies so callers can attach them to plans without touching the cache.
+    """
+    global _catalog
+    ttl = settings.WORKOUT_CATALOG_TTL_SECONDS
+    with _catalog_lock:
+        cached = _catalog
+    if not force_refresh and ttl > 0 and cached and time.time() - cached[0] < ttl:
+        return [dict(w) for w in cached[1]]
+
+    workouts = _load_catalog()
+    with _catalog_lock:
+        _catalog = (time.time(), workouts)
+    logger.debug("Workout catalog loaded: %d workouts", len(workouts))
+    return [dict(w) for w in workouts]
+
+
+def get_workout_map(workouts: List[dict]) -> Dict[str, dict]:
+    return {w['id']: w for w in workouts}
+
+
+def invalidate_workout_catalog():
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def get_catalog_stats() -> dict:
+    with _catalog_lock:
+        cached = _catalog
+    if not cached:
+        return {"loaded": False, "size": 0, "age_seconds": None}
+    return {"loaded": True, "size": len(cached[1]), "age_seconds": round(time.time() - cached[0], 1)}
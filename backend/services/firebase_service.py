@@ -1,28 +1,44 @@
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
 from backend.core.config import settings
+from backend.core.lazy import lazy_import
+from backend.core.metrics import registry, FIRESTORE_OP_SECONDS, STORAGE_OP_SECONDS
+from collections import OrderedDict
+import copy
+import datetime
+import hashlib
+import logging
+import shutil
+import threading
+import time
 import os
 
+# The Firebase/GCP clients are slow to import; defer them until Firebase is initialized
+firebase_admin = lazy_import("firebase_admin")
+credentials = lazy_import("firebase_admin.credentials")
+firestore = lazy_import("firebase_admin.firestore")
+storage = lazy_import("firebase_admin.storage")
+
 _db = None
 _bucket = None
 
+logger = logging.getLogger(__name__)
+
 def initialize_firebase():
     global _db, _bucket
     try:
         if not firebase_admin._apps:
-            print(f"Initializing Firebase with credentials from: {settings.FIREBASE_CREDENTIALS_PATH}")
+            logger.info("Initializing Firebase with credentials from: %s", settings.FIREBASE_CREDENTIALS_PATH)
             if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
                 cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
                 firebase_admin.initialize_app(cred, {
                     'storageBucket': settings.FIREBASE_STORAGE_BUCKET
                 })
-                print("Firebase initialized successfully.")
+                logger.info("Firebase initialized successfully.")
             else:
-                print(f"Warning: Firebase credentials not found at {settings.FIREBASE_CREDENTIALS_PATH}")
+                logger.warning("Firebase credentials not found at %s", settings.FIREBASE_CREDENTIALS_PATH)
                 # Try relative path as fallback
                 fallback_path = "firebase-credentials.json"
                 if os.path.exists(fallback_path):
-                     print(f"Found credentials at fallback path: {fallback_path}")
+                     logger.info("Found credentials at fallback path: %s", fallback_path)
                      cred = credentials.Certificate(fallback_path)
                      firebase_admin.initialize_app(cred, {
                         'storageBucket': settings.FIREBASE_STORAGE_BUCKET
@@ -34,14 +50,12 @@ def initialize_firebase():
         try:
              _bucket = storage.bucket()
         except Exception as e:
-             print(f"Warning: Could not get storage bucket: {e}")
+             logger.warning("Could not get storage bucket: %s", e)
              _bucket = None
              
         return True
     except Exception as e:
-        print(f"Failed to initialize Firebase: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to initialize Firebase: %s", e)
         return False
 
 def get_db():
@@ -56,43 +70,630 @@ def get_bucket():
         initialize_firebase()
     return _bucket
 
+def set_db(db):
+    """Override the Firestore client, e.g. with a local fake in tests or benchmarks."""
+    global _db
+    _db = db
+
+def set_bucket(bucket):
+    """Override the Storage bucket, e.g. with a local fake in tests."""
+    global _bucket
+    _bucket = bucket
+
+class BlobCache:
+    """
+    Bounded local cache for Storage blobs, keyed by storage path.
+    Entries live in memory (LRU by bytes); entries evicted from memory spill to a
+    directory on disk, which is itself LRU-bounded by bytes. Entries expire after a TTL.
+    Thread-safe, since downloads run in executor threads. The lock only guards the
+    indexes: spill files are read, written and removed outside it, each under a unique
+    name so a reader never sees a half-written or reused file.
+    """
+
+    def __init__(self, max_memory_bytes: int, max_disk_bytes: int, disk_dir: str, ttl_seconds: int):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        # One subdirectory per process: the disk index is in-memory, so files are only ours to manage
+        self.root_dir = disk_dir
+        self.disk_dir = os.path.join(disk_dir, str(os.getpid()))
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # path -> (data, stored_at)
+        self._disk = OrderedDict()    # path -> (size, stored_at, file)
+        self._pending = {}            # path -> file of a spill being written
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "spills": 0, "evictions": 0}
+        self._remove_stale_dirs()
+
+    def _remove_stale_dirs(self):
+        # Spill files left by earlier (or dead) processes are not in any index and would never be evicted
+        try:
+            names = os.listdir(self.root_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.root_dir, name)
+            if name.isdigit() and os.path.isdir(path) and (int(name) == os.getpid() or not _pid_alive(int(name))):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _new_file(self, storage_path: str) -> str:
+        self._seq += 1
+        digest = hashlib.sha1(storage_path.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}-{self._seq}")
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, storage_path: str):
+        removals = []
+        with self._lock:
+            entry = self._memory.get(storage_path)
+            if entry is not None:
+                data, stored_at = entry
+                if not self._expired(stored_at):
+                    self._memory.move_to_end(storage_path)
+                    self.stats["memory_hits"] += 1
+                    return data
+                self._drop_memory(storage_path)
+
+            entry = self._disk.get(storage_path)
+            disk_file = None
+            if entry is not None:
+                if self._expired(entry[1]):
+                    self._drop_disk(storage_path, removals)
+                else:
+                    self._disk.move_to_end(storage_path)
+                    disk_file = entry[2]
+
+        if disk_file is not None:
+            try:
+                with open(disk_file, "rb") as f:
+                    data = f.read()
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                return data
+            except OSError:
+                # Evicted or replaced while we were reading
+                with self._lock:
+                    current = self._disk.get(storage_path)
+                    if current is not None and current[2] == disk_file:
+                        self._drop_disk(storage_path, removals)
+
+        with self._lock:
+            self.stats["misses"] += 1
+        self._remove_files(removals)
+        return None
+
+    def put(self, storage_path: str, data: bytes):
+        size = len(data)
+        removals, spills = [], []
+        with self._lock:
+            self._drop_memory(storage_path)
+            self._drop_disk(storage_path, removals)
+            self._pending.pop(storage_path, None)
+            self.stats["puts"] += 1
+            if size > self.max_memory_bytes:
+                # Too big for memory, go straight to disk
+                self._reserve_spill(storage_path, data, time.time(), spills)
+            else:
+                self._memory[storage_path] = (data, time.time())
+                self._memory_bytes += size
+                while self._memory_bytes > self.max_memory_bytes and self._memory:
+                    old_path, (old_data, old_stored_at) = self._memory.popitem(last=False)
+                    self._memory_bytes -= len(old_data)
+                    self._reserve_spill(old_path, old_data, old_stored_at, spills)
+        self._remove_files(removals)
+        for spill in spills:
+            self._write_spill(*spill)
+
+    def invalidate(self, storage_path: str):
+        removals = []
+        with self._lock:
+            self._drop_memory(storage_path)
+            self._drop_disk(storage_path, removals)
+            self._pending.pop(storage_path, None)
+        self._remove_files(removals)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # The helpers below that take `removals`/`spills` assume the lock is held and
+    # only record file work; callers carry it out after releasing the lock
+
+    def _drop_memory(self, storage_path: str):
+        entry = self._memory.pop(storage_path, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+
+    def _drop_disk(self, storage_path: str, removals: list):
+        entry = self._disk.pop(storage_path, None)
+        if entry is not None:
+            self._disk_bytes -= entry[0]
+            removals.append(entry[2])
+
+    def _reserve_spill(self, storage_path: str, data: bytes, stored_at: float, spills: list):
+        size = len(data)
+        if self.max_disk_bytes <= 0 or size > self.max_disk_bytes or self._expired(stored_at):
+            self.stats["evictions"] += 1
+            return
+        disk_file = self._new_file(storage_path)
+        self._pending[storage_path] = disk_file
+        spills.append((storage_path, data, stored_at, disk_file))
+
+    def _write_spill(self, storage_path: str, data: bytes, stored_at: float, disk_file: str):
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(disk_file, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning("Blob cache spill failed for %s: %s", storage_path, e)
+            with self._lock:
+                if self._pending.get(storage_path) == disk_file:
+                    del self._pending[storage_path]
+                self.stats["evictions"] += 1
+            self._remove_files([disk_file])
+            return
+
+        removals = []
+        with self._lock:
+            if self._pending.get(storage_path) != disk_file:
+                # Re-put or invalidated while we were writing: the file is stale
+                removals.append(disk_file)
+            else:
+                del self._pending[storage_path]
+                self._disk[storage_path] = (len(data), stored_at, disk_file)
+                self._disk_bytes += len(data)
+                self.stats["spills"] += 1
+                while self._disk_bytes > self.max_disk_bytes and self._disk:
+                    self._drop_disk(next(iter(self._disk)), removals)
+                    self.stats["evictions"] += 1
+        self._remove_files(removals)
+
+    @staticmethod
+    def _remove_files(paths: list):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+_blob_cache = None
+
+def get_blob_cache():
+    """Returns the process-wide blob cache, or None if disabled."""
+    global _blob_cache
+    if not settings.BLOB_CACHE_ENABLED:
+        return None
+    if _blob_cache is None:
+        _blob_cache = BlobCache(
+            max_memory_bytes=settings.BLOB_CACHE_MAX_MEMORY_MB * 1024 * 1024,
+            max_disk_bytes=settings.BLOB_CACHE_MAX_DISK_MB * 1024 * 1024,
+            disk_dir=settings.BLOB_CACHE_DIR,
+            ttl_seconds=settings.BLOB_CACHE_TTL_SECONDS,
+        )
+    return _blob_cache
+
+def get_blob_cache_stats() -> dict:
+    cache = get_blob_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
+
+def _blob_cache_gauges() -> dict:
+    stats = get_blob_cache_stats()
+    if not stats.get("enabled"):
+        return {}
+    return {
+        f"blob_cache_{key}": (f"Local blob cache {key.replace('_', ' ')}", value)
+        for key, value in stats.items() if key != "enabled"
+    }
+
+registry.register_gauge_collector(_blob_cache_gauges)
+
 def download_file_as_bytes(storage_path: str) -> bytes:
-    """Download a file from Firebase Storage as bytes."""
+    """Download a file from Firebase Storage as bytes, serving from the local blob cache when possible."""
+    cache = get_blob_cache()
+    if cache is not None:
+        cached = cache.get(storage_path)
+        if cached is not None:
+            return cached
+
+    bucket = get_bucket()
+    if not bucket:
+        raise Exception("Storage bucket not initialized")
+    blob = bucket.blob(storage_path)
+    with STORAGE_OP_SECONDS.time(op="download"):
+        data = blob.download_as_bytes()
+
+    if cache is not None:
+        cache.put(storage_path, data)
+    return data
+
+def upload_bytes(storage_path: str, data: bytes, content_type: str = "image/jpeg", make_public: bool = False):
+    """Upload bytes to Firebase Storage and keep a local copy in the blob cache. Returns the blob."""
+    bucket = get_bucket()
+    if not bucket:
+        raise Exception("Storage bucket not initialized")
+    blob = bucket.blob(storage_path)
+    with STORAGE_OP_SECONDS.time(op="upload"):
+        blob.upload_from_string(data, content_type=content_type)
+    if make_public:
+        with STORAGE_OP_SECONDS.time(op="make_public"):
+            blob.make_public()
+
+    cache = get_blob_cache()
+    if cache is not None:
+        cache.put(storage_path, data)
+    return blob
+
+def generate_upload_url(storage_path: str, content_type: str, public_read: bool = None) -> dict:
+    """
+    Issue a V4 signed URL that lets a client PUT an object directly to Storage.
+    The returned headers must be sent as-is with the PUT, since they are part of the signature.
+    """
     bucket = get_bucket()
     if not bucket:
         raise Exception("Storage bucket not initialized")
+    if public_read is None:
+        public_read = settings.SIGNED_UPLOAD_PUBLIC_READ
+
+    headers = {
+        "Content-Type": content_type,
+        "x-goog-content-length-range": f"0,{settings.SIGNED_UPLOAD_MAX_BYTES}",
+    }
+    if public_read:
+        # Lets the object be public on upload, instead of a make_public() round trip afterwards
+        headers["x-goog-acl"] = "public-read"
+
+    expiration = datetime.timedelta(minutes=settings.SIGNED_UPLOAD_EXPIRY_MINUTES)
     blob = bucket.blob(storage_path)
-    return blob.download_as_bytes()
+    url = blob.generate_signed_url(
+        version="v4",
+        expiration=expiration,
+        method="PUT",
+        content_type=content_type,
+        headers={k: v for k, v in headers.items() if k != "Content-Type"},
+    )
+    return {
+        "upload_url": url,
+        "method": "PUT",
+        "headers": headers,
+        "storage_path": storage_path,
+        "public_url": blob.public_url,
+        "expires_at": (datetime.datetime.utcnow() + expiration).isoformat(),
+    }
+
+def copy_blob(source_path: str, dest_path: str) -> str:
+    """Server-side copy of a Storage object (no download/upload through this process). Returns the new public URL."""
+    bucket = get_bucket()
+    if not bucket:
+        raise Exception("Storage bucket not initialized")
+    with STORAGE_OP_SECONDS.time(op="copy"):
+        new_blob = bucket.copy_blob(bucket.blob(source_path), bucket, dest_path)
+    cache = get_blob_cache()
+    if cache is not None:
+        cached = cache.get(source_path)
+        if cached is not None:
+            cache.put(dest_path, cached)
+    return new_blob.public_url
+
+def delete_blobs(storage_paths: list):
+    """Delete Storage objects, ignoring ones that are already gone."""
+    bucket = get_bucket()
+    if not bucket:
+        raise Exception("Storage bucket not initialized")
+    with STORAGE_OP_SECONDS.time(op="delete"):
+        bucket.delete_blobs([bucket.blob(path) for path in storage_paths], on_error=lambda blob: None)
+    cache = get_blob_cache()
+    if cache is not None:
+        for path in storage_paths:
+            cache.invalidate(path)
+
+def get_uploaded_blob(storage_path: str):
+    """
+    Fetch the metadata of an object a client uploaded directly to Storage. Returns None if
+    it does not exist. Any cached copy of the path is dropped, since the upload bypassed the cache.
+    """
+    bucket = get_bucket()
+    if not bucket:
+        raise Exception("Storage bucket not initialized")
+    cache = get_blob_cache()
+    if cache is not None:
+        cache.invalidate(storage_path)
+    with STORAGE_OP_SECONDS.time(op="get_metadata"):
+        return bucket.get_blob(storage_path)
+
+def _deep_merge(target: dict, patch: dict) -> dict:
+    """Apply `patch` to `target` in place the way Firestore's set(merge=True) does: maps merge, everything else replaces."""
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+class AnonymousSessionCache:
+    """
+    Read-through, write-behind cache for `anonymous_sessions` documents.
+
+    Reads are served from memory after the first load (until the entry's TTL, which bounds
+    staleness across workers). Writes are applied to memory immediately and queued as merge
+    patches; a background thread coalesces the patches per session and commits them in one
+    WriteBatch every ANON_SESSION_FLUSH_INTERVAL_SECONDS. Read-modify-write updates bypass the
+    queue and run in a Firestore transaction, so concurrent requests on any worker cannot lose
+    each other's changes.
+    """
+
+    _LOCK_STRIPES = 64
+
+    def __init__(self, max_size: int, ttl_seconds: int, flush_interval_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self._sessions = OrderedDict()  # session_id -> (data, loaded_at)
+        self._pending = {}              # session_id -> coalesced merge patch
+        self._inflight = {}             # patches taken by the flush that is committing now
+        self._lock = threading.Lock()
+        # Striped so the lock table stays bounded however many sessions we see
+        self._session_locks = [threading.RLock() for _ in range(self._LOCK_STRIPES)]
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        self._flusher = None
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "flushes": 0, "flushed_docs": 0, "flush_errors": 0}
+
+    def session_lock(self, session_id: str) -> threading.RLock:
+        return self._session_locks[hash(session_id) % self._LOCK_STRIPES]
+
+    def _collection(self):
+        db = get_db()
+        if not db:
+            raise Exception("Firestore not initialized")
+        return db.collection('anonymous_sessions')
+
+    def _unflushed(self, session_id: str) -> list:
+        # Assumes the lock is held. Patches being committed right now, then ones still queued
+        return [p for p in (self._inflight.get(session_id), self._pending.get(session_id)) if p is not None]
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and (self.ttl_seconds <= 0 or time.time() - entry[1] < self.ttl_seconds):
+                self._sessions.move_to_end(session_id)
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[0])
+            self.stats["misses"] += 1
+            before = self._unflushed(session_id)
+
+        doc_ref = self._collection().document(session_id)
+        with FIRESTORE_OP_SECONDS.time(op="anonymous_sessions.get"):
+            doc = doc_ref.get()
+        data = doc.to_dict() if doc.exists else None
+
+        with self._lock:
+            # Writes that have not reached Firestore yet win over what it returned. A flush may have
+            # finished while we were reading, so re-apply what was unflushed before the read too
+            # (merges are idempotent).
+            for patch in before + self._unflushed(session_id):
+                data = _deep_merge(data or {}, patch)
+            if data is None:
+                return None
+            self._store(session_id, data)
+            return copy.deepcopy(data)
+
+    def save(self, session_id: str, patch: dict):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                _deep_merge(entry[0], patch)
+            _deep_merge(self._pending.setdefault(session_id, {}), patch)
+            self.stats["writes"] += 1
+        self._ensure_flusher()
+
+    def update(self, session_id: str, updater):
+        """
+        Read-modify-write in a Firestore transaction. `updater(session)` sees the stored session
+        plus this worker's unflushed changes, and returns a merge patch (or None to skip the write);
+        it may run more than once if the transaction is retried. Returns the patch, or None if the
+        session does not exist. Blocks on Firestore, so call it from a worker thread.
+        """
+        doc_ref = self._collection().document(session_id)
+
+        @firestore.transactional
+        def read_modify_write(transaction):
+            with FIRESTORE_OP_SECONDS.time(op="anonymous_sessions.get"):
+                snapshot = doc_ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else None
+            with self._lock:
+                unflushed = copy.deepcopy(self._unflushed(session_id))
+            for patch in unflushed:
+                data = _deep_merge(data or {}, patch)
+            if data is None:
+                return None, None
+            patch = updater(data)
+            if patch:
+                transaction.set(doc_ref, patch, merge=True)
+            return data, patch
+
+        # The lock only saves this worker's own concurrent updates from transaction retries
+        with self.session_lock(session_id):
+            with FIRESTORE_OP_SECONDS.time(op="anonymous_sessions.update"):
+                data, patch = read_modify_write(get_db().transaction())
+            if patch:
+                with self._lock:
+                    entry = self._sessions.get(session_id)
+                    if entry is not None:
+                        _deep_merge(entry[0], copy.deepcopy(patch))
+                    else:
+                        self._store(session_id, data)
+                    self.stats["writes"] += 1
+            return patch
+
+    def delete(self, session_id: str):
+        # Holding the flush lock keeps an in-flight flush from re-creating the document after the delete
+        with self._flush_lock:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+                self._pending.pop(session_id, None)
+            with FIRESTORE_OP_SECONDS.time(op="anonymous_sessions.delete"):
+                self._collection().document(session_id).delete()
+
+    def consume(self, session_id: str, add_writes):
+        """
+        Atomically replace the session with other documents: `add_writes(batch, session)` adds writes
+        to a WriteBatch that also deletes the session, committed in one round trip. Unflushed changes
+        are part of `session`, and the flush lock keeps the flusher from re-creating the document.
+        Returns the session, or None if it does not exist.
+        """
+        with self.session_lock(session_id), self._flush_lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            db = get_db()
+            batch = db.batch()
+            add_writes(batch, session)
+            batch.delete(self._collection().document(session_id))
+            with FIRESTORE_OP_SECONDS.time(op="anonymous_sessions.consume"):
+                batch.commit()
+            with self._lock:
+                self._sessions.pop(session_id, None)
+                self._pending.pop(session_id, None)
+            return session
+
+    def discard(self, session_id: str):
+        """Forget a session whose document was deleted elsewhere (e.g. by the TTL sweeper)."""
+        with self._flush_lock:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+                self._pending.pop(session_id, None)
+
+    def flush(self) -> int:
+        """Commit all pending patches now. Returns the number of documents written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+            if not pending:
+                return 0
+
+            db = get_db()
+            items = list(pending.items())
+            written = 0
+            try:
+                collection = db.collection('anonymous_sessions')
+                for i in range(0, len(items), 500):
+                    batch = db.batch()
+                    for session_id, patch in items[i:i + 500]:
+                        batch.set(collection.document(session_id), patch, merge=True)
+                    with FIRESTORE_OP_SECONDS.time(op="anonymous_sessions.flush"):
+                        batch.commit()
+                    written += len(items[i:i + 500])
+            except Exception as e:
+                logger.warning("Anonymous session flush failed, will retry: %s", e)
+                with self._lock:
+                    self.stats["flush_errors"] += 1
+                    # Re-queue what was not committed underneath anything written since
+                    for session_id, patch in items[written:]:
+                        self._pending[session_id] = _deep_merge(patch, self._pending.get(session_id, {}))
+            with self._lock:
+                self._inflight = {}
+                self.stats["flushes"] += 1
+                self.stats["flushed_docs"] += written
+            return written
+
+    def _ensure_flusher(self):
+        if self.flush_interval_seconds <= 0:
+            # Write-through
+            self.flush()
+            return
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._flusher_lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._flush_loop, name="anonymous-session-flusher", daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval_seconds)
+            if self._pending:
+                self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._sessions), "pending": len(self._pending)}
+
+    # Assumes the lock is held
+    def _store(self, session_id: str, data: dict):
+        self._sessions[session_id] = (data, time.time())
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+
+_session_cache = None
+
+def get_session_cache() -> AnonymousSessionCache:
+    global _session_cache
+    if _session_cache is None:
+        enabled = settings.ANON_SESSION_CACHE_ENABLED
+        _session_cache = AnonymousSessionCache(
+            max_size=settings.ANON_SESSION_CACHE_MAX_SIZE if enabled else 0,
+            ttl_seconds=settings.ANON_SESSION_CACHE_TTL_SECONDS,
+            flush_interval_seconds=settings.ANON_SESSION_FLUSH_INTERVAL_SECONDS if enabled else 0,
+        )
+    return _session_cache
+
+def _session_cache_gauges() -> dict:
+    if _session_cache is None:
+        return {}
+    return {
+        f"anonymous_session_cache_{key}": (f"Anonymous session cache {key.replace('_', ' ')}", value)
+        for key, value in _session_cache.snapshot().items()
+    }
+
+registry.register_gauge_collector(_session_cache_gauges)
 
 def save_anonymous_session(session_id: str, data: dict):
-    """Save anonymous session data to Firestore."""
-    db = get_db()
-    if not db:
-        raise Exception("Firestore not initialized")
-    
-    # Merge with existing data if any
-    doc_ref = db.collection('anonymous_sessions').document(session_id)
-    doc_ref.set(data, merge=True)
+    """Merge data into the anonymous session (cached; written to Firestore by the write-behind flusher)."""
+    get_session_cache().save(session_id, data)
 
 def get_anonymous_session(session_id: str) -> dict:
-    """Get anonymous session data from Firestore."""
-    db = get_db()
-    if not db:
-        raise Exception("Firestore not initialized")
-    
-    doc_ref = db.collection('anonymous_sessions').document(session_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        return doc.to_dict()
-    return None
+    """Get anonymous session data, from the local cache when possible."""
+    return get_session_cache().get(session_id)
+
+def update_anonymous_session(session_id: str, updater) -> dict:
+    """Read-modify-write an anonymous session in a transaction (blocking). Returns the patch written, or None if missing."""
+    return get_session_cache().update(session_id, updater)
+
+def consume_anonymous_session(session_id: str, add_writes) -> dict:
+    """Write the session elsewhere and delete it in one atomic batch (see AnonymousSessionCache.consume)."""
+    return get_session_cache().consume(session_id, add_writes)
 
 def delete_anonymous_session(session_id: str):
-    """Delete anonymous session data from Firestore."""
-    db = get_db()
-    if not db:
-        raise Exception("Firestore not initialized")
-    
-    db.collection('anonymous_sessions').document(session_id).delete()
+    """Delete anonymous session data from Firestore (and the local cache)."""
+    get_session_cache().delete(session_id)
+
+def flush_anonymous_sessions() -> int:
+    """Write any pending anonymous session changes to Firestore now (e.g. on shutdown)."""
+    if _session_cache is None:
+        return 0
+    return _session_cache.flush()
 
 def check_firebase_connection():
     status = {
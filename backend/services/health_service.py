@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from backend.core.config import settings
+from backend.core.metrics import registry
+from backend.services.firebase_service import check_firebase_connection
+from backend.services.ai_service import check_ai_connection_light
+
+logger = logging.getLogger(__name__)
+
+
+async def _probe_firebase() -> dict:
+    # The Firebase check makes blocking RPCs; keep it off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, check_firebase_connection)
+
+
+async def _probe_ai() -> dict:
+    return await check_ai_connection_light(settings.HEALTH_CHECK_AI_MODEL)
+
+
+def _firebase_up(result: dict) -> bool:
+    return bool(result.get("initialized")) and result.get("firestore") == "connected" \
+        and str(result.get("storage", "")).startswith("connected")
+
+
+def _ai_up(result: dict) -> bool:
+    return result.get("connectivity") == "connected"
+
+
+class HealthMonitor:
+    """
+    Runs dependency probes on an interval and keeps the latest result of each.
+    Readers get the cached result immediately; a probe only runs inline when
+    nothing is cached yet or a caller explicitly asks for a refresh.
+    """
+
+    def __init__(self, probes: Dict[str, Callable[[], Awaitable[dict]]], is_up: Dict[str, Callable[[dict], bool]]):
+        self._probes = probes
+        self._is_up = is_up
+        self._results: Dict[str, dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        lock = self._locks.get(name)
+        if lock is None:
+            lock = self._locks[name] = asyncio.Lock()
+        return lock
+
+    async def _run_probe(self, name: str) -> dict:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._probes[name](), timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            result = {"error": f"probe timed out after {settings.HEALTH_CHECK_TIMEOUT_SECONDS}s"}
+        except Exception as e:
+            result = {"error": str(e)}
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        previous = self._results.get(name)
+        entry = {
+            "result": result,
+            "up": self._is_up[name](result),
+            "checked_at": time.time(),
+            "duration_ms": duration_ms,
+        }
+        if previous and previous["up"] != entry["up"]:
+            logger.warning("Dependency %s is now %s", name, "up" if entry["up"] else "down", extra={"dependency": name, "probe": result})
+        self._results[name] = entry
+        return entry
+
+    async def refresh(self, name: str, min_age: float = 0.0) -> dict:
+        # Single-flight per dependency: callers that queued behind a running probe reuse its result
+        requested_at = time.time()
+        async with self._lock(name):
+            cached = self._results.get(name)
+            if cached and (cached["checked_at"] >= requested_at or requested_at - cached["checked_at"] < min_age):
+                return cached
+            return await self._run_probe(name)
+
+    async def get(self, name: str, refresh: bool = False) -> dict:
+        cached = self._results.get(name)
+        if cached is None and self._task is not None and not refresh:
+            # The background loop's first probe is still running; don't make the caller wait for it
+            return {"up": False, "status": "pending", "checked_at": None, "age_seconds": None}
+        if cached is None:
+            cached = await self.refresh(name)
+        elif refresh:
+            cached = await self.refresh(name, min_age=settings.HEALTH_CHECK_MIN_REFRESH_SECONDS)
+        return self._render(cached)
+
+    def _render(self, entry: dict) -> dict:
+        response = dict(entry["result"])
+        response["up"] = entry["up"]
+        response["checked_at"] = datetime.datetime.fromtimestamp(entry["checked_at"], datetime.timezone.utc).isoformat()
+        response["age_seconds"] = round(time.time() - entry["checked_at"], 1)
+        response["probe_ms"] = entry["duration_ms"]
+        return response
+
+    def gauges(self) -> dict:
+        return {
+            f"dependency_up_{name}": (f"Last background health probe of {name} succeeded", 1.0 if entry["up"] else 0.0)
+            for name, entry in self._results.items()
+        }
+
+    async def _loop(self):
+        while True:
+            await asyncio.gather(*[self.refresh(name) for name in self._probes], return_exceptions=True)
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL_SECONDS)
+
+    def start(self):
+        if self._task is None and settings.HEALTH_CHECK_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+health_monitor = HealthMonitor(
+    probes={"firebase": _probe_firebase, "ai": _probe_ai},
+    is_up={"firebase": _firebase_up, "ai": _ai_up},
+)
+
+registry.register_gauge_collector(health_monitor.gauges)
@@ -0,0 +1,89 @@
+import io
+import asyncio
+import hashlib
+import logging
+from typing import List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.services.firebase_service import get_bucket, download_file_as_bytes, upload_bytes
+
+logger = logging.getLogger(__name__)
+
+# Tile order matters: the suggest prompt describes the grid in this order
+COMPOSITE_LABELS = ["Original", "Lean", "Athletic", "Muscle"]
+COMPOSITE_FILENAME = "suggest_composite.jpg"
+
+def build_composite_image(images: List[bytes], tile_size: int = None, labels: List[str] = None) -> bytes:
+    """
+    Builds a 2x2 JPEG grid from four images, each downscaled to fit a square tile.
+    Order is top-left, top-right, bottom-left, bottom-right.
+    """
+    from PIL import Image, ImageDraw
+
+    if len(images) != 4:
+        raise ValueError("Composite requires exactly 4 images")
+
+    tile_size = tile_size or settings.COMPOSITE_TILE_SIZE
+    labels = labels if labels is not None else COMPOSITE_LABELS
+
+    canvas = Image.new("RGB", (tile_size * 2, tile_size * 2), color=(0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+
+    for idx, image_bytes in enumerate(images):
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            tile = img.convert("RGB")
+            # Preserve aspect ratio and center inside the tile
+            tile.thumbnail((tile_size, tile_size))
+            x = (idx % 2) * tile_size + (tile_size - tile.width) // 2
+            y = (idx // 2) * tile_size + (tile_size - tile.height) // 2
+            canvas.paste(tile, (x, y))
+
+        if idx < len(labels) and labels[idx]:
+            label_x = (idx % 2) * tile_size + 8
+            label_y = (idx // 2) * tile_size + 8
+            draw.rectangle([label_x - 4, label_y - 2, label_x + 8 * len(labels[idx]), label_y + 14], fill=(0, 0, 0))
+            draw.text((label_x, label_y), labels[idx], fill=(255, 255, 255))
+
+    out = io.BytesIO()
+    canvas.save(out, format="JPEG", quality=settings.COMPOSITE_JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+def composite_source_key(source_paths: List[str]) -> str:
+    """Stable key for the set of images a composite was built from, and the settings it was encoded with."""
+    joined = "|".join(source_paths) + f"|{settings.COMPOSITE_TILE_SIZE}|q{settings.COMPOSITE_JPEG_QUALITY}"
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+async def get_or_build_suggest_composite(
+    storage_prefix: str,
+    source_paths: List[str],
+    cached_entry: Optional[dict] = None
+) -> Tuple[bytes, Optional[dict]]:
+    """
+    Returns the composite bytes for the suggest call.
+    Reuses the composite stored under `storage_prefix` if it was built from the same source images,
+    otherwise downloads the four sources, builds a new composite and uploads it.
+
+    Returns (composite_bytes, new_entry). new_entry is None on a cache hit, otherwise it is the
+    dict the caller should persist on the session ({"path", "source_key"}).
+    """
+    loop = asyncio.get_event_loop()
+    source_key = composite_source_key(source_paths)
+
+    if cached_entry and cached_entry.get("source_key") == source_key and cached_entry.get("path"):
+        try:
+            cached_bytes = await loop.run_in_executor(None, download_file_as_bytes, cached_entry["path"])
+            return cached_bytes, None
+        except Exception as e:
+            logger.info("Composite cache miss for %s: %s", cached_entry["path"], e)
+
+    # Download images (Parallel)
+    tasks = [loop.run_in_executor(None, download_file_as_bytes, path) for path in source_paths]
+    images = await asyncio.gather(*tasks)
+    composite_bytes = await loop.run_in_executor(None, build_composite_image, list(images))
+
+    save_path = f"{storage_prefix}/{COMPOSITE_FILENAME}"
+    if not get_bucket():
+        return composite_bytes, None
+
+    await loop.run_in_executor(None, upload_bytes, save_path, composite_bytes, "image/jpeg")
+    return composite_bytes, {"path": save_path, "source_key": source_key}
@@ -1,17 +1,19 @@
 import os
 import json
-import datetime
+import logging
 from typing import Optional
 from backend.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 def _load_mock_json(filename: str, log_tag: str, endpoint_type: str) -> Optional[dict]:
     try:
-        print(f"[{datetime.datetime.utcnow().isoformat()}] MODE: MOCK - {endpoint_type} ({log_tag})")
+        logger.info("MODE: MOCK - %s (%s)", endpoint_type, log_tag)
         mock_path = os.path.join(settings.BASE_DIR, f"mock_responses/{filename}")
         with open(mock_path, "r") as f:
             return json.load(f)
     except Exception as e:
-        print(f"Error loading mock {filename}: {e}")
+        logger.error("Error loading mock %s: %s", filename, e)
         return None
 
 def try_get_mock_plan(log_tag: str) -> Optional[dict]:
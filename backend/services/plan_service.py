@@ -0,0 +1,408 @@
+import copy
+import datetime
+import hashlib
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.lazy import lazy_import
+from backend.core.metrics import FIRESTORE_OP_SECONDS
+from backend.services.catalog_service import get_workout_catalog, get_workout_map
+from backend.services.firebase_service import get_db
+
+firestore = lazy_import("firebase_admin.firestore")
+
+# Anonymous plans live as long as anonymous sessions
+ANONYMOUS_PLAN_TTL = datetime.timedelta(days=7)
+
+
+class PatchError(ValueError):
+    """An RFC 6902 patch could not be applied."""
+
+
+class PlanConflict(Exception):
+    """The client's plan_id/plan_version does not match the stored plan."""
+
+    def __init__(self, plan_id: Optional[str], version: int):
+        super().__init__(f"Plan changed: current plan {plan_id} is at version {version}")
+        self.plan_id = plan_id
+        self.version = version
+
+
+# --- RFC 6902 (JSON Patch) ---
+
+def _escape_token(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _parse_pointer(path: str) -> List[str]:
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def json_pointer(*tokens) -> str:
+    return "".join("/" + _escape_token(token) for token in tokens)
+
+
+def _resolve_parent(doc, tokens: List[str]):
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            try:
+                target = target[int(token)]
+            except (ValueError, IndexError):
+                raise PatchError(f"Path segment {token!r} not found")
+        elif isinstance(target, dict) and token in target:
+            target = target[token]
+        else:
+            raise PatchError(f"Path segment {token!r} not found")
+    return target
+
+
+def apply_patch(doc: Any, ops: List[dict]) -> Any:
+    """
+    Apply a JSON Patch and return the patched copy; `doc` is left untouched.
+    Supports add, remove, replace and test, which is all the server emits.
+    """
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        kind = op.get("op")
+        tokens = _parse_pointer(op.get("path", ""))
+        if not tokens:
+            if kind in ("add", "replace"):
+                doc = copy.deepcopy(op.get("value"))
+                continue
+            if kind == "test":
+                if doc != op.get("value"):
+                    raise PatchError("Test failed at document root")
+                continue
+            raise PatchError(f"Unsupported op {kind!r} at document root")
+
+        parent = _resolve_parent(doc, tokens)
+        key = tokens[-1]
+        if isinstance(parent, list):
+            if key == "-" and kind == "add":
+                parent.append(copy.deepcopy(op.get("value")))
+                continue
+            try:
+                index = int(key)
+            except ValueError:
+                raise PatchError(f"Invalid array index {key!r}")
+            if not 0 <= index < len(parent) + (1 if kind == "add" else 0):
+                raise PatchError(f"Array index {index} out of range")
+            if kind == "add":
+                parent.insert(index, copy.deepcopy(op.get("value")))
+            elif kind == "replace":
+                parent[index] = copy.deepcopy(op.get("value"))
+            elif kind == "remove":
+                parent.pop(index)
+            elif kind == "test":
+                if parent[index] != op.get("value"):
+                    raise PatchError(f"Test failed at {op.get('path')}")
+            else:
+                raise PatchError(f"Unsupported op {kind!r}")
+        elif isinstance(parent, dict):
+            if kind == "add":
+                parent[key] = copy.deepcopy(op.get("value"))
+            elif kind == "replace":
+                if key not in parent:
+                    raise PatchError(f"Cannot replace missing member {op.get('path')}")
+                parent[key] = copy.deepcopy(op.get("value"))
+            elif kind == "remove":
+                if key not in parent:
+                    raise PatchError(f"Cannot remove missing member {op.get('path')}")
+                del parent[key]
+            elif kind == "test":
+                if parent.get(key) != op.get("value"):
+                    raise PatchError(f"Test failed at {op.get('path')}")
+            else:
+                raise PatchError(f"Unsupported op {kind!r}")
+        else:
+            raise PatchError(f"Cannot apply {kind!r} under a scalar at {op.get('path')}")
+    return doc
+
+
+def diff_members(old: dict, new: dict, prefix: Tuple = ()) -> List[dict]:
+    """
+    Member-level diff of two dicts. Nested values are replaced whole rather than
+    diffed recursively: a day's fields are small, and workout_details changes together.
+    """
+    ops = []
+    for key in old:
+        if key not in new:
+            ops.append({"op": "remove", "path": json_pointer(*prefix, key)})
+    for key, value in new.items():
+        if key not in old:
+            ops.append({"op": "add", "path": json_pointer(*prefix, key), "value": value})
+        elif old[key] != value:
+            ops.append({"op": "replace", "path": json_pointer(*prefix, key), "value": value})
+    return ops
+
+
+# --- Plan days ---
+
+def find_day(plan: dict, day_index: int) -> Tuple[int, Optional[dict]]:
+    """(position in schedule, day) for the given day number, or (-1, None)."""
+    for position, day in enumerate(plan.get("schedule") or []):
+        if day.get("day") == day_index:
+            return position, day
+    return -1, None
+
+
+def apply_adjustment(day: dict, adjustment_result: dict) -> dict:
+    """The day as it looks after an adjust_workout_multi_agent result; `day` is not modified."""
+    day = dict(day)
+    day["is_rest"] = adjustment_result["is_rest"]
+    day["workout_id"] = adjustment_result["new_workout_id"]
+    selected_workout = adjustment_result.get("selected_workout") or {}
+    day["activity"] = (
+        adjustment_result.get("new_activity_title")
+        or selected_workout.get("display_title")
+        or selected_workout.get("title")
+        or day.get("activity")
+    )
+    day["notes"] = adjustment_result["summary"]
+
+    if not day["is_rest"] and day["workout_id"]:
+        day["workout_details"] = selected_workout
+    else:
+        # Same shape as a hydrated rest day: no workout_details key
+        day.pop("workout_details", None)
+        if not day.get("activity"):
+            day["activity"] = "Rest"
+    return day
+
+
+def day_patch(plan: dict, day_index: int, new_day: dict) -> List[dict]:
+    """RFC 6902 ops turning the plan's entry for `day_index` into `new_day`."""
+    position, old_day = find_day(plan, day_index)
+    if old_day is None:
+        raise PatchError(f"Day {day_index} not found in plan")
+    return diff_members(old_day, new_day, ("schedule", position))
+
+
+def patched_day(plan: dict, day_index: int, ops: List[dict]) -> dict:
+    """
+    Apply client-supplied ops that must only touch the given day, and return that day.
+    Anything outside /schedule/<position>/ is rejected.
+    """
+    position, old_day = find_day(plan, day_index)
+    if old_day is None:
+        raise PatchError(f"Day {day_index} not found in plan")
+    prefix = json_pointer("schedule", position)
+    for op in ops:
+        path = op.get("path", "")
+        if not path.startswith(prefix + "/") or op.get("op") not in ("add", "replace", "remove", "test"):
+            raise PatchError(f"Patch may only change day {day_index} ({prefix})")
+        if _parse_pointer(path)[2] == "day":
+            raise PatchError("Patch may not renumber the day")
+    return apply_patch(plan, ops)["schedule"][position]
+
+
+# --- Compact plans ---
+# Stored plans keep each day's workout_id plus per-day overrides. workout_details is only
+# stored for workouts missing from the catalog; otherwise it is filled in from the cached
+# catalog when a plan is read.
+
+def compact_day(day: dict, workout_map: Optional[Dict[str, dict]] = None) -> dict:
+    """The day without workout_details, unless its workout is not in the catalog to restore them from."""
+    if not day.get("workout_details"):
+        return {k: v for k, v in day.items() if k != "workout_details"}
+    if workout_map is None:
+        workout_map = get_workout_map(get_workout_catalog())
+    if day.get("workout_id") not in workout_map:
+        return dict(day)
+    return {k: v for k, v in day.items() if k != "workout_details"}
+
+
+def hydrate_day(day: dict, workout_map: Dict[str, dict]) -> dict:
+    """
+    The day with workout_details filled in from the catalog; `day` is not modified.
+    Days stored before plans were compacted keep their embedded copy if the workout
+    has since left the catalog. Rest days, and workouts with no details anywhere, have
+    no workout_details key.
+    """
+    day = {k: v for k, v in day.items() if k != "workout_details"}
+    details = None
+    if not day.get("is_rest"):
+        details = workout_map.get(day.get("workout_id")) or day.get("workout_details")
+    if details:
+        day["workout_details"] = details
+    if not day.get("activity"):
+        if details:
+            day["activity"] = details.get("display_title")
+        else:
+            day["activity"] = "Workout" if day.get("workout_id") and not day.get("is_rest") else "Rest"
+    return day
+
+
+def catalog_day(day: dict) -> dict:
+    """A client-sent day hydrated from the catalog; only its ids are trusted, never its workout_details."""
+    day = {k: v for k, v in day.items() if k != "workout_details"}
+    day = hydrate_day(day, get_workout_map(get_workout_catalog()))
+    if not day.get("is_rest") and day.get("workout_id") and not day.get("workout_details"):
+        raise PatchError(f"Unknown workout_id {day['workout_id']!r}")
+    return day
+
+
+def compact_plan(plan: dict, workout_map: Optional[Dict[str, dict]] = None) -> dict:
+    """The plan as stored: compacted days, and no transient version field."""
+    if workout_map is None:
+        workout_map = get_workout_map(get_workout_catalog())
+    plan = {k: v for k, v in plan.items() if k != "version"}
+    plan["schedule"] = [compact_day(day, workout_map) for day in plan.get("schedule") or []]
+    return plan
+
+
+def hydrate_plan(plan: dict, workout_map: Optional[Dict[str, dict]] = None) -> dict:
+    if workout_map is None:
+        workout_map = get_workout_map(get_workout_catalog())
+    plan = dict(plan)
+    plan["schedule"] = [hydrate_day(day, workout_map) for day in plan.get("schedule") or []]
+    return plan
+
+
+# --- Versioned plans ---
+
+def new_plan_id() -> str:
+    return uuid.uuid4().hex
+
+
+def plan_id_for(plan: dict, owner_id: str) -> str:
+    """Stored plans predating plan ids get a stable one derived from their owner and generation time."""
+    if plan.get("plan_id"):
+        return plan["plan_id"]
+    seed = f"{owner_id}:{plan.get('generated_at', '')}"
+    return hashlib.sha1(seed.encode("utf-8")).hexdigest()[:32]
+
+
+def materialize_plan(progress: dict, owner_id: str, workout_map: Optional[Dict[str, dict]] = None) -> Optional[dict]:
+    """
+    The active plan from a user_progress document: `weeklyPlan` with the per-day edits in
+    `weeklyPlanEdits` applied, hydrated from the catalog, and stamped with its plan_id
+    and `weeklyPlanVersion`.
+    """
+    plan = progress.get("weeklyPlan")
+    if not plan:
+        return None
+    plan = copy.deepcopy(plan)
+    edits = progress.get("weeklyPlanEdits") or {}
+    if edits:
+        plan["schedule"] = [edits.get(str(day.get("day")), day) for day in plan.get("schedule") or []]
+    plan = hydrate_plan(plan, workout_map)
+    plan["plan_id"] = plan_id_for(plan, owner_id)
+    plan["version"] = progress.get("weeklyPlanVersion", 1)
+    return plan
+
+
+def compact_progress_plans(progress: dict, workout_map: Optional[Dict[str, dict]] = None) -> dict:
+    """
+    Field updates that rewrite a user_progress document's weeklyPlan, weeklyPlans and
+    weeklyPlanEdits in compact form. Empty if there is nothing to compact.
+    """
+    if workout_map is None:
+        workout_map = get_workout_map(get_workout_catalog())
+    updates = {}
+    if progress.get("weeklyPlan"):
+        compact = compact_plan(progress["weeklyPlan"], workout_map)
+        if compact != progress["weeklyPlan"]:
+            updates["weeklyPlan"] = compact
+    plans = progress.get("weeklyPlans") or {}
+    compact_plans = {goal: compact_plan(plan, workout_map) for goal, plan in plans.items() if plan}
+    if compact_plans != plans:
+        updates["weeklyPlans"] = compact_plans
+    edits = progress.get("weeklyPlanEdits") or {}
+    compact_edits = {day: compact_day(edit, workout_map) for day, edit in edits.items()}
+    if compact_edits != edits:
+        updates["weeklyPlanEdits"] = compact_edits
+    return updates
+
+
+def check_version(plan: dict, plan_id: Optional[str], plan_version: Optional[int]):
+    if (plan_id and plan_id != plan["plan_id"]) or (plan_version is not None and plan_version != plan["version"]):
+        raise PlanConflict(plan["plan_id"], plan["version"])
+
+
+def patch_response(plan: dict, ops: List[dict], version: Optional[int] = None) -> Dict[str, Any]:
+    """Wire format for a plan change: the ops plus the versions they apply between."""
+    return {
+        "plan_id": plan.get("plan_id"),
+        "base_version": plan.get("version"),
+        "version": plan.get("version") if version is None else version,
+        "patch": ops,
+    }
+
+
+# --- Anonymous plan store ---
+# Plans generated before sign-in are kept in `anonymous_plans/{plan_id}` in compact form,
+# so chat turns only need to send the plan id and version.
+
+def _anonymous_plan_ref(db, plan_id: str):
+    return db.collection('anonymous_plans').document(plan_id)
+
+
+def _load_anonymous_plan(snapshot) -> Optional[dict]:
+    if not snapshot.exists:
+        return None
+    data = snapshot.to_dict()
+    expires_at = data.get("expires_at")
+    if expires_at and datetime.datetime.utcnow() > datetime.datetime.fromisoformat(expires_at):
+        return None
+    return data
+
+
+def save_anonymous_plan(plan: dict, session_id: Optional[str] = None) -> dict:
+    """Store a freshly generated plan and return it stamped with its plan_id and version."""
+    db = get_db()
+    if db is None:
+        # Not stored, so the client has to keep sending it whole (no plan_id/version)
+        return plan
+    plan = dict(plan, plan_id=plan.get("plan_id") or new_plan_id())
+    record = compact_plan(plan)
+    record.update({
+        "version": 1,
+        "session_id": session_id,
+        "expires_at": (datetime.datetime.utcnow() + ANONYMOUS_PLAN_TTL).isoformat(),
+    })
+    with FIRESTORE_OP_SECONDS.time(op="anonymous_plans.set"):
+        _anonymous_plan_ref(db, plan["plan_id"]).set(record)
+    return dict(plan, version=1)
+
+
+def get_anonymous_plan(plan_id: str) -> Optional[dict]:
+    """The stored plan, hydrated from the workout catalog, or None if unknown or expired."""
+    db = get_db()
+    if db is None or not plan_id:
+        return None
+    with FIRESTORE_OP_SECONDS.time(op="anonymous_plans.get"):
+        data = _load_anonymous_plan(_anonymous_plan_ref(db, plan_id).get())
+    if data is None:
+        return None
+    plan = {k: v for k, v in data.items() if k not in ("session_id", "expires_at")}
+    return hydrate_plan(plan)
+
+
+def save_anonymous_plan_day(plan: dict, day_index: int, new_day: dict) -> int:
+    """Replace one day of a stored plan if it is still at plan['version']. Returns the new version."""
+    db = get_db()
+    ref = _anonymous_plan_ref(db, plan["plan_id"])
+
+    @firestore.transactional
+    def write(transaction):
+        data = _load_anonymous_plan(ref.get(transaction=transaction))
+        if data is None:
+            raise PlanConflict(None, 0)
+        check_version(data, plan["plan_id"], plan["version"])
+        position, _ = find_day(data, day_index)
+        if position < 0:
+            raise PatchError(f"Day {day_index} not found in plan")
+        schedule = list(data["schedule"])
+        schedule[position] = compact_day(new_day)
+        version = data["version"] + 1
+        transaction.update(ref, {"schedule": schedule, "version": version})
+        return version
+
+    with FIRESTORE_OP_SECONDS.time(op="anonymous_plans.day_edit"):
+        return write(db.transaction())
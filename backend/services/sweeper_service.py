@@ -0,0 +1,213 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import List, Optional
+
+from backend.core.config import settings
+from backend.core.metrics import registry
+from backend.services.firebase_service import get_db, get_bucket, get_blob_cache, get_session_cache
+
+logger = logging.getLogger(__name__)
+
+SWEEP_SESSIONS_DELETED = registry.counter(
+    "anonymous_sweeper_sessions_deleted_total", "Expired anonymous sessions deleted by the sweeper"
+)
+SWEEP_PLANS_DELETED = registry.counter(
+    "anonymous_sweeper_plans_deleted_total", "Expired anonymous_plans documents deleted by the sweeper"
+)
+SWEEP_BLOBS_DELETED = registry.counter(
+    "anonymous_sweeper_blobs_deleted_total", "Storage objects under anonymous/{session_id}/ deleted by the sweeper"
+)
+SWEEP_ERRORS = registry.counter(
+    "anonymous_sweeper_errors_total", "Sweeper failures", ("stage",)
+)
+SWEEP_RUN_SECONDS = registry.histogram(
+    "anonymous_sweeper_run_duration_seconds", "Duration of one sweep over expired anonymous sessions",
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+
+def _expired_page(db, now_iso: str, page_size: int, after=None, collection: str = 'anonymous_sessions') -> list:
+    # expires_at is an ISO-8601 string, so lexicographic order is chronological.
+    # A range filter plus order_by on one field is served by the automatic single-field index.
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    query = (
+        db.collection(collection)
+        .where(filter=FieldFilter('expires_at', '<', now_iso))
+        .order_by('expires_at')
+        .limit(page_size)
+    )
+    if after is not None:
+        query = query.start_after(after)
+    return list(query.stream())
+
+
+def _delete_session_blobs(session_id: str) -> int:
+    bucket = get_bucket()
+    if bucket is None:
+        return 0
+    blobs = list(bucket.list_blobs(prefix=f"anonymous/{session_id}/"))
+    if not blobs:
+        return 0
+    # Already-deleted objects are fine; another worker may be sweeping too
+    bucket.delete_blobs(blobs, on_error=lambda blob: None)
+    cache = get_blob_cache()
+    if cache is not None:
+        for blob in blobs:
+            cache.invalidate(blob.name)
+    return len(blobs)
+
+
+def _delete_docs(db, snapshots: list):
+    for i in range(0, len(snapshots), 500):
+        batch = db.batch()
+        for snap in snapshots[i:i + 500]:
+            batch.delete(snap.reference)
+        batch.commit()
+
+
+def _delete_session_docs(db, snapshots: list):
+    session_cache = get_session_cache()
+    _delete_docs(db, snapshots)
+    for snap in snapshots:
+        session_cache.discard(snap.id)
+
+
+class SessionSweeper:
+    """
+    Deletes expired anonymous sessions and their Storage objects on an interval.
+
+    Each run pages through `anonymous_sessions` ordered by expires_at. For every page it
+    deletes the sessions' `anonymous/{session_id}/` prefixes concurrently (bounded by
+    SESSION_SWEEP_CONCURRENCY), then the documents in one batch. Deletes are paced to
+    SESSION_SWEEP_MAX_DELETES_PER_SECOND so a backlog does not compete with live traffic.
+    Expired `anonymous_plans` documents are removed the same way, minus the Storage step.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    async def sweep_once(self, max_sessions: Optional[int] = None) -> dict:
+        db = get_db()
+        if db is None:
+            return {"sessions": 0, "plans": 0, "blobs": 0, "errors": 0, "skipped": "firestore not initialized"}
+
+        loop = asyncio.get_running_loop()
+        max_sessions = settings.SESSION_SWEEP_MAX_PER_RUN if max_sessions is None else max_sessions
+        page_size = max(1, min(settings.SESSION_SWEEP_PAGE_SIZE, 500))
+        rate = settings.SESSION_SWEEP_MAX_DELETES_PER_SECOND
+        semaphore = asyncio.Semaphore(max(1, settings.SESSION_SWEEP_CONCURRENCY))
+        now_iso = datetime.datetime.utcnow().isoformat()
+
+        async def delete_blobs(session_id: str) -> int:
+            async with semaphore:
+                return await loop.run_in_executor(None, _delete_session_blobs, session_id)
+
+        totals = {"sessions": 0, "plans": 0, "blobs": 0, "errors": 0}
+        start = time.perf_counter()
+        after = None
+        while totals["sessions"] < max_sessions:
+            limit = min(page_size, max_sessions - totals["sessions"])
+            try:
+                page = await loop.run_in_executor(None, _expired_page, db, now_iso, limit, after)
+            except Exception as e:
+                SWEEP_ERRORS.inc(stage="query")
+                totals["errors"] += 1
+                logger.warning("Session sweep query failed: %s", e)
+                break
+            if not page:
+                break
+            after = page[-1]
+            page_start = time.perf_counter()
+
+            # Blobs first: if a blob delete fails, keep the document so the next run retries
+            results = await asyncio.gather(*[delete_blobs(snap.id) for snap in page], return_exceptions=True)
+            removable = []
+            for snap, result in zip(page, results):
+                if isinstance(result, Exception):
+                    SWEEP_ERRORS.inc(stage="storage")
+                    totals["errors"] += 1
+                    logger.warning("Failed to delete Storage objects for session %s: %s", snap.id, result)
+                    continue
+                totals["blobs"] += result
+                removable.append(snap)
+
+            try:
+                await loop.run_in_executor(None, _delete_session_docs, db, removable)
+                totals["sessions"] += len(removable)
+            except Exception as e:
+                SWEEP_ERRORS.inc(stage="firestore")
+                totals["errors"] += 1
+                logger.warning("Failed to delete expired session documents: %s", e)
+                break
+
+            if len(page) < limit:
+                break
+            if rate > 0:
+                # Pace to the configured delete rate before the next page
+                min_duration = len(page) / rate
+                elapsed = time.perf_counter() - page_start
+                if elapsed < min_duration:
+                    await asyncio.sleep(min_duration - elapsed)
+
+        after = None
+        while totals["plans"] < max_sessions:
+            limit = min(page_size, max_sessions - totals["plans"])
+            page_start = time.perf_counter()
+            try:
+                page = await loop.run_in_executor(None, _expired_page, db, now_iso, limit, after, 'anonymous_plans')
+                if not page:
+                    break
+                after = page[-1]
+                await loop.run_in_executor(None, _delete_docs, db, page)
+                totals["plans"] += len(page)
+            except Exception as e:
+                SWEEP_ERRORS.inc(stage="plans")
+                totals["errors"] += 1
+                logger.warning("Failed to delete expired anonymous plans: %s", e)
+                break
+            if len(page) < limit:
+                break
+            if rate > 0:
+                min_duration = len(page) / rate
+                elapsed = time.perf_counter() - page_start
+                if elapsed < min_duration:
+                    await asyncio.sleep(min_duration - elapsed)
+
+        duration = time.perf_counter() - start
+        SWEEP_RUN_SECONDS.observe(duration)
+        SWEEP_SESSIONS_DELETED.inc(totals["sessions"])
+        SWEEP_PLANS_DELETED.inc(totals["plans"])
+        SWEEP_BLOBS_DELETED.inc(totals["blobs"])
+        self.last_run = {**totals, "finished_at": time.time(), "duration_ms": round(duration * 1000, 1)}
+        if totals["sessions"] or totals["plans"] or totals["errors"]:
+            logger.info("Session sweep finished", extra={"sweep": self.last_run})
+        return self.last_run
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                SWEEP_ERRORS.inc(stage="run")
+                logger.exception("Session sweep failed: %s", e)
+            await asyncio.sleep(settings.SESSION_SWEEP_INTERVAL_SECONDS)
+
+    def start(self):
+        if self._task is None and settings.SESSION_SWEEP_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+session_sweeper = SessionSweeper()
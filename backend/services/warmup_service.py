@@ -0,0 +1,157 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.core.config import settings
+from backend.core.deps import warm_token_verifier
+from backend.services.firebase_service import get_db, get_bucket
+
+logger = logging.getLogger(__name__)
+
+# Readiness is separate from liveness: the process is alive as soon as it serves
+# requests, but only ready once warmup has finished (successfully or not)
+_state = {
+    "status": "pending",  # pending | running | ready | degraded | disabled
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "duration_ms": None,
+    "steps": {},
+}
+
+_AI_SDK_MODULES = [
+    "google.genai.types",
+    "google.adk.agents.llm_agent",
+    "google.adk.models",
+    "google.adk.runners",
+    "google.adk.sessions",
+]
+
+
+def _warm_tracing() -> bool:
+    from backend.services.ai.core import configure_tracing
+    return configure_tracing()
+
+
+def _warm_firestore() -> bool:
+    # First RPC opens the gRPC channel (TLS + auth token)
+    db = get_db()
+    if db is None:
+        return False
+    list(db.collection("workout_library").limit(1).stream())
+    return True
+
+
+def _warm_storage() -> bool:
+    # A metadata lookup opens the pooled HTTP session; a missing object is fine
+    bucket = get_bucket()
+    if bucket is None:
+        return False
+    bucket.get_blob("warmup/.probe")
+    return True
+
+
+def _warm_ai_sdk() -> bool:
+    for name in _AI_SDK_MODULES:
+        importlib.import_module(name)
+    return True
+
+
+def _warm_runners() -> bool:
+    if not settings.GOOGLE_API_KEY:
+        return False
+    from backend.services.ai.planning import get_skeleton_runner, get_assembler_runner
+    from backend.services.ai.agent import get_intent_runner, get_semantic_query_runner, get_adjust_message_runner
+    from backend.services.ai.vision import get_vision_runner
+    from backend.services.ai.recommendation import get_recommendation_runner
+    from backend.services.ai.image_gen import get_image_runner
+
+    for factory in (
+        get_skeleton_runner, get_assembler_runner,
+        get_intent_runner, get_semantic_query_runner, get_adjust_message_runner,
+        get_vision_runner, get_recommendation_runner, get_image_runner,
+    ):
+        factory()
+    return True
+
+
+def _warm_catalog() -> bool:
+    from backend.services.catalog_service import get_workout_catalog
+    return len(get_workout_catalog(force_refresh=True)) > 0
+
+
+# Step name -> blocking callable returning True when the step did useful work
+WARMUP_STEPS: Dict[str, Callable[[], bool]] = {
+    "tracing": _warm_tracing,
+    "firestore": _warm_firestore,
+    "storage": _warm_storage,
+    "auth_certs": warm_token_verifier,
+    "ai_sdk": _warm_ai_sdk,
+    "runners": _warm_runners,
+    "catalog": _warm_catalog,
+}
+
+
+def _configured_steps() -> List[str]:
+    names = [name.strip() for name in settings.WARMUP_STEPS.split(",") if name.strip()]
+    unknown = [name for name in names if name not in WARMUP_STEPS]
+    if unknown:
+        logger.warning("Ignoring unknown warmup steps: %s", ", ".join(unknown))
+    return [name for name in names if name in WARMUP_STEPS]
+
+
+async def _run_step(name: str, fn: Callable[[], bool]) -> dict:
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    result = {"ok": False, "skipped": False, "duration_ms": None, "error": None}
+    try:
+        did_work = await asyncio.wait_for(loop.run_in_executor(None, fn), timeout=settings.WARMUP_STEP_TIMEOUT_SECONDS)
+        result["ok"] = True
+        result["skipped"] = not did_work
+    except asyncio.TimeoutError:
+        result["error"] = f"timed out after {settings.WARMUP_STEP_TIMEOUT_SECONDS}s"
+    except Exception as e:
+        result["error"] = str(e)
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if result["error"]:
+        logger.warning("Warmup step %s failed: %s", name, result["error"])
+    return result
+
+
+async def run_warmup(steps: Optional[List[str]] = None) -> dict:
+    """
+    Run warmup steps concurrently, each in the default executor with a timeout.
+    Failures are recorded but never raised: a cold dependency should not stop the app from serving.
+    """
+    if not settings.WARMUP_ENABLED:
+        _state.update(status="disabled", ready=True)
+        return get_warmup_state()
+
+    names = steps if steps is not None else _configured_steps()
+    _state.update(status="running", ready=False, started_at=time.time(), finished_at=None, steps={})
+    start = time.perf_counter()
+
+    results = await asyncio.gather(*[_run_step(name, WARMUP_STEPS[name]) for name in names])
+    _state["steps"] = dict(zip(names, results))
+
+    failed = [name for name, result in _state["steps"].items() if not result["ok"]]
+    _state.update(
+        status="degraded" if failed else "ready",
+        ready=True,
+        finished_at=time.time(),
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    logger.info("Warmup finished", extra={"warmup_status": _state["status"], "duration_ms": _state["duration_ms"], "failed_steps": failed})
+    return get_warmup_state()
+
+
+def get_warmup_state() -> dict:
+    state = dict(_state)
+    state["steps"] = {name: dict(result) for name, result in _state["steps"].items()}
+    return state
+
+
+def is_ready() -> bool:
+    return _state["ready"]
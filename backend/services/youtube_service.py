@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Data API page size cap for search, playlistItems and videos (also the max ids per videos.list)
+PAGE_SIZE = 50
+
+CACHE_MODES = ("online", "refresh", "replay", "off")
+
+
+class YouTubeCacheMiss(Exception):
+    """Raised in replay mode when a request has no cached response."""
+
+
+class YouTubeClient:
+    """
+    YouTube Data API client with a persistent response cache for the seeding scripts.
+
+    Responses are stored as JSON under YOUTUBE_CACHE_DIR, keyed by resource, method
+    and request parameters. Modes:
+      - online:  serve cached responses younger than the TTL; revalidate older ones
+                 with If-None-Match so an unchanged resource comes back as a 304
+      - refresh: revalidate every cached response
+      - replay:  never touch the network; a missing entry raises YouTubeCacheMiss
+      - off:     no cache at all
+    """
+
+    def __init__(self, api_key: Optional[str] = None, cache_dir: Optional[str] = None,
+                 ttl_seconds: Optional[int] = None, mode: Optional[str] = None):
+        self.api_key = api_key or settings.GOOGLE_API_KEY
+        self.cache_dir = cache_dir or settings.YOUTUBE_CACHE_DIR
+        self.ttl_seconds = settings.YOUTUBE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.mode = mode or settings.YOUTUBE_CACHE_MODE
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown YouTube cache mode {self.mode!r}; expected one of {', '.join(CACHE_MODES)}")
+        # The discovery-built client is not thread-safe: one per thread
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "fetched": 0}
+
+    def _service(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            if not self.api_key:
+                raise RuntimeError("GOOGLE_API_KEY not found in environment.")
+            from googleapiclient.discovery import build
+            service = build('youtube', 'v3', developerKey=self.api_key, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    # --- Cache ---
+
+    def _cache_path(self, resource: str, method: str, params: Dict[str, Any]) -> str:
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{resource}.{method}", f"{key}.json")
+
+    def _read_cache(self, path: str) -> Optional[dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable YouTube cache entry %s: %s", path, e)
+            return None
+
+    def _write_cache(self, path: str, entry: dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _build_request(self, resource: str, method: str, params: Dict[str, Any]):
+        return getattr(getattr(self._service(), resource)(), method)(**params)
+
+    def execute(self, resource: str, method: str, **params) -> dict:
+        """Run `youtube.<resource>().<method>(**params)` through the cache."""
+        if self.mode == "off":
+            self._count("fetched")
+            return self._build_request(resource, method, params).execute()
+
+        path = self._cache_path(resource, method, params)
+        cached = self._read_cache(path)
+
+        if self.mode == "replay":
+            if cached is None:
+                raise YouTubeCacheMiss(f"No cached response for {resource}.{method} {params}")
+            self._count("hits")
+            return cached["response"]
+
+        if cached is not None and self.mode == "online" and time.time() - cached["fetched_at"] < self.ttl_seconds:
+            self._count("hits")
+            return cached["response"]
+
+        request = self._build_request(resource, method, params)
+        if cached is not None and cached.get("etag"):
+            request.headers["If-None-Match"] = cached["etag"]
+        try:
+            response = request.execute()
+        except Exception as e:
+            # googleapiclient surfaces 304 Not Modified as an HttpError
+            if cached is not None and getattr(getattr(e, "resp", None), "status", None) == 304:
+                cached["fetched_at"] = time.time()
+                self._write_cache(path, cached)
+                self._count("revalidated")
+                return cached["response"]
+            raise
+
+        self._write_cache(path, {"fetched_at": time.time(), "etag": response.get("etag"), "params": params, "response": response})
+        self._count("fetched")
+        return response
+
+    # --- Paginated helpers ---
+
+    def _paginate(self, resource: str, method: str, limit: int, **params) -> List[dict]:
+        # Always request full pages so cached pages are reusable whatever the limit
+        items: List[dict] = []
+        page_token = None
+        while len(items) < limit:
+            page_params = dict(params, maxResults=PAGE_SIZE)
+            if page_token:
+                page_params["pageToken"] = page_token
+            response = self.execute(resource, method, **page_params)
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return items[:limit]
+
+    def search_playlists(self, query: str, limit: int = 15) -> List[dict]:
+        return self._paginate("search", "list", limit, part="snippet", q=query, type="playlist")
+
+    def list_playlist_video_ids(self, playlist_id: str, limit: int) -> List[str]:
+        items = self._paginate("playlistItems", "list", limit, part="snippet,contentDetails", playlistId=playlist_id)
+        return [item["contentDetails"]["videoId"] for item in items if item.get("contentDetails", {}).get("videoId")]
+
+    def list_videos(self, video_ids: List[str]) -> List[dict]:
+        videos: List[dict] = []
+        for i in range(0, len(video_ids), PAGE_SIZE):
+            chunk = video_ids[i:i + PAGE_SIZE]
+            response = self.execute("videos", "list", part="snippet,contentDetails", id=",".join(chunk))
+            videos.extend(response.get("items", []))
+        return videos
+
+    # --- Non-API results (e.g. curation output) stored alongside API responses ---
+
+    def get_cached_value(self, namespace: str, **params) -> Optional[Any]:
+        if self.mode == "off":
+            return None
+        cached = self._read_cache(self._cache_path(namespace, "value", params))
+        if cached is None:
+            return None
+        if self.mode != "replay" and time.time() - cached["fetched_at"] >= self.ttl_seconds:
+            return None
+        return cached["response"]
+
+    def set_cached_value(self, namespace: str, value: Any, **params):
+        if self.mode in ("off", "replay"):
+            return
+        self._write_cache(self._cache_path(namespace, "value", params), {"fetched_at": time.time(), "params": params, "response": value})
@@ -4,6 +4,7 @@ import { DndProvider, useDrag, useDrop } from 'react-dnd';
 import { HTML5Backend } from 'react-dnd-html5-backend';
 import { getAuth } from 'firebase/auth';
 import { anonymousApi, actApi } from '../services/api';
+import { applyPlanPatch, PlanConflictError, type PlanPatch } from '../services/planPatch';
 import { Header } from './Header';
 
 interface WorkoutPlanProps {
@@ -72,8 +73,12 @@ interface ChatMessage {
 interface PendingProposal {
   originalText: string;
   plan: any;
+  // Versioned plans: the proposed change, confirmed by sending it back
+  change?: PlanPatch;
 }
 
+const CONFLICT_MESSAGE = 'Your plan was changed somewhere else. Please refresh to load the latest version, then try again.';
+
 interface ChatStickyProps {
   day: WorkoutDay;
   onClose: () => void;
@@ -392,7 +397,29 @@ function WorkoutCard({
     { id: '1', text: 'Need any adjustments? 💪', sender: 'ryan' }
   ]);
   const [pendingProposal, setPendingProposal] = useState<PendingProposal | null>(null);
-  
+
+  // Apply a confirmed change to the plan and this card; versioned responses carry a patch
+  const applyConfirmedChange = (result: any) => {
+    if (result.patch) {
+      const plan = applyPlanPatch(getCurrentPlan(), result);
+      setCurrentPlan(plan);
+      const updatedDay = (plan.schedule || []).find((d: any) => `day-${d.day}` === day.id);
+      if (result.action === 'ADJUST_WORKOUT' && updatedDay) {
+        onUpdateDay(day.id, mapToWorkoutDay(updatedDay));
+      }
+      return;
+    }
+
+    if (result.action === 'ADJUST_WORKOUT' && result.updated_day) {
+      const newDay = mapToWorkoutDay(result.updated_day);
+      onUpdateDay(day.id, newDay);
+    }
+
+    if (result.updated_plan) {
+      setCurrentPlan(result.updated_plan);
+    }
+  };
+
   const handleSendMessage = async (text: string) => {
     if (pendingProposal) {
       if (text.trim().toLowerCase().startsWith('y')) {
@@ -465,15 +492,7 @@ function WorkoutCard({
           sender: 'ryan'
         };
         setMessages(prev => [...prev, agentMsg]);
-        
-        if (result.action === 'ADJUST_WORKOUT' && result.updated_day) {
-          const newDay = mapToWorkoutDay(result.updated_day);
-          onUpdateDay(day.id, newDay);
-        }
-
-        if (result.updated_plan) {
-          setCurrentPlan(result.updated_plan);
-        }
+        applyConfirmedChange(result);
       } else if (result.status === 'proposal' && result.confirm_required) {
         const agentMsg: ChatMessage = {
           id: Date.now().toString() + '_ryan',
@@ -483,7 +502,8 @@ function WorkoutCard({
         setMessages(prev => [...prev, agentMsg]);
         setPendingProposal({
           originalText: text,
-          plan: result.updated_plan || getCurrentPlan()
+          plan: result.updated_plan || getCurrentPlan(),
+          change: result.patch ? result : undefined
         });
       } else {
         setMessages(prev => [...prev, { 
@@ -496,7 +516,7 @@ function WorkoutCard({
       console.error(e);
       setMessages(prev => [...prev, { 
         id: Date.now().toString(), 
-        text: "Sorry, I lost connection. Please try again.", 
+        text: e instanceof PlanConflictError ? CONFLICT_MESSAGE : "Sorry, I lost connection. Please try again.", 
         sender: 'ryan' 
       }]);
     }
@@ -508,10 +528,15 @@ function WorkoutCard({
       const user = auth.currentUser;
       let result: any;
 
+      // A versioned proposal is confirmed against the version it was computed from
+      const plan = proposal.change
+        ? { plan_id: proposal.change.plan_id, version: proposal.change.base_version }
+        : proposal.plan;
+      const patch = proposal.change?.patch;
       if (user) {
-        result = await actApi.chatWithAgent(proposal.originalText, day.id, proposal.plan, true);
+        result = await actApi.chatWithAgent(proposal.originalText, day.id, plan, true, patch);
       } else {
-        result = await anonymousApi.chatWithAgent(proposal.originalText, day.id, proposal.plan, true);
+        result = await anonymousApi.chatWithAgent(proposal.originalText, day.id, plan, true, patch);
       }
 
       if (result.status === 'success') {
@@ -521,15 +546,7 @@ function WorkoutCard({
           sender: 'ryan'
         };
         setMessages(prev => [...prev, agentMsg]);
-
-        if (result.action === 'ADJUST_WORKOUT' && result.updated_day) {
-          const newDay = mapToWorkoutDay(result.updated_day);
-          onUpdateDay(day.id, newDay);
-        }
-
-        if (result.updated_plan) {
-          setCurrentPlan(result.updated_plan);
-        }
+        applyConfirmedChange(result);
       } else {
         setMessages(prev => [...prev, { 
           id: Date.now().toString(), 
@@ -541,7 +558,7 @@ function WorkoutCard({
       console.error(e);
       setMessages(prev => [...prev, { 
         id: Date.now().toString(), 
-        text: "Sorry, I lost connection while applying the change. Please try again.", 
+        text: e instanceof PlanConflictError ? CONFLICT_MESSAGE : "Sorry, I lost connection while applying the change. Please try again.", 
         sender: 'ryan' 
       }]);
     } finally {
@@ -862,7 +879,8 @@ function WorkoutPlanContent({ onBack, goalType }: WorkoutPlanProps) {
                throw e;
            }
         } else {
-           const data = await anonymousApi.generatePlan(goalType);
+           // The plan is stored server-side against the photo session, if there is one
+           const data = await anonymousApi.generatePlan(goalType, localStorage.getItem('anonymous_session_id'));
            if (data && data.plan && data.plan.schedule) {
                scheduleData = data.plan.schedule;
                setRawPlan(data.plan);
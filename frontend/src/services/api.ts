@@ -1,5 +1,6 @@
 import { API_BASE } from '../config';
 import { getAuth } from 'firebase/auth';
+import { isVersioned, PlanConflictError, type PatchOp } from './planPatch';
 
 export interface AnonymousSession {
   session_id: string;
@@ -13,8 +14,28 @@ export interface AnonymousSession {
   }[];
 }
 
+// Versioned plans are referenced by id and version (changes come back as patches);
+// anything else is sent whole, as before
+const chatBody = (message: string, dayId: string, plan: any, confirm: boolean, patch?: PatchOp[]) =>
+  isVersioned(plan)
+    ? { message, day_id: dayId, plan_id: plan.plan_id, plan_version: plan.version, confirm, patch }
+    : { message, day_id: dayId, current_plan: plan, confirm };
+
+const readChatResponse = async (response: Response): Promise<any> => {
+  if (response.status === 409) throw new PlanConflictError();
+  if (!response.ok) throw new Error('Chat failed');
+  return response.json();
+};
+
 export const anonymousApi = {
   uploadPhoto: async (file: File, sessionId?: string | null): Promise<AnonymousSession> => {
+    // Prefer uploading straight to Storage; fall back to proxying through the API
+    try {
+      return await anonymousApi.uploadPhotoDirect(file, sessionId);
+    } catch (err) {
+      console.warn('Direct upload failed, falling back to API upload', err);
+    }
+
     const formData = new FormData();
     formData.append('file', file);
     if (sessionId) {
@@ -33,6 +54,50 @@ export const anonymousApi = {
     return response.json();
   },
 
+  uploadPhotoDirect: async (file: File, sessionId?: string | null): Promise<AnonymousSession> => {
+    const intentResponse = await fetch(`${API_BASE}/anonymous/upload-intent`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        filename: file.name,
+        content_type: file.type || 'image/jpeg',
+        session_id: sessionId || null,
+      }),
+    });
+
+    if (!intentResponse.ok) {
+      throw new Error('Upload intent failed');
+    }
+
+    const intent = await intentResponse.json();
+
+    const putResponse = await fetch(intent.upload_url, {
+      method: intent.method || 'PUT',
+      headers: intent.headers,
+      body: file,
+    });
+
+    if (!putResponse.ok) {
+      throw new Error('Upload failed');
+    }
+
+    const finalizeResponse = await fetch(`${API_BASE}/anonymous/upload-finalize`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ session_id: intent.session_id, storage_path: intent.storage_path }),
+    });
+
+    if (!finalizeResponse.ok) {
+      throw new Error('Upload finalize failed');
+    }
+
+    return finalizeResponse.json();
+  },
+
   analyzePhoto: async (sessionId: string): Promise<any> => {
     const response = await fetch(`${API_BASE}/anonymous/analyze`, {
       method: 'POST',
@@ -106,13 +171,13 @@ export const anonymousApi = {
     return response.json();
   },
 
-  generatePlan: async (goal: string): Promise<any> => {
+  generatePlan: async (goal: string, sessionId?: string | null): Promise<any> => {
     const response = await fetch(`${API_BASE}/anonymous/plan`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ goal }),
+      body: JSON.stringify({ goal, session_id: sessionId || undefined }),
     });
 
     if (!response.ok) {
@@ -122,20 +187,16 @@ export const anonymousApi = {
     return response.json();
   },
 
-  chatWithAgent: async (message: string, dayId: string, currentPlan: any, confirm: boolean = false): Promise<any> => {
+  chatWithAgent: async (message: string, dayId: string, currentPlan: any, confirm: boolean = false, patch?: PatchOp[]): Promise<any> => {
     const response = await fetch(`${API_BASE}/anonymous/chat`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ message, day_id: dayId, current_plan: currentPlan, confirm }),
+      body: JSON.stringify(chatBody(message, dayId, currentPlan, confirm, patch)),
     });
 
-    if (!response.ok) {
-      throw new Error('Chat failed');
-    }
-
-    return response.json();
+    return readChatResponse(response);
   }
 };
 
@@ -206,7 +267,7 @@ export const actApi = {
     return response.json();
   },
 
-  chatWithAgent: async (message: string, dayId: string, currentPlan?: any, confirm: boolean = false): Promise<any> => {
+  chatWithAgent: async (message: string, dayId: string, currentPlan?: any, confirm: boolean = false, patch?: PatchOp[]): Promise<any> => {
     const auth = getAuth();
     const user = auth.currentUser;
     if (!user) throw new Error('User not authenticated');
@@ -218,10 +279,9 @@ export const actApi = {
         'Content-Type': 'application/json',
         'Authorization': `Bearer ${token}`
       },
-      body: JSON.stringify({ message, day_id: dayId, current_plan: currentPlan, confirm })
+      body: JSON.stringify(chatBody(message, dayId, currentPlan, confirm, patch))
     });
 
-    if (!response.ok) throw new Error('Chat failed');
-    return response.json();
+    return readChatResponse(response);
   }
 };
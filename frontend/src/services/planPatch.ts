@@ -0,0 +1,69 @@
+// Client side of the versioned plan protocol: chat turns send plan_id/plan_version and get
+// RFC 6902 patches back (see backend/services/plan_service.py). Only the ops the backend
+// emits for plan days are supported: add, remove, replace and test on object members.
+
+export interface PatchOp {
+  op: 'add' | 'remove' | 'replace' | 'test';
+  path: string;
+  value?: any;
+}
+
+export interface PlanPatch {
+  plan_id: string;
+  base_version: number;
+  version: number;
+  patch: PatchOp[];
+}
+
+export interface PlanRef {
+  plan_id?: string;
+  version?: number;
+}
+
+const parsePointer = (path: string): string[] =>
+  path.split('/').slice(1).map(token => token.replace(/~1/g, '/').replace(/~0/g, '~'));
+
+const cloneContainer = (value: any): any => (Array.isArray(value) ? [...value] : { ...value });
+
+// Returns a new plan; only the containers along each op's path are copied
+export const applyPatch = (doc: any, ops: PatchOp[]): any => {
+  let result = doc;
+  for (const op of ops) {
+    const tokens = parsePointer(op.path);
+    if (tokens.length === 0) throw new Error(`Cannot patch the document root: ${op.path}`);
+    if (op.op === 'test') continue;
+    result = cloneContainer(result);
+    let parent = result;
+    for (const token of tokens.slice(0, -1)) {
+      const key = Array.isArray(parent) ? Number(token) : token;
+      if (parent[key] === undefined || parent[key] === null) throw new Error(`Path not found: ${op.path}`);
+      parent[key] = cloneContainer(parent[key]);
+      parent = parent[key];
+    }
+    const last = tokens[tokens.length - 1];
+    if (Array.isArray(parent)) throw new Error(`Array element ops are not supported: ${op.path}`);
+    if (op.op === 'remove') {
+      delete parent[last];
+    } else {
+      parent[last] = op.value;
+    }
+  }
+  return result;
+};
+
+// The plan after a server-confirmed change, stamped with its new version
+export const applyPlanPatch = (plan: any, change: PlanPatch): any => ({
+  ...applyPatch(plan, change.patch),
+  plan_id: change.plan_id,
+  version: change.version,
+});
+
+export const isVersioned = (plan: any): plan is Required<PlanRef> =>
+  !!plan && typeof plan.plan_id === 'string' && typeof plan.version === 'number';
+
+export class PlanConflictError extends Error {
+  constructor() {
+    super('Plan changed since it was loaded');
+    this.name = 'PlanConflictError';
+  }
+}